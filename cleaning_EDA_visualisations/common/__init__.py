@@ -0,0 +1,6 @@
+"""
+Shared helpers for the cleaning, EDA and visualisation scripts.
+
+The scripts in each table folder import from here so that loading, cleaning
+and profiling logic is written once and runs over the full source files.
+"""
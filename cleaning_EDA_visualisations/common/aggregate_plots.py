@@ -0,0 +1,189 @@
+"""
+Aggregate-first versions of the plots that otherwise draw every row.
+
+Seaborn's histplot, scatterplot, regplot and pairplot hand each point to
+matplotlib (and histplot's KDE evaluates every point at every grid position),
+so on full extracts they take minutes and produce multi-MB images. These
+functions reduce the data with NumPy first and draw only the result, so the
+drawing cost depends on the number of bins rather than the number of rows:
+
+- histogram: binned counts, with an optional KDE line;
+- binned_kde: a Gaussian KDE computed by linear binning onto a grid and one FFT
+  convolution with the kernel (Scott's bandwidth, as seaborn uses);
+- density: a hexbin or 2-D histogram grid of the points, with an optional
+  overlay of an equal-sized sample of points per hue group (see sampling.py);
+- density_with_trend: density plus a least-squares line;
+- pair_density: a pair grid of density panels with histograms on the diagonal.
+
+The axes-level functions take (data, ax, ...) and can be queued on a Renderer
+directly. They accept the arguments the scripts pass to the seaborn functions
+they replace, so Renderer's aggregate mode can swap them in (see rendering.py).
+"""
+
+import numpy as np
+import pandas as pd
+
+from common.sampling import stratified_sample
+
+# Default number of grid points for a KDE and of cells across a density plot
+KDE_GRIDSIZE = 512
+DENSITY_GRIDSIZE = 60
+
+
+def _finite(values):
+    values = pd.Series(values).to_numpy(dtype='float64', na_value=np.nan)
+    return values[np.isfinite(values)]
+
+
+def binned_counts(values, bins='auto', range=None):
+    """Counts and bin edges of the finite values, as np.histogram computes them."""
+    values = _finite(values)
+    edges = np.histogram_bin_edges(values, bins=bins, range=range)
+    counts, edges = np.histogram(values, bins=edges)
+    return counts, edges
+
+
+def binned_kde(values, gridsize=KDE_GRIDSIZE, bw_adjust=1, cut=3, clip=None):
+    """
+    Gaussian KDE of the finite values on an even grid, by binned FFT convolution.
+
+    The bandwidth is Scott's rule (std * n ** -1/5) times bw_adjust, and the
+    grid reaches cut bandwidths beyond the data, as in seaborn's kdeplot.
+    Returns (grid, density), or None if the values have no spread.
+    """
+    values = _finite(values)
+    n = len(values)
+    if n < 2:
+        return None
+    bandwidth = values.std(ddof=1) * n ** (-1 / 5) * bw_adjust
+    if not bandwidth > 0:
+        return None
+    low, high = values.min() - cut * bandwidth, values.max() + cut * bandwidth
+    if clip is not None:
+        low, high = max(low, clip[0]), min(high, clip[1])
+    grid = np.linspace(low, high, gridsize)
+    step = grid[1] - grid[0]
+
+    # Linear binning: each value is split between its two neighbouring grid points
+    position = (values - low) / step
+    index = np.clip(np.floor(position).astype(np.int64), 0, gridsize - 2)
+    fraction = position - index
+    weights = (np.bincount(index, 1 - fraction, minlength=gridsize)
+               + np.bincount(index + 1, fraction, minlength=gridsize))
+
+    offsets = np.arange(-(gridsize - 1), gridsize) * step
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    size = 1 << int(np.ceil(np.log2(len(weights) + len(kernel) - 1)))
+    convolved = np.fft.irfft(np.fft.rfft(weights, size) * np.fft.rfft(kernel, size), size)
+    density = np.maximum(convolved[gridsize - 1:2 * gridsize - 1], 0) / n
+    return grid, density
+
+
+def histogram(data, ax, x, bins='auto', kde=False, color=None, stat='count', alpha=0.75, label=None):
+    """Histogram of data[x] from binned counts, with an optional KDE line over the data range scaled to the bars."""
+    values = _finite(data[x])
+    counts, edges = binned_counts(values, bins=bins)
+    heights = counts / counts.sum() / np.diff(edges) if stat == 'density' and counts.sum() else counts
+    color = color or 'C0'
+    ax.stairs(heights, edges, fill=True, color=color, alpha=alpha, label=label)
+    ax.stairs(heights, edges, color='white', linewidth=0.5)
+    if kde:
+        curve = binned_kde(values, cut=0)
+        if curve is not None:
+            grid, density = curve
+            scale = 1 if stat == 'density' else len(values) * np.diff(edges).mean()
+            ax.plot(grid, density * scale, color=color)
+    ax.set_xlabel(x)
+    ax.set_ylabel('Density' if stat == 'density' else 'Count')
+
+
+def density(data, ax, x, y, hue=None, kind='hex', gridsize=DENSITY_GRIDSIZE, cmap='Blues', log=True,
+            overlay=None, palette=None, alpha=0.6, random_state=0, colorbar=True, **ignored):
+    """
+    Point density of data[x] against data[y] as a hexbin (kind='hex') or 2-D histogram grid ('grid').
+
+    Rows missing x or y are dropped. With hue, a sample of overlay points per
+    hue group (1000 in total by default) is drawn on top in the group colours
+    so that the groups stay visible; overlay=0 turns that off.
+    """
+    import seaborn as sns
+
+    frame = data[[x, y] + ([hue] if hue else [])].dropna(subset=[x, y])
+    xs = frame[x].to_numpy(dtype='float64')
+    ys = frame[y].to_numpy(dtype='float64')
+    if kind == 'hex':
+        mesh = ax.hexbin(xs, ys, gridsize=gridsize, cmap=cmap, mincnt=1, bins='log' if log else None, linewidths=0)
+    else:
+        counts, x_edges, y_edges = np.histogram2d(xs, ys, bins=gridsize)
+        counts = np.ma.masked_equal(counts.T, 0)
+        norm = 'log' if log and counts.count() else None
+        mesh = ax.pcolormesh(x_edges, y_edges, counts, cmap=cmap, norm=norm)
+    if colorbar and len(frame):
+        # Below the axes, leaving the right-hand side free for legends
+        ax.figure.colorbar(mesh, ax=ax, label='Rows', location='bottom', shrink=0.6)
+
+    if overlay is None:
+        overlay = 1000 if hue else 0
+    if overlay and len(frame):
+        points = frame.dropna(subset=[hue]) if hue else frame
+        sample = stratified_sample(points, size=overlay, by=hue, columns=[], tails=0, allocation='equal',
+                                   random_state=random_state).sample()
+        sns.scatterplot(data=sample, x=x, y=y, hue=hue, palette=palette, alpha=alpha, s=12, ax=ax)
+    ax.set_xlabel(x)
+    ax.set_ylabel(y)
+
+
+def density_with_trend(data, ax, x, y, hue=None, color='red', scatter_kws=None, line_kws=None, **options):
+    """density() with a least-squares line through all the points (the fit regplot draws, without its bootstrap band)."""
+    density(data, ax, x, y, hue=hue, **options)
+    frame = data[[x, y]].dropna()
+    if len(frame) > 1 and frame[x].nunique() > 1:
+        xs = frame[x].to_numpy(dtype='float64')
+        slope, intercept = np.polyfit(xs, frame[y].to_numpy(dtype='float64'), 1)
+        ends = np.array([xs.min(), xs.max()])
+        line = {'color': color, 'linewidth': 2}
+        line.update(line_kws or {})
+        ax.plot(ends, intercept + slope * ends, **line)
+
+
+def pair_density(data, vars=None, hue=None, height=2.5, diag_kind='hist', gridsize=40, palette=None, overlay=None,
+                 random_state=0, **ignored):
+    """
+    A pair grid of vars (default: the numeric columns): density panels off the
+    diagonal and a histogram (or, with diag_kind='kde', one KDE per hue group)
+    on it. Returns the Figure.
+    """
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    vars = list(vars) if vars is not None else data.select_dtypes(include=['number']).columns.tolist()
+
+    k = len(vars)
+    fig, axes = plt.subplots(k, k, figsize=(height * k, height * k), squeeze=False)
+    groups = []
+    if hue:
+        levels = pd.unique(data[hue].dropna())
+        colors = sns.color_palette(palette, len(levels))
+        groups = list(zip(levels, colors))
+    for row, y in enumerate(vars):
+        for column, x in enumerate(vars):
+            ax = axes[row, column]
+            if row != column:
+                density(data, ax, x, y, hue=hue, gridsize=gridsize, palette=palette, colorbar=False,
+                        overlay=overlay if overlay is not None else (300 if hue else 0), random_state=random_state)
+                if ax.get_legend():
+                    ax.get_legend().remove()
+            elif diag_kind == 'kde' and groups:
+                for level, color in groups:
+                    curve = binned_kde(data.loc[data[hue] == level, x])
+                    if curve is not None:
+                        ax.plot(*curve, color=color, label=str(level))
+            else:
+                histogram(data, ax, x, kde=diag_kind == 'kde')
+            ax.set_xlabel(x if row == k - 1 else '')
+            ax.set_ylabel(y if column == 0 else '')
+    if groups:
+        handles = [plt.Line2D([], [], color=color, marker='o', linestyle='') for _, color in groups]
+        fig.legend(handles, [str(level) for level, _ in groups], title=hue, loc='center left', bbox_to_anchor=(1, 0.5))
+    fig.tight_layout()
+    return fig
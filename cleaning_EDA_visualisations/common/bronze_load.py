@@ -0,0 +1,151 @@
+"""
+Parallel, checksum-aware loading of the bronze tables from the stage.
+
+SUPERANNUATION.BRONZE.load_data() truncates and copies all three tables one
+after another on every run, although a nightly drop usually changes only one
+file. BronzeLoader loads a set of (table, stage file) pairs instead:
+
+- a manifest records, for every stage path, the file's size and content
+  hash and the rows it loaded into its table. A table is reloaded only when
+  its file's size or hash has changed, or the table no longer holds the rows
+  the manifest recorded (e.g. after ddl_bronze.sql recreated it);
+- the hash is remembered against the file's size and modification time and
+  only recomputed when those change, as in the columnar cache;
+- each table is checked and loaded on its own session (a DuckDB cursor)
+  in a thread of its own, truncating and copying in one transaction, so
+  independent loads run at the same time and a failed load leaves its table
+  as it was;
+- every file gets a record of its status, duration and rows loaded.
+
+The stage is a local folder (standing in for the S3 bucket) and the
+warehouse an embedded DuckDB database; see warehouse.py, which uses this
+loader for the load_data() procedure.
+
+Usage:
+    loader = BronzeLoader(connection, stage_dir, manifest_path='bronze_manifest.json')
+    results = loader.load([('superannuation.bronze.member_employers', 'member_employers.csv')])
+    loader.report(results)
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from common.columnar_cache import content_hash
+
+
+def stage_file(stage_dir, name):
+    """The local file standing in for a stage file: <stem>.parquet if present, else the file itself."""
+    parquet = os.path.join(stage_dir, os.path.splitext(name)[0] + '.parquet')
+    return parquet if os.path.exists(parquet) else os.path.join(stage_dir, name)
+
+
+def copy_statement(table, path):
+    """The DuckDB statement that appends a stage file to a table, matching columns by position."""
+    path = path.replace("'", "''")
+    if path.endswith('.parquet'):
+        return f"INSERT INTO {table} SELECT * FROM read_parquet('{path}')"
+    # Header line and quoted fields, as the stage's file format declares
+    return f"COPY {table} FROM '{path}' (FORMAT csv, HEADER)"
+
+
+class BronzeLoader:
+    """Loads changed stage files into their tables concurrently and keeps a manifest of what was loaded."""
+
+    def __init__(self, connection, stage_dir, manifest_path=None, workers=None, force=False):
+        self.connection = connection
+        self.stage_dir = stage_dir
+        self.manifest_path = manifest_path
+        self.workers = workers
+        self.force = force
+        self.manifest = self._read_manifest()
+        self.wall_seconds = 0.0
+
+    def _read_manifest(self):
+        if self.manifest_path and os.path.exists(self.manifest_path):
+            with open(self.manifest_path) as f:
+                return json.load(f)
+        return {}
+
+    def _write_manifest(self):
+        if not self.manifest_path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.manifest_path)), exist_ok=True)
+        # Per-process temporary name, so concurrent jobs cannot clobber each other
+        temp_path = f'{self.manifest_path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(temp_path, self.manifest_path)
+
+    def _checksum(self, path, stat):
+        entry = self.manifest.get(path)
+        if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+            return entry['checksum']
+        return content_hash(path)
+
+    def _load_one(self, table, name):
+        started = time.perf_counter()
+        path = os.path.abspath(stage_file(self.stage_dir, name))
+        stat = os.stat(path)
+        checksum = self._checksum(path, stat)
+        session = self.connection.cursor()
+        try:
+            entry = self.manifest.get(path)
+            if (not self.force and entry and entry['table'] == table and entry['size'] == stat.st_size
+                    and entry['checksum'] == checksum
+                    and session.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0] == entry['rows']):
+                status, rows = 'unchanged', 0
+            else:
+                session.begin()
+                try:
+                    session.execute(f'TRUNCATE TABLE {table}')
+                    rows = session.execute(copy_statement(table, path)).fetchone()[0]
+                    session.commit()
+                except Exception:
+                    session.rollback()
+                    raise
+                status = 'loaded'
+        finally:
+            session.close()
+        return {'table': table, 'path': path, 'status': status, 'bytes': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                'checksum': checksum, 'rows': rows, 'seconds': round(time.perf_counter() - started, 6)}
+
+    def load(self, loads):
+        """Check and load each (table, stage file name) pair on its own session; returns one record per file."""
+        loads = list(loads)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers or len(loads) or 1) as pool:
+            futures = [pool.submit(self._load_one, table, name) for table, name in loads]
+        results, errors = [], []
+        for (table, name), future in zip(loads, futures):
+            try:
+                results.append(future.result())
+            except Exception as error:
+                errors.append(f'{table} from {name}: {error}')
+        # Only successful loads update the manifest, so a failed file is retried next time
+        for result in results:
+            if result['status'] == 'loaded':
+                self.manifest[result['path']] = {
+                    'table': result['table'], 'size': result['bytes'], 'mtime_ns': result['mtime_ns'],
+                    'checksum': result['checksum'], 'rows': result['rows'], 'seconds': result['seconds'],
+                    'loaded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                }
+            else:
+                # Touched but not changed: remember the new time so the file is not hashed again
+                self.manifest[result['path']]['mtime_ns'] = result['mtime_ns']
+        self._write_manifest()
+        self.wall_seconds = time.perf_counter() - started
+        if errors:
+            raise RuntimeError('Bronze load failed for ' + '; '.join(errors))
+        return results
+
+    def report(self, results):
+        width = max((len(result['table']) for result in results), default=0)
+        for result in results:
+            print(f"{result['table']:<{width}}  {result['status']:<9}  {result['seconds']:8.3f}s  "
+                  f"{result['rows']:>12,} rows  {result['bytes']:>14,} bytes")
+        loaded = sum(result['status'] == 'loaded' for result in results)
+        print(f'Loaded {loaded} of {len(results)} stage files in {self.wall_seconds:.2f}s wall-clock '
+              f'({len(results) - loaded} unchanged)')
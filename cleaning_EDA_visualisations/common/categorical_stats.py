@@ -0,0 +1,194 @@
+"""
+Streaming count/unique/top/freq statistics for the text columns of a table.
+
+DataFrame.describe(include='object') needs every string column in memory and
+exact value counts of each. CategoricalStats builds the same four statistics
+chunk by chunk. Each column keeps exact value counts until it has seen more
+than exact_limit distinct values, then switches to a HyperLogLog sketch for
+the distinct count and a Space-Saving sketch for the most frequent value (see
+sketches.py). Low-cardinality columns such as gender therefore stay exact,
+while high-cardinality ones (names, company_name, position_title) use a fixed
+amount of memory. Partial statistics from separate chunks or worker
+processes are merged.
+
+Usage (from cleaning_EDA_visualisations/):
+    python -m common.categorical_stats employment_history --workers 4
+    python -m common.categorical_stats superannuation_members --exact
+"""
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from common.data_loader import TABLE_SCHEMAS, LoadStats, iter_chunks, split_byte_ranges
+from common.sketches import HyperLogLog, SpaceSaving
+
+# Distinct values a column may have before its counts are replaced by sketches
+EXACT_LIMIT = 10_000
+
+
+def text_columns(table):
+    """The text columns of a source table, as describe(include='object') would use."""
+    return [column for column, dtype in TABLE_SCHEMAS[table].items() if dtype == 'object']
+
+
+class ColumnStats:
+    """Count, distinct count and most frequent value of one column."""
+
+    def __init__(self, exact_limit=EXACT_LIMIT, capacity=1024, precision=14):
+        self.exact_limit = exact_limit
+        self.capacity = capacity
+        self.precision = precision
+        self.count = 0
+        # Exact value counts, or None once the column has switched to sketches
+        self.counts = pd.Series(dtype='int64')
+        self.distinct = None
+        self.heavy_hitters = None
+
+    @property
+    def exact(self):
+        return self.counts is not None
+
+    def update(self, values):
+        """Add a Series of values (nulls are ignored)."""
+        self._add_counts(values.value_counts(dropna=True))
+        return self
+
+    def merge(self, other):
+        """Fold another ColumnStats of the same column into this one."""
+        if other.exact:
+            self._add_counts(other.counts)
+            return self
+        self._to_sketches()
+        self.count += other.count
+        self.distinct.merge(other.distinct)
+        self.heavy_hitters.merge(other.heavy_hitters)
+        return self
+
+    def _add_counts(self, counts):
+        self.count += int(counts.sum())
+        if self.exact:
+            self.counts = self.counts.add(counts, fill_value=0).astype('int64')
+            if len(self.counts) > self.exact_limit:
+                self._to_sketches()
+        else:
+            self.distinct.update(counts.index.to_series())
+            self.heavy_hitters.update_counts(counts)
+
+    def _to_sketches(self):
+        if self.exact:
+            self.distinct = HyperLogLog(self.precision).update(self.counts.index.to_series())
+            self.heavy_hitters = SpaceSaving(self.capacity).update_counts(self.counts)
+            self.counts = None
+
+    def summary(self):
+        """count, unique, top and freq, as in DataFrame.describe()."""
+        if self.exact:
+            counts = self.counts.sort_values(ascending=False, kind='stable')
+            unique = len(counts)
+            top, freq = (counts.index[0], int(counts.iloc[0])) if unique else (None, None)
+        else:
+            unique = self.distinct.estimate()
+            top_k = self.heavy_hitters.top_k(1)
+            top, freq = (top_k.index[0], int(top_k['count'].iloc[0])) if len(top_k) else (None, None)
+        return pd.Series({'count': self.count, 'unique': unique, 'top': top, 'freq': freq}, dtype=object)
+
+
+class CategoricalStats:
+    """
+    Mergeable describe(include='object') statistics for several columns.
+
+    exact=True keeps exact value counts however many distinct values there are
+    (for small tables); exact=False uses sketches from the start; the default
+    switches each column to sketches once it passes exact_limit distinct values.
+    """
+
+    def __init__(self, columns, exact=None, exact_limit=EXACT_LIMIT, capacity=1024, precision=14):
+        if exact is not None:
+            exact_limit = float('inf') if exact else -1
+        self.columns = list(columns)
+        self.rows = 0
+        self.stats = {column: ColumnStats(exact_limit, capacity, precision) for column in self.columns}
+
+    def update(self, chunk):
+        """Add a chunk's rows."""
+        self.rows += len(chunk)
+        for column in self.columns:
+            self.stats[column].update(chunk[column])
+        return self
+
+    def merge(self, other):
+        """Fold another CategoricalStats over the same columns into this one."""
+        self.rows += other.rows
+        for column in self.columns:
+            self.stats[column].merge(other.stats[column])
+        return self
+
+    @property
+    def approximate_columns(self):
+        """Columns whose unique and freq values are estimates."""
+        return [column for column in self.columns if not self.stats[column].exact]
+
+    def describe(self):
+        """A DataFrame laid out like DataFrame.describe(include='object')."""
+        return pd.DataFrame({column: self.stats[column].summary() for column in self.columns})
+
+    def report(self):
+        print(self.describe())
+        if self.approximate_columns:
+            print(f'Approximate unique/freq (sketched): {", ".join(self.approximate_columns)}')
+
+
+def describe_categorical(data, exact=None, chunksize=100_000):
+    """describe(include='object') for an in-memory DataFrame, built chunk by chunk."""
+    columns = data.select_dtypes(include=['object', 'category']).columns
+    stats = CategoricalStats(columns, exact=exact)
+    for start in range(0, len(data), chunksize):
+        stats.update(data.iloc[start:start + chunksize])
+    return stats
+
+
+def _stats_range(table, columns, exact, byte_range, path=None):
+    stats = CategoricalStats(columns, exact=exact)
+    for chunk in iter_chunks(table, path=path, byte_range=byte_range):
+        stats.update(chunk)
+    return stats
+
+
+def categorical_stats_table(table, columns=None, exact=None, workers=1, path=None):
+    """Categorical statistics of a source table, splitting the file across worker processes."""
+    columns = columns or text_columns(table)
+    stats = LoadStats(table)
+    if workers <= 1:
+        result = CategoricalStats(columns, exact=exact)
+        for chunk in iter_chunks(table, path=path, stats=stats):
+            result.update(chunk)
+    else:
+        ranges = split_byte_ranges(table, workers, path=path)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = pool.map(_stats_range, [table] * len(ranges), [columns] * len(ranges),
+                                [exact] * len(ranges), ranges, [path] * len(ranges))
+            result = CategoricalStats(columns, exact=exact)
+            for partial in partials:
+                result.merge(partial)
+        stats.record(result.rows, chunks=len(ranges))
+    stats.report()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Count, unique, top and freq of the text columns of a source table.')
+    parser.add_argument('table', choices=list(TABLE_SCHEMAS))
+    parser.add_argument('--columns', nargs='*', help='Columns to describe (default: text columns)')
+    parser.add_argument('--exact', action='store_true', help='Keep exact value counts for every column')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes')
+    args = parser.parse_args()
+
+    result = categorical_stats_table(args.table, args.columns, exact=True if args.exact else None,
+                                     workers=args.workers)
+    result.report()
+
+
+if __name__ == '__main__':
+    main()
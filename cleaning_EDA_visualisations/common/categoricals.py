@@ -0,0 +1,51 @@
+"""
+Categorical-aware string normalisation.
+
+Enumerated columns such as gender or industry hold a handful of distinct
+values across millions of rows. They are converted to categoricals and the
+strip/lower-case normalisation is applied to the categories rather than the
+rows. Categories that collapse to the same value (" Male" and "male") are
+merged by remapping the integer codes. Free-text columns (names, IDs) keep the
+row-wise string operations.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Low-cardinality text columns of each source table (see ddl_bronze.sql)
+CATEGORICAL_COLUMNS = {
+    'superannuation_members': ['gender', 'employment_status', 'investment_option'],
+    'member_employers': ['industry', 'head_office_state', 'default_super_fund_option',
+                         'default_fund_risk_profile'],
+    'employment_history': ['position_title', 'employment_type'],
+}
+
+
+def normalise_category_labels(values):
+    """Return values as a categorical with stripped, lower-cased categories."""
+    categorical = values.astype('category').array
+    labels = pd.Index(categorical.categories.astype(str)).str.strip().str.lower()
+    # Labels that now compare equal share one code in the merged categories
+    label_codes, merged = pd.factorize(labels)
+    if not len(merged):
+        # No categories (an all-null column): every value stays missing
+        return pd.Series(categorical, index=values.index, name=values.name)
+    codes = categorical.codes
+    new_codes = np.where(codes >= 0, label_codes[np.maximum(codes, 0)], -1)
+    return pd.Series(pd.Categorical.from_codes(new_codes, categories=merged),
+                     index=values.index, name=values.name)
+
+
+def normalise_strings(data, categorical_columns=()):
+    """
+    Strip and lower-case the text columns of a DataFrame.
+
+    Columns in categorical_columns are normalised per category (and returned as
+    categoricals); other object columns are normalised row by row.
+    """
+    for column in data.select_dtypes(include=['object', 'category']).columns:
+        if column in categorical_columns or isinstance(data[column].dtype, pd.CategoricalDtype):
+            data[column] = normalise_category_labels(data[column])
+        else:
+            data[column] = data[column].str.strip().str.lower()
+    return data
@@ -0,0 +1,287 @@
+"""
+Scalable KMeans clustering for the EDA and visualisation scripts.
+
+MiniBatchKMeans updates the centres from small random batches (each centre
+moves towards the batch mean with a 1 / count learning rate), so a fit costs a
+few passes of cheap batch updates rather than full Lloyd iterations, and
+partial_fit() can consume a file chunk by chunk. Centres are seeded with
+k-means++ on a sample of the rows.
+
+elbow_sweep() fits every k in parallel worker processes. The k-means++
+sequence is drawn once for the largest k and each fit warm-starts from its
+first k centres, so the runs share one seeding instead of each re-seeding
+from scratch. Fitted models and sweep results are cached under
+CACHE_DIR/clustering, keyed by a hash of the feature matrix and the
+parameters, and reused until the data changes.
+"""
+
+import hashlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from common.data_loader import CACHE_DIR
+from common.sketches import Moments
+
+CLUSTERING_DIR = os.path.join(CACHE_DIR, 'clustering')
+
+# Rows per block when computing distances to the centres
+_BLOCK_ROWS = 65536
+
+
+class Standardiser:
+    """Scales columns to zero mean and unit variance, like sklearn's StandardScaler."""
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        self.moments = {column: Moments() for column in self.columns}
+
+    def update(self, chunk):
+        for column in self.columns:
+            self.moments[column].update(chunk[column])
+        return self
+
+    def merge(self, other):
+        for column in self.columns:
+            self.moments[column].merge(other.moments[column])
+        return self
+
+    def transform(self, chunk):
+        """Return the scaled columns as a float64 array."""
+        values = chunk[self.columns].to_numpy(dtype='float64', na_value=np.nan)
+        mean = np.array([self.moments[column].mean for column in self.columns])
+        std = np.array([self.moments[column].std() for column in self.columns])
+        return (values - mean) / np.where(std > 0, std, 1.0)
+
+
+def _squared_distances(X, centres):
+    # ||x - c||² = ||x||² - 2 x·c + ||c||², clipped at zero for rounding
+    distances = (np.square(X).sum(axis=1)[:, None] - 2 * X @ centres.T
+                 + np.square(centres).sum(axis=1)[None, :])
+    return np.maximum(distances, 0.0)
+
+
+def _assign(X, centres):
+    """Nearest-centre labels and squared distances, computed in blocks of rows."""
+    labels = np.empty(len(X), dtype=np.int64)
+    distances = np.empty(len(X))
+    for start in range(0, len(X), _BLOCK_ROWS):
+        block = _squared_distances(X[start:start + _BLOCK_ROWS], centres)
+        labels[start:start + _BLOCK_ROWS] = block.argmin(axis=1)
+        distances[start:start + _BLOCK_ROWS] = block[np.arange(len(block)), labels[start:start + _BLOCK_ROWS]]
+    return labels, distances
+
+
+def kmeans_plusplus(X, n_clusters, random_state=0, sample_size=10000):
+    """
+    k-means++ seeds drawn from a sample of X. The first k seeds of a run
+    are themselves a k-means++ seeding for k clusters.
+    """
+    rng = np.random.default_rng(random_state)
+    if len(X) > sample_size:
+        X = X[rng.choice(len(X), sample_size, replace=False)]
+    centres = [X[rng.integers(len(X))]]
+    closest = _squared_distances(X, centres[0][None, :])[:, 0]
+    for _ in range(1, n_clusters):
+        total = closest.sum()
+        index = rng.choice(len(X), p=closest / total) if total > 0 else rng.integers(len(X))
+        centres.append(X[index])
+        closest = np.minimum(closest, _squared_distances(X, X[index][None, :])[:, 0])
+    return np.array(centres)
+
+
+class MiniBatchKMeans:
+    """
+    Mini-batch KMeans (Sculley, 2010) with sklearn-style attributes.
+
+    max_iter is the maximum number of passes over the data; fitting stops
+    early once no centre moves by more than tol (relative to the data's
+    variance) over a pass. init may be an array of starting centres.
+    """
+
+    def __init__(self, n_clusters=8, batch_size=1024, max_iter=100, tol=1e-4, init=None,
+                 sample_size=10000, random_state=0):
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.max_iter = max_iter
+        self.tol = tol
+        self.init = init
+        self.sample_size = sample_size
+        self.random_state = random_state
+        self.cluster_centers_ = None
+        self._counts = None
+        self._rng = np.random.default_rng(random_state)
+
+    def _initialise(self, X):
+        if self.init is not None:
+            self.cluster_centers_ = np.array(self.init, dtype='float64')[:self.n_clusters].copy()
+        else:
+            self.cluster_centers_ = kmeans_plusplus(X, self.n_clusters, self.random_state, self.sample_size)
+        self._counts = np.zeros(len(self.cluster_centers_))
+
+    def _update(self, batch):
+        labels, _ = _assign(batch, self.cluster_centers_)
+        sizes = np.bincount(labels, minlength=len(self.cluster_centers_))
+        sums = np.zeros_like(self.cluster_centers_)
+        np.add.at(sums, labels, batch)
+        moved = sizes > 0
+        self._counts[moved] += sizes[moved]
+        # Move each centre towards its batch mean with learning rate sizes / counts
+        self.cluster_centers_[moved] += ((sums[moved] - sizes[moved, None] * self.cluster_centers_[moved])
+                                         / self._counts[moved, None])
+
+    def partial_fit(self, X):
+        """Update the centres with one batch (e.g. a chunk of a streamed file)."""
+        X = np.asarray(X, dtype='float64')
+        if self.cluster_centers_ is None:
+            self._initialise(X)
+        self._update(X)
+        return self
+
+    def fit(self, X):
+        X = np.asarray(X, dtype='float64')
+        self._initialise(X)
+        threshold = self.tol * float(np.mean(np.var(X, axis=0))) if len(X) else 0.0
+        for _ in range(self.max_iter):
+            previous = self.cluster_centers_.copy()
+            order = self._rng.permutation(len(X))
+            for start in range(0, len(X), self.batch_size):
+                self._update(X[order[start:start + self.batch_size]])
+            if np.square(self.cluster_centers_ - previous).sum(axis=1).max() <= threshold:
+                break
+        self.labels_, distances = _assign(X, self.cluster_centers_)
+        self.inertia_ = float(distances.sum())
+        return self
+
+    def predict(self, X):
+        return _assign(np.asarray(X, dtype='float64'), self.cluster_centers_)[0]
+
+    def fit_predict(self, X):
+        return self.fit(X).labels_
+
+    def score(self, X):
+        """Negative inertia of X under the fitted centres."""
+        return -float(_assign(np.asarray(X, dtype='float64'), self.cluster_centers_)[1].sum())
+
+
+def silhouette_score(X, labels, sample_size=2000, random_state=0):
+    """Mean silhouette coefficient, computed exactly on a random sample of rows."""
+    X = np.asarray(X, dtype='float64')
+    labels = np.asarray(labels)
+    if len(X) > sample_size:
+        index = np.random.default_rng(random_state).choice(len(X), sample_size, replace=False)
+        X, labels = X[index], labels[index]
+    clusters = np.unique(labels)
+    if len(clusters) < 2:
+        return float('nan')
+    distances = np.sqrt(_squared_distances(X, X))
+    # Mean distance from each row to each cluster (excluding itself for its own cluster)
+    members = labels[:, None] == clusters[None, :]
+    sizes = members.sum(axis=0)
+    totals = distances @ members
+    own = members.argmax(axis=1)
+    own_sizes = sizes[own] - 1
+    a = np.where(own_sizes > 0, totals[np.arange(len(X)), own] / np.maximum(own_sizes, 1), 0.0)
+    other = totals / sizes
+    other[np.arange(len(X)), own] = np.inf
+    b = other.min(axis=1)
+    s = np.where(own_sizes > 0, (b - a) / np.maximum(a, b), 0.0)
+    return float(s.mean())
+
+
+def fingerprint(X, **params):
+    """Hash of a feature matrix and fitting parameters, used as the cache key."""
+    X = np.ascontiguousarray(X, dtype='float64')
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr((X.shape, sorted(params.items()))).encode())
+    digest.update(X.tobytes())
+    return digest.hexdigest()
+
+
+def _model_path(key, n_clusters):
+    return os.path.join(CLUSTERING_DIR, f'{key}-k{n_clusters}.npz')
+
+
+def _save_model(path, model, silhouette=float('nan')):
+    os.makedirs(CLUSTERING_DIR, exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp.npz'
+    np.savez(temp_path, centres=model.cluster_centers_, inertia=model.inertia_, silhouette=silhouette)
+    os.replace(temp_path, path)
+
+
+def _load_model(path, **params):
+    with np.load(path) as saved:
+        model = MiniBatchKMeans(n_clusters=len(saved['centres']), **params)
+        model.cluster_centers_ = saved['centres']
+        model.inertia_ = float(saved['inertia'])
+        silhouette = float(saved['silhouette'])
+    return model, silhouette
+
+
+def fit_cached(X, n_clusters, cache=True, **params):
+    """Fit MiniBatchKMeans, reusing a saved model if X and the parameters are unchanged."""
+    X = np.asarray(X, dtype='float64')
+    path = _model_path(fingerprint(X, **params), n_clusters)
+    if cache and os.path.exists(path):
+        model = _load_model(path, **params)[0]
+        model.labels_ = model.predict(X)
+        return model
+    model = MiniBatchKMeans(n_clusters=n_clusters, **params).fit(X)
+    if cache:
+        _save_model(path, model)
+    return model
+
+
+# The feature matrix is sent to each sweep worker once, not once per k
+_sweep_data = None
+
+
+def _set_sweep_data(X):
+    global _sweep_data
+    _sweep_data = X
+
+
+def _sweep_one(n_clusters, init, params, silhouette_sample):
+    X = _sweep_data
+    model = MiniBatchKMeans(n_clusters=n_clusters, init=init, **params).fit(X)
+    silhouette = silhouette_score(X, model.labels_, silhouette_sample) if silhouette_sample else float('nan')
+    return n_clusters, model, silhouette
+
+
+def elbow_sweep(X, k_values=range(1, 11), workers=None, silhouette_sample=2000, cache=True, **params):
+    """
+    Fit a model for each k (in parallel) and return a DataFrame indexed by k
+    with its inertia and silhouette score. Set silhouette_sample=0 to skip
+    the silhouette scores.
+    """
+    X = np.asarray(X, dtype='float64')
+    k_values = list(k_values)
+    key = fingerprint(X, **params)
+    results = {}
+    todo = []
+    for n_clusters in k_values:
+        path = _model_path(key, n_clusters)
+        if cache and os.path.exists(path):
+            model, silhouette = _load_model(path, **params)
+            # A model saved by fit_cached() has no silhouette score yet (k = 1 never has one)
+            if not silhouette_sample or n_clusters < 2 or not np.isnan(silhouette):
+                results[n_clusters] = (model.inertia_, silhouette)
+                continue
+        todo.append(n_clusters)
+
+    if todo:
+        seeds = kmeans_plusplus(X, max(todo), params.get('random_state', 0), params.get('sample_size', 10000))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_set_sweep_data, initargs=(X,)) as pool:
+            futures = [pool.submit(_sweep_one, n_clusters, seeds[:n_clusters], params, silhouette_sample)
+                       for n_clusters in todo]
+            for future in futures:
+                n_clusters, model, silhouette = future.result()
+                results[n_clusters] = (model.inertia_, silhouette)
+                if cache:
+                    _save_model(_model_path(key, n_clusters), model, silhouette)
+
+    sweep = pd.DataFrame.from_dict(results, orient='index', columns=['inertia', 'silhouette'])
+    sweep.index.name = 'k'
+    return sweep.loc[k_values]
@@ -0,0 +1,148 @@
+"""
+Content-hashed columnar cache of the source CSV files.
+
+The first time a table is read, its CSV is parsed once (with the typed schema
+from data_loader) and written to an uncompressed Arrow IPC file named after
+the source's size and content hash. Later reads memory-map that file instead
+of parsing the CSV again. When the CSV changes its hash changes, so the old
+entry is discarded and a new one is built.
+
+Hashing a large file is itself a full read, so the hash is remembered against
+the file's size and modification time and only recomputed when those change.
+
+pyarrow is optional: without it, or with SUPERANNUATION_COLUMNAR_CACHE=0, the
+loader falls back to parsing the CSV.
+"""
+
+import hashlib
+import json
+import os
+
+from common.data_loader import CACHE_DIR, TABLE_SCHEMAS, iter_csv_chunks, table_path
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+COLUMNAR_DIR = os.path.join(CACHE_DIR, 'columnar')
+_INDEX_PATH = os.path.join(COLUMNAR_DIR, 'index.json')
+_HASH_BLOCK = 8 * 1024 * 1024
+
+
+def enabled():
+    """True when pyarrow is installed and the cache has not been switched off."""
+    return pa is not None and os.environ.get('SUPERANNUATION_COLUMNAR_CACHE', '1') != '0'
+
+
+def content_hash(path):
+    """BLAKE2 hash of a file's contents."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_index():
+    if os.path.exists(_INDEX_PATH):
+        with open(_INDEX_PATH) as f:
+            return json.load(f)
+    return {}
+
+
+def _save_index(index):
+    os.makedirs(COLUMNAR_DIR, exist_ok=True)
+    # Per-process temporary name, so concurrent jobs cannot clobber each other
+    temp_path = f'{_INDEX_PATH}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(index, f, indent=2)
+    os.replace(temp_path, _INDEX_PATH)
+
+
+def source_key(table):
+    """'<size>-<hash>' for the current source file, reusing the remembered hash if unchanged."""
+    path = table_path(table)
+    stat = os.stat(path)
+    index = _load_index()
+    entry = index.get(table)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['key']
+    key = f'{stat.st_size}-{content_hash(path)}'
+    index[table] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'key': key}
+    _save_index(index)
+    return key
+
+
+def cache_path(table, key=None):
+    return os.path.join(COLUMNAR_DIR, f'{table}-{key or source_key(table)}.arrow')
+
+
+def _arrow_schema(table, chunk):
+    # Fixed Arrow types, so an all-null column in one chunk cannot change the schema
+    types = {'object': pa.string(), 'float64': pa.float64(), 'Int64': pa.int64()}
+    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+    declared = TABLE_SCHEMAS[table]
+    fields = [pa.field(field.name, types.get(declared.get(field.name), field.type)) for field in schema]
+    return pa.schema(fields, metadata=schema.metadata)
+
+
+def build(table, key=None):
+    """Parse the CSV once and write it as an Arrow IPC file; returns the cache path."""
+    path = cache_path(table, key)
+    os.makedirs(COLUMNAR_DIR, exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    writer = None
+    schema = None
+    try:
+        for chunk in iter_csv_chunks(table):
+            if schema is None:
+                schema = _arrow_schema(table, chunk)
+                writer = pa.ipc.new_file(temp_path, schema)
+            writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        return None
+    os.replace(temp_path, path)
+    # Drop entries for older versions of the source file
+    prefix = f'{table}-'
+    for name in os.listdir(COLUMNAR_DIR):
+        if name.startswith(prefix) and name.endswith('.arrow') and os.path.join(COLUMNAR_DIR, name) != path:
+            os.remove(os.path.join(COLUMNAR_DIR, name))
+    return path
+
+
+def open_table(table):
+    """Memory-map the cached Arrow table, building the cache entry if needed."""
+    key = source_key(table)
+    path = cache_path(table, key)
+    if not os.path.exists(path):
+        path = build(table, key)
+        if path is None:
+            return None
+    return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+
+
+def iter_cached_chunks(table, chunksize, max_rows=None):
+    """Return an iterator of typed DataFrame chunks from the memory-mapped cache entry."""
+    arrow_table = open_table(table)
+    if arrow_table is None:
+        return iter(())
+    return _iter_batches(table, arrow_table, chunksize, max_rows)
+
+
+def _iter_batches(table, arrow_table, chunksize, max_rows):
+    if max_rows is not None:
+        arrow_table = arrow_table.slice(0, max_rows)
+    object_columns = [column for column, dtype in TABLE_SCHEMAS[table].items() if dtype == 'object']
+    for batch in arrow_table.to_batches(max_chunksize=chunksize):
+        chunk = batch.to_pandas()
+        # Keep strings as object columns so chunks match the CSV parser's output
+        mismatched = [column for column in object_columns
+                      if column in chunk.columns and chunk[column].dtype != 'object']
+        if mismatched:
+            chunk = chunk.astype({column: 'object' for column in mismatched})
+        yield chunk
@@ -0,0 +1,270 @@
+"""
+Memory-compact DataFrames for the source tables.
+
+The loader reads measures as float64, IDs as Int64 and text as object
+columns. Compactor shrinks each chunk using what is known about the columns
+rather than what one chunk happens to contain, so every chunk of a table gets
+the same dtypes:
+
+- measures are downcast to the smallest type that holds their declared range
+  (the bounds checked in test_bronze.sql): whole-dollar amounts to nullable
+  Int32, contribution rates to float32. Once a chunk has values that do not
+  fit (non-integral amounts, or values outside the type) the column is kept
+  as read for the whole table, and align() converts the chunks already
+  downcast;
+- integer IDs without a declared range become Int32 when they fit;
+- member_id ('MEM' and six digits) is stored as its Int32 number, which
+  decode_ids() turns back into the string (if any value does not follow
+  that format, the column becomes a categorical instead);
+- date columns are parsed to datetime64[s] (see dates.py);
+- the other text columns (enumerated columns and names) become categoricals,
+  i.e. integer codes into one shared list of distinct values per column. New
+  values are appended to the list, so codes from earlier chunks stay valid
+  and compacted chunks concatenate without falling back to object.
+
+Compacted frames are meant for analysis and plotting; the cleaning stages
+expect the loader's dtypes.
+
+Usage (from cleaning_EDA_visualisations/):
+    python -m common.compaction superannuation_members
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from common.data_loader import TABLE_SCHEMAS, LoadStats, iter_chunks
+from common.dates import DATE_COLUMNS, DateNormaliser
+
+# Declared value ranges of the measure columns (see test_bronze.sql), and
+# whether the column holds whole numbers (INT in ddl_bronze.sql)
+VALUE_RANGES = {
+    'superannuation_members': {
+        'salary': (20_000, 1_000_000, True),
+        'employer_contribution_rate': (0, 0.2, False),
+        'employee_contribution_rate': (0, 0.2, False),
+        'super_balance': (0, 15_000_000, True),
+        'insurance_coverage': (0, 1_000_000, True),
+    },
+    'member_employers': {
+        'total_employees': (1, 3_000_000, True),
+        'avg_salary': (20_000, 1_000_000, True),
+    },
+    'employment_history': {
+        'final_salary': (20_000, 1_000_000, True),
+    },
+}
+
+# Text IDs made of a fixed prefix and a zero-padded number
+ID_FORMATS = {'member_id': ('MEM', 6)}
+
+_INTEGER_TYPES = ['Int8', 'Int16', 'Int32', 'Int64']
+
+
+def integer_dtype(low, high):
+    """The smallest nullable integer dtype holding [low, high]."""
+    for dtype in _INTEGER_TYPES:
+        info = np.iinfo(dtype.lower())
+        if info.min <= low and high <= info.max:
+            return dtype
+    return 'Int64'
+
+
+def target_dtypes(table):
+    """Column -> compact dtype for a source table."""
+    ranges = VALUE_RANGES.get(table, {})
+    dtypes = {}
+    for column, dtype in TABLE_SCHEMAS[table].items():
+        if column in ranges:
+            low, high, integral = ranges[column]
+            dtypes[column] = integer_dtype(low, high) if integral else 'float32'
+        elif dtype == 'Int64':
+            dtypes[column] = 'Int32'
+        elif column in ID_FORMATS:
+            dtypes[column] = 'id'
+        elif column in DATE_COLUMNS[table]:
+            dtypes[column] = 'datetime64[s]'
+        elif dtype == 'object':
+            dtypes[column] = 'category'
+    return dtypes
+
+
+def _fits(values, dtype):
+    # True if every non-null value survives the cast unchanged
+    present = values.dropna().to_numpy(dtype='float64')
+    if not len(present):
+        return True
+    if dtype == 'float32':
+        return bool(np.all(np.abs(present) <= np.finfo('float32').max))
+    info = np.iinfo(dtype.lower())
+    return bool(np.all(present == np.round(present)) and present.min() >= info.min and present.max() <= info.max)
+
+
+def encode_ids(values, column):
+    """The numbers of prefixed IDs as Int32, or None if any value does not follow the format."""
+    prefix, width = ID_FORMATS[column]
+    present = values.dropna().astype(str)
+    if not present.str.fullmatch(f'{prefix}\\d{{{width}}}').all():
+        return None
+    numbers = pd.Series(pd.NA, index=values.index, dtype='Int32')
+    numbers[present.index] = present.str.slice(len(prefix)).astype('int32')
+    return numbers
+
+
+def decode_ids(numbers, column):
+    """Turn ID numbers from encode_ids() back into their strings."""
+    prefix, width = ID_FORMATS[column]
+    present = numbers.dropna()
+    strings = pd.Series(None, index=numbers.index, dtype=object, name=numbers.name)
+    strings[present.index] = [f'{prefix}{number:0{width}d}' for number in present]
+    return strings
+
+
+class Compactor:
+    """Compact the chunks of one table to shared, smaller dtypes."""
+
+    def __init__(self, table):
+        self.table = table
+        self.schema = TABLE_SCHEMAS[table]
+        self.dtypes = target_dtypes(table)
+        self.categories = {}
+        self._dates = {}
+        # Columns with values that did not fit their declared type or format
+        self.kept = set()
+
+    def compact(self, chunk):
+        """Return a compacted copy of a chunk."""
+        columns = {}
+        for column in chunk.columns:
+            values = chunk[column]
+            dtype = self.dtypes.get(column)
+            if dtype == 'id':
+                numbers = encode_ids(values, column)
+                if numbers is not None:
+                    columns[column] = numbers
+                    continue
+                # An ID that does not follow the format: this and later chunks
+                # store the column as a categorical, and align() converts the
+                # chunks already encoded as numbers
+                self.kept.add(column)
+                dtype = self.dtypes[column] = 'category'
+            if dtype == 'category':
+                columns[column] = self._encode(column, values)
+            elif dtype == 'datetime64[s]':
+                columns[column] = self._dates.setdefault(column, DateNormaliser()).normalise(values)
+            elif dtype is None or dtype == self.schema.get(column):
+                columns[column] = values
+            elif _fits(values, dtype):
+                columns[column] = values.astype(dtype)
+            else:
+                # A value outside the declared type: this and later chunks keep
+                # the column as read, and align() converts the chunks already
+                # downcast
+                self.kept.add(column)
+                self.dtypes[column] = self.schema[column]
+                columns[column] = values
+        return pd.DataFrame(columns, index=chunk.index)
+
+    def _encode(self, column, values):
+        known = self.categories.get(column, pd.Index([], dtype=object))
+        new = pd.Index(pd.unique(values.dropna().to_numpy())).difference(known, sort=False)
+        if len(new):
+            known = known.append(new)
+            self.categories[column] = known
+        return pd.Series(pd.Categorical(values, categories=known), index=values.index, name=values.name)
+
+    def align(self, chunks):
+        """Give every compacted chunk the same dtypes and final category lists, so they concatenate."""
+        demoted = [column for column in ID_FORMATS if self.dtypes.get(column) == 'category']
+        chunks = [chunk.assign(**{column: self._encode(column, decode_ids(chunk[column], column))
+                                  for column in demoted
+                                  if column in chunk.columns and chunk[column].dtype == 'Int32'})
+                  for chunk in chunks]
+        restored = {column: dtype for column, dtype in self.schema.items() if self.dtypes.get(column) == dtype}
+        aligned = []
+        for chunk in chunks:
+            updates = {column: chunk[column].cat.set_categories(categories)
+                       for column, categories in self.categories.items()
+                       if column in chunk.columns and len(chunk[column].cat.categories) != len(categories)}
+            updates.update({column: chunk[column].astype(dtype) for column, dtype in restored.items()
+                            if column in chunk.columns and chunk[column].dtype != dtype})
+            aligned.append(chunk.assign(**updates) if updates else chunk)
+        return aligned
+
+
+class MemoryReport:
+    """In-memory bytes per column before and after compaction."""
+
+    def __init__(self, table):
+        self.table = table
+        self.before = pd.Series(dtype='int64')
+        self.after = pd.Series(dtype='int64')
+
+    def update(self, before, after):
+        self.before = self.before.add(before.memory_usage(deep=True, index=False), fill_value=0)
+        self.after = self.after.add(after.memory_usage(deep=True, index=False), fill_value=0)
+        return self
+
+    @property
+    def ratio(self):
+        total = self.after.sum()
+        return float(self.before.sum() / total) if total else float('nan')
+
+    def summary(self):
+        summary = pd.DataFrame({'before_mb': self.before / 2 ** 20, 'after_mb': self.after / 2 ** 20})
+        summary['ratio'] = summary['before_mb'] / summary['after_mb']
+        return summary.round(2)
+
+    def report(self):
+        print(f'Memory for {self.table}: {self.before.sum() / 2 ** 20:.1f} MB -> '
+              f'{self.after.sum() / 2 ** 20:.1f} MB ({self.ratio:.1f}x smaller)')
+        print(self.summary())
+
+
+def compact_frame(data, table, report=None):
+    """Compact a whole DataFrame of a source table."""
+    compacted = Compactor(table).compact(data)
+    if report is not None:
+        report.update(data, compacted)
+    return compacted
+
+
+def read_compact(table, report=None, **kwargs):
+    """
+    Read a whole table through iter_chunks(), compacting each chunk as it arrives.
+
+    Only one chunk is held at the loader's dtypes at a time. Pass a
+    MemoryReport as report to collect bytes before and after.
+    """
+    compactor = Compactor(table)
+    chunks = []
+    for chunk in iter_chunks(table, **kwargs):
+        compacted = compactor.compact(chunk)
+        if report is not None:
+            report.update(chunk, compacted)
+        chunks.append(compacted)
+    if compactor.kept:
+        print(f'Columns with values outside their declared type: {", ".join(sorted(compactor.kept))}')
+    if not chunks:
+        return compactor.compact(pd.DataFrame({column: pd.Series(dtype=dtype)
+                                               for column, dtype in TABLE_SCHEMAS[table].items()}))
+    return pd.concat(compactor.align(chunks), ignore_index=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Report the memory saved by compacting the source tables.')
+    parser.add_argument('tables', nargs='*', default=list(TABLE_SCHEMAS), help='Tables to compact')
+    args = parser.parse_args()
+
+    for table in args.tables:
+        stats = LoadStats(table)
+        report = MemoryReport(table)
+        data = read_compact(table, report=report, stats=stats)
+        stats.report()
+        report.report()
+        print(f'Compacted dtypes:\n{data.dtypes}')
+
+
+if __name__ == '__main__':
+    main()
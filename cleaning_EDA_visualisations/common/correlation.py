@@ -0,0 +1,298 @@
+"""
+Incremental correlation engine built on mergeable sufficient statistics.
+
+CorrelationAccumulator keeps, for every pair of columns, the number of rows
+where both are present (n) and the sums Σx, Σx², Σy, Σy² and Σxy over those
+rows. A chunk is folded in with a few matrix products, accumulators from
+parallel workers are merged by addition, and the Pearson matrix (with
+pandas' pairwise-complete semantics) and its p-values are read off at any
+time. New batches update the statistics without rescanning earlier data.
+
+Spearman correlation is Pearson correlation of ranks. Ranks need the whole
+column, so the Spearman mode takes two passes: the first builds a KLL sketch
+per column (see sketches.py), the second maps each value to its mid-rank in
+the sketch and accumulates those. Ranks are exact while a sketch has not
+compacted (up to about a thousand values per column) and approximate to
+about 1% of the rank range after that.
+
+Usage (from cleaning_EDA_visualisations/):
+    python -m common.correlation superannuation_members --method spearman --workers 4
+"""
+
+import argparse
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from common.data_loader import TABLE_SCHEMAS, LoadStats, iter_chunks, split_byte_ranges
+from common.sketches import KLLSketch
+
+try:
+    from scipy.special import betainc
+except ImportError:
+    betainc = None
+
+
+def numeric_columns(table):
+    """The numeric columns of a source table, as DataFrame.corr(numeric_only=True) would use."""
+    return [column for column, dtype in TABLE_SCHEMAS[table].items() if dtype in ('float64', 'Int64')]
+
+
+class CorrelationAccumulator:
+    """
+    Pairwise sufficient statistics for the Pearson correlation of columns.
+
+    Values are shifted by a per-column constant (the mean of the first chunk)
+    before they are summed, which keeps Σx² - (Σx)²/n accurate for large
+    values such as balances. The shift cancels out of the correlation.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        size = len(self.columns)
+        self.shift = None
+        self.n = np.zeros((size, size))
+        # sums[i, j] is Σx_i over the rows where both i and j are present
+        self.sums = np.zeros((size, size))
+        self.squares = np.zeros((size, size))
+        self.products = np.zeros((size, size))
+
+    def update(self, chunk):
+        """Add a chunk's rows to the running sums."""
+        values = chunk[self.columns].to_numpy(dtype='float64', na_value=np.nan)
+        present = ~np.isnan(values)
+        if self.shift is None:
+            with np.errstate(all='ignore'):
+                self.shift = np.nan_to_num(np.nanmean(values, axis=0)) if len(values) else np.zeros(len(self.columns))
+        shifted = np.where(present, values - self.shift, 0.0)
+        mask = present.astype('float64')
+        self.n += mask.T @ mask
+        self.sums += shifted.T @ mask
+        self.squares += np.square(shifted).T @ mask
+        self.products += shifted.T @ shifted
+        return self
+
+    def _reshift(self, shift):
+        # Re-express the sums around a different shift: x - b = (x - a) + (a - b)
+        delta = (self.shift - shift)[:, None]
+        delta_t = delta.T
+        self.products += delta * self.sums.T + delta_t * self.sums + self.n * delta * delta_t
+        self.squares += 2 * delta * self.sums + self.n * delta ** 2
+        self.sums += self.n * delta
+        self.shift = shift
+
+    def merge(self, other):
+        """Fold in an accumulator built on other rows (e.g. by another worker)."""
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.shift = other.shift.copy()
+        elif not np.array_equal(self.shift, other.shift):
+            other = _copy(other)
+            other._reshift(self.shift)
+        self.n += other.n
+        self.sums += other.sums
+        self.squares += other.squares
+        self.products += other.products
+        return self
+
+    def correlation(self):
+        """Pearson correlation matrix (pairwise-complete, as DataFrame.corr())."""
+        sums_y = self.sums.T
+        squares_y = self.squares.T
+        with np.errstate(all='ignore'):
+            covariance = self.n * self.products - self.sums * sums_y
+            variance_x = self.n * self.squares - self.sums ** 2
+            variance_y = self.n * squares_y - sums_y ** 2
+            r = covariance / np.sqrt(variance_x * variance_y)
+        r = np.clip(r, -1.0, 1.0)
+        r[self.n < 2] = np.nan
+        np.fill_diagonal(r, np.where(np.diag(self.n) >= 2, 1.0, np.nan))
+        return pd.DataFrame(r, index=self.columns, columns=self.columns)
+
+    def p_values(self):
+        """Two-sided p-values for the null hypothesis of no correlation (t-test, n - 2 df)."""
+        r = self.correlation().to_numpy()
+        df = self.n - 2
+        with np.errstate(all='ignore'):
+            t_squared = r ** 2 * df / (1 - r ** 2)
+            x = df / (df + t_squared)
+        p = _regularised_beta(df / 2, 0.5, x)
+        p[np.abs(r) >= 1] = 0.0
+        p[~np.isfinite(r) | (df < 1)] = np.nan
+        return pd.DataFrame(p, index=self.columns, columns=self.columns)
+
+    def counts(self):
+        """Number of rows behind each pairwise correlation."""
+        return pd.DataFrame(self.n.astype('int64'), index=self.columns, columns=self.columns)
+
+
+def _copy(accumulator):
+    copy = CorrelationAccumulator(accumulator.columns)
+    copy.shift = accumulator.shift.copy()
+    copy.n = accumulator.n.copy()
+    copy.sums = accumulator.sums.copy()
+    copy.squares = accumulator.squares.copy()
+    copy.products = accumulator.products.copy()
+    return copy
+
+
+def _regularised_beta(a, b, x):
+    """I_x(a, b) elementwise; uses scipy when installed, else a continued fraction."""
+    a, b, x = np.broadcast_arrays(np.asarray(a, dtype='float64'), np.asarray(b, dtype='float64'),
+                                  np.asarray(x, dtype='float64'))
+    if betainc is not None:
+        with np.errstate(all='ignore'):
+            return betainc(a, b, x)
+    result = np.full(x.shape, np.nan)
+    for index in np.ndindex(x.shape):
+        result[index] = _betainc(a[index], b[index], x[index])
+    return result
+
+
+def _betainc(a, b, x, iterations=300, epsilon=1e-15):
+    if not (np.isfinite(x) and a > 0 and b > 0) or x < 0 or x > 1:
+        return np.nan
+    if x == 0 or x == 1:
+        return float(x)
+    log_front = (np.log(x) * a + np.log1p(-x) * b
+                 - (math.lgamma(a) + math.lgamma(b) - math.lgamma(a + b)))
+    # The continued fraction converges quickly for x < (a + 1) / (a + b + 2)
+    if x > (a + 1) / (a + b + 2):
+        return 1.0 - _betainc(b, a, 1.0 - x, iterations, epsilon)
+    # Modified Lentz's method
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    fraction = d
+    for m in range(1, iterations + 1):
+        for numerator in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                          -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1.0 + numerator * d
+            d = 1.0 / (d if abs(d) > tiny else tiny)
+            c = 1.0 + numerator / c
+            c = c if abs(c) > tiny else tiny
+            fraction *= c * d
+        if abs(c * d - 1.0) < epsilon:
+            break
+    return float(np.exp(log_front) * fraction / a)
+
+
+class RankTransformer:
+    """Maps values to mid-ranks (scaled to 0-1) using one KLL sketch per column."""
+
+    def __init__(self, columns, k=1024, grid_size=4097):
+        self.columns = list(columns)
+        self.grid_size = grid_size
+        self.sketches = {column: KLLSketch(k) for column in self.columns}
+        self._grids = None
+
+    def update(self, chunk):
+        """First pass: add a chunk's values to the sketches."""
+        self._grids = None
+        for column in self.columns:
+            self.sketches[column].update(chunk[column])
+        return self
+
+    def merge(self, other):
+        self._grids = None
+        for column in self.columns:
+            self.sketches[column].merge(other.sketches[column])
+        return self
+
+    def _grid(self, column):
+        sketch = self.sketches[column]
+        if sketch.exact:
+            # Every value is still held, so ranks are exact
+            return np.sort(sketch.levels[0])
+        return sketch.quantile(np.linspace(0, 1, self.grid_size))
+
+    def transform(self, chunk):
+        """Second pass: replace the values of each column with their mid-ranks."""
+        if self._grids is None:
+            self._grids = {column: self._grid(column) for column in self.columns}
+        ranks = {}
+        for column in self.columns:
+            values = chunk[column].to_numpy(dtype='float64', na_value=np.nan)
+            grid = self._grids[column]
+            mid_ranks = (np.searchsorted(grid, values, 'left') + np.searchsorted(grid, values, 'right')) / 2
+            ranks[column] = np.where(np.isnan(values), np.nan, mid_ranks / max(len(grid), 1))
+        return pd.DataFrame(ranks, index=chunk.index)
+
+
+def _accumulate_range(table, columns, byte_range, ranks=None, path=None):
+    accumulator = CorrelationAccumulator(columns)
+    for chunk in iter_chunks(table, path=path, byte_range=byte_range):
+        accumulator.update(ranks.transform(chunk) if ranks is not None else chunk)
+    return accumulator
+
+
+def _ranks_range(table, columns, byte_range, path=None):
+    ranks = RankTransformer(columns)
+    for chunk in iter_chunks(table, path=path, byte_range=byte_range):
+        ranks.update(chunk)
+    return ranks
+
+
+def correlate_table(table, columns=None, method='pearson', workers=1, path=None):
+    """
+    Stream a table and return its CorrelationAccumulator (of ranks for
+    method='spearman'), splitting the file across worker processes.
+    """
+    columns = columns or numeric_columns(table)
+    stats = LoadStats(table)
+    ranks = None
+    if workers <= 1:
+        if method == 'spearman':
+            ranks = RankTransformer(columns)
+            for chunk in iter_chunks(table, path=path):
+                ranks.update(chunk)
+        accumulator = CorrelationAccumulator(columns)
+        for chunk in iter_chunks(table, path=path, stats=stats):
+            accumulator.update(ranks.transform(chunk) if ranks is not None else chunk)
+    else:
+        byte_ranges = split_byte_ranges(table, workers, path=path)
+        count = len(byte_ranges)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            if method == 'spearman':
+                ranks = RankTransformer(columns)
+                for partial in pool.map(_ranks_range, [table] * count, [columns] * count, byte_ranges,
+                                        [path] * count):
+                    ranks.merge(partial)
+            accumulator = CorrelationAccumulator(columns)
+            for partial in pool.map(_accumulate_range, [table] * count, [columns] * count, byte_ranges,
+                                    [ranks] * count, [path] * count):
+                accumulator.merge(partial)
+        stats.record(int(np.diag(accumulator.n).max(initial=0)), chunks=count)
+    stats.report()
+    return accumulator
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Correlation matrix of a source table in one streaming pass.')
+    parser.add_argument('table', choices=list(TABLE_SCHEMAS))
+    parser.add_argument('--columns', nargs='*', help='Columns to correlate (default: numeric columns)')
+    parser.add_argument('--method', choices=['pearson', 'spearman'], default='pearson')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes')
+    parser.add_argument('--output', help='CSV file for the correlation matrix')
+    args = parser.parse_args()
+
+    accumulator = correlate_table(args.table, args.columns, args.method, args.workers)
+    correlation_matrix = accumulator.correlation()
+    print(f'{args.method.title()} correlation matrix:')
+    print(correlation_matrix)
+    print('p-values:')
+    print(accumulator.p_values())
+    if args.output:
+        directory = os.path.dirname(args.output)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        correlation_matrix.to_csv(args.output)
+        print(f'Correlation matrix saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
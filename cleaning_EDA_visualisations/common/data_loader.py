@@ -0,0 +1,298 @@
+"""
+Chunked streaming loader for the three source CSV files.
+
+The source extracts are too large to load eagerly, so every script reads them
+through iter_chunks(), which yields DataFrames of a bounded size with a fixed
+schema (taken from ddl_bronze.sql). Throughput and peak memory are recorded in
+a LoadStats object so batch windows can be sized from real runs.
+"""
+
+import csv
+import os
+import resource
+import sys
+import time
+
+import pandas as pd
+
+# Location of the source CSV files (override with SUPERANNUATION_DATA_DIR)
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+DATA_DIR = os.environ.get('SUPERANNUATION_DATA_DIR', os.path.join(REPO_ROOT, 'data'))
+
+# Folder for derived files that can be rebuilt from the source CSVs
+# (override with SUPERANNUATION_CACHE_DIR)
+CACHE_DIR = os.environ.get('SUPERANNUATION_CACHE_DIR', os.path.join(DATA_DIR, '.cache'))
+
+# Default rows per chunk, chunk byte budget and total row cap for every script
+# (override with SUPERANNUATION_CHUNKSIZE, SUPERANNUATION_CHUNK_BYTES and
+# SUPERANNUATION_MAX_ROWS to size batch windows without editing the scripts)
+DEFAULT_CHUNKSIZE = int(os.environ.get('SUPERANNUATION_CHUNKSIZE', 100_000))
+DEFAULT_CHUNK_BYTES = os.environ.get('SUPERANNUATION_CHUNK_BYTES')
+DEFAULT_MAX_ROWS = os.environ.get('SUPERANNUATION_MAX_ROWS')
+
+# Rows read up front to estimate bytes per row when a byte budget is given
+_PROBE_ROWS = 1_000
+
+# Column types for each source table, matching ddl_bronze.sql.
+# Measures are float64 so that chunks keep the same dtype whether or not they
+# contain missing values; dates stay as strings and are parsed by the scripts.
+TABLE_SCHEMAS = {
+    'superannuation_members': {
+        'member_id': 'object',
+        'first_name': 'object',
+        'last_name': 'object',
+        'date_of_birth': 'object',
+        'gender': 'object',
+        'employment_status': 'object',
+        'salary': 'float64',
+        'employer_contribution_rate': 'float64',
+        'employee_contribution_rate': 'float64',
+        'super_balance': 'float64',
+        'investment_option': 'object',
+        'insurance_coverage': 'float64',
+    },
+    'member_employers': {
+        'relationship_id': 'Int64',
+        'employer_id': 'Int64',
+        'member_id': 'object',
+        'company_name': 'object',
+        'industry': 'object',
+        'head_office_state': 'object',
+        'total_employees': 'float64',
+        'avg_salary': 'float64',
+        'default_super_fund_option': 'object',
+        'default_fund_risk_profile': 'object',
+    },
+    'employment_history': {
+        'employment_id': 'Int64',
+        'member_id': 'object',
+        'employer_id': 'Int64',
+        'position_title': 'object',
+        'start_date': 'object',
+        'end_date': 'object',
+        'employment_type': 'object',
+        'final_salary': 'float64',
+    },
+}
+
+
+def table_path(table):
+    """Return the path of the source CSV for a table."""
+    if table not in TABLE_SCHEMAS:
+        raise ValueError(f'Unknown table: {table}')
+    return os.path.join(DATA_DIR, f'{table}.csv')
+
+
+def source_signature(table, path=None):
+    """Size and modification time of a source file, used to invalidate derived files."""
+    stat = os.stat(path or table_path(table))
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and kilobytes on Linux
+    if sys.platform == 'darwin':
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+class LoadStats:
+    """Running totals for a streamed load."""
+
+    def __init__(self, table):
+        self.table = table
+        self.rows = 0
+        self.chunks = 0
+        self.bytes_in_memory = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def update(self, chunk):
+        self.record(len(chunk), bytes_in_memory=int(chunk.memory_usage(deep=True).sum()))
+
+    def record(self, rows, chunks=1, bytes_in_memory=0):
+        # Used directly when the rows were read by other processes
+        self.rows += rows
+        self.chunks += chunks
+        self.bytes_in_memory += bytes_in_memory
+        self.elapsed = time.perf_counter() - self.started
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self):
+        return {
+            'table': self.table,
+            'rows': self.rows,
+            'chunks': self.chunks,
+            'bytes_in_memory': self.bytes_in_memory,
+            'elapsed_seconds': round(self.elapsed, 3),
+            'rows_per_second': round(self.rows_per_second, 1),
+            'peak_rss_mb': round(peak_rss_mb(), 1),
+        }
+
+    def report(self):
+        print(f'Loaded {self.rows} rows of {self.table} in {self.chunks} chunks '
+              f'({self.elapsed:.2f}s, {self.rows_per_second:,.0f} rows/s, '
+              f'peak RSS {peak_rss_mb():.1f} MB)')
+
+
+def _chunksize_for_budget(path, dtypes, chunk_bytes):
+    # Estimate in-memory bytes per row from a small probe read
+    probe = pd.read_csv(path, dtype=dtypes, nrows=_PROBE_ROWS)
+    if probe.empty:
+        return DEFAULT_CHUNKSIZE
+    bytes_per_row = probe.memory_usage(deep=True).sum() / len(probe)
+    return max(1, int(chunk_bytes // bytes_per_row))
+
+
+def split_byte_ranges(table, parts, path=None):
+    """
+    Split a source file into roughly equal (start, end) byte ranges.
+
+    Every range begins at the start of a line and the header line is skipped,
+    so the ranges can be read independently (e.g. by worker processes) with
+    iter_chunks(byte_range=...).
+    """
+    path = path or table_path(table)
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        data_start = f.tell()
+        cuts = [data_start]
+        for i in range(1, parts):
+            target = data_start + (size - data_start) * i // parts
+            if target <= cuts[-1]:
+                continue
+            f.seek(target - 1)
+            f.readline()
+            position = f.tell()
+            if cuts[-1] < position < size:
+                cuts.append(position)
+    cuts.append(size)
+    return [(cuts[i], cuts[i + 1]) for i in range(len(cuts) - 1) if cuts[i] < cuts[i + 1]]
+
+
+class _RangeFile:
+    # Minimal file object that only exposes the bytes in [start, end)
+
+    def __init__(self, path, start, end):
+        self._file = open(path, 'rb')
+        self._file.seek(start)
+        self._remaining = end - start
+
+    def read(self, size=-1):
+        if size is None or size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._file.read(size)
+        self._remaining -= len(data)
+        return data
+
+    def close(self):
+        self._file.close()
+
+
+def _header(path):
+    with open(path, newline='') as f:
+        return next(csv.reader(f))
+
+
+def iter_chunks(table, chunksize=None, chunk_bytes=None, max_rows=None, path=None, stats=None,
+                byte_range=None):
+    """
+    Yield typed DataFrame chunks of a source table.
+
+    chunksize sets the rows per chunk; alternatively chunk_bytes sets a target
+    in-memory size per chunk. max_rows caps the total number of rows read.
+    Pass a LoadStats object as stats to collect throughput figures, and a
+    (start, end) pair from split_byte_ranges() as byte_range to read only part
+    of the file.
+
+    Whole-table reads go through the columnar cache (see columnar_cache.py)
+    when it is available, so only the first read parses the CSV.
+
+    The file is opened straight away, so a missing or unreadable file raises
+    here rather than on the first iteration.
+    """
+    if chunk_bytes is None and DEFAULT_CHUNK_BYTES:
+        chunk_bytes = int(DEFAULT_CHUNK_BYTES)
+    if max_rows is None and DEFAULT_MAX_ROWS:
+        max_rows = int(DEFAULT_MAX_ROWS)
+    if chunksize is None:
+        if chunk_bytes is not None:
+            chunksize = _chunksize_for_budget(path or table_path(table), TABLE_SCHEMAS.get(table), chunk_bytes)
+        else:
+            chunksize = DEFAULT_CHUNKSIZE
+    if max_rows is not None:
+        chunksize = min(chunksize, max_rows)
+
+    if path is None and byte_range is None:
+        from common import columnar_cache
+        if columnar_cache.enabled():
+            return _stream(columnar_cache.iter_cached_chunks(table, chunksize, max_rows), stats)
+    return _stream(iter_csv_chunks(table, chunksize, max_rows, path, byte_range), stats)
+
+
+def iter_csv_chunks(table, chunksize=DEFAULT_CHUNKSIZE, max_rows=None, path=None, byte_range=None):
+    """Parse chunks straight from the CSV file, bypassing the columnar cache."""
+    path = path or table_path(table)
+    dtypes = TABLE_SCHEMAS.get(table)
+    if byte_range is None:
+        reader = pd.read_csv(path, dtype=dtypes, chunksize=chunksize, nrows=max_rows)
+        return _read(reader)
+    source = _RangeFile(path, *byte_range)
+    reader = pd.read_csv(source, dtype=dtypes, chunksize=chunksize, nrows=max_rows,
+                         header=None, names=_header(path))
+    return _read(reader, source)
+
+
+def _read(reader, source=None):
+    try:
+        with reader:
+            yield from reader
+    finally:
+        if source is not None:
+            source.close()
+
+
+def _stream(chunks, stats):
+    for chunk in chunks:
+        if stats is not None:
+            stats.update(chunk)
+        yield chunk
+
+
+def read_table(table, **kwargs):
+    """
+    Read a whole table (or the first max_rows rows) through iter_chunks().
+
+    The result holds the whole table in memory, so this is for consumers that
+    need every row at once, such as the visualisation scripts; code that can
+    work chunk by chunk should iterate over iter_chunks() (or a Pipeline)
+    instead.
+    """
+    chunks = list(iter_chunks(table, **kwargs))
+    if not chunks:
+        return pd.DataFrame(columns=list(TABLE_SCHEMAS.get(table, {})))
+    return pd.concat(chunks, ignore_index=True)
+
+
+class ChunkWriter:
+    """Append chunks to a single CSV, writing the header only once."""
+
+    def __init__(self, path):
+        self.path = path
+        self.rows = 0
+        self._started = False
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def write(self, chunk):
+        chunk.to_csv(self.path, mode='a' if self._started else 'w',
+                     header=not self._started, index=False)
+        self._started = True
+        self.rows += len(chunk)
@@ -0,0 +1,100 @@
+"""
+Fast date normalisation for the date columns of the source tables.
+
+Date columns hold few distinct values relative to their length, so
+DateNormaliser factorises each column, parses only the unique strings (with an
+explicit or detected format) and maps the results back onto the rows. Parsed
+values are remembered across chunks, so a value is parsed once per run.
+
+Dates are returned as native datetime64[s] columns, or as compact int32 day
+offsets from 1970-01-01. Second resolution covers the 9999-12-31 open-ended
+sentinel used for current roles, which is out of range at pandas' nanosecond
+resolution and would otherwise be coerced to NaT or left as strings.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Date columns of each source table (see ddl_bronze.sql)
+DATE_COLUMNS = {
+    'employment_history': ['start_date', 'end_date'],
+    'superannuation_members': ['date_of_birth'],
+    'member_employers': [],
+}
+
+# Placeholder end_date for roles that have not ended (see proc_silver_load.sql)
+OPEN_ENDED = pd.Timestamp('9999-12-31').as_unit('s')
+
+# Formats tried, in order, when none is given
+CANDIDATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%Y/%m/%d', '%Y-%m-%d %H:%M:%S']
+
+
+def detect_format(values, sample_size=1000):
+    """The candidate format that parses the most sampled values, or None if none match."""
+    values = pd.Series(pd.unique(pd.Series(values).dropna()))
+    if values.empty:
+        return None
+    sample = values.sample(min(sample_size, len(values)), random_state=0).str.strip()
+    best, best_count = None, 0
+    for fmt in CANDIDATE_FORMATS:
+        count = int(pd.to_datetime(sample, format=fmt, errors='coerce').notna().sum())
+        if count > best_count:
+            best, best_count = fmt, count
+    return best
+
+
+class DateNormaliser:
+    """
+    Parse date strings by unique value.
+
+    fmt is a strptime format; if None it is detected from the first non-empty
+    values seen. Values that do not match the format become NaT. With
+    as_days=True, normalise() returns nullable Int32 day offsets from
+    1970-01-01 instead of datetime64[s].
+    """
+
+    def __init__(self, fmt=None, as_days=False):
+        self.fmt = fmt
+        self.as_days = as_days
+        self._parsed = pd.Series(dtype='datetime64[s]')
+
+    def _lookup(self, uniques):
+        missing = uniques[~uniques.isin(self._parsed.index)]
+        if len(missing):
+            if self.fmt is None:
+                self.fmt = detect_format(missing)
+            parsed = pd.to_datetime(pd.Series(missing).str.strip(), format=self.fmt, errors='coerce')
+            parsed = pd.Series(parsed.to_numpy().astype('datetime64[s]'), index=missing)
+            self._parsed = parsed if self._parsed.empty else pd.concat([self._parsed, parsed])
+        return self._parsed.reindex(uniques).to_numpy()
+
+    def normalise(self, values):
+        """Return a Series of parsed dates aligned with values."""
+        if pd.api.types.is_datetime64_any_dtype(values):
+            dates = values.to_numpy().astype('datetime64[s]')
+        else:
+            codes, uniques = pd.factorize(values)
+            parsed = self._lookup(pd.Index(uniques.astype(str)))
+            # Code -1 marks a missing value; point it at an appended NaT
+            dates = np.append(parsed, np.datetime64('NaT', 's'))[codes]
+        if self.as_days:
+            days = dates.astype('datetime64[D]')
+            offsets = pd.array(days.view(np.int64), dtype='Int64')
+            offsets[np.isnat(days)] = pd.NA
+            return pd.Series(offsets.astype('Int32'), index=values.index, name=values.name)
+        return pd.Series(dates, index=values.index, name=values.name)
+
+
+def normalise_dates(data, columns, fmt=None, as_days=False, normalisers=None):
+    """
+    Replace the given date columns of a DataFrame with parsed dates.
+
+    normalisers maps column -> DateNormaliser; pass the same dict for every
+    chunk of a file so each distinct value is only parsed once.
+    """
+    normalisers = {} if normalisers is None else normalisers
+    for column in columns:
+        if column in data.columns:
+            normaliser = normalisers.setdefault(column, DateNormaliser(fmt, as_days))
+            data[column] = normaliser.normalise(data[column])
+    return data
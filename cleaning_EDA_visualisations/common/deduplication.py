@@ -0,0 +1,168 @@
+"""
+Out-of-core, hash-partitioned duplicate detection.
+
+Rows are routed to one of num_partitions partitions by a hash of the whole row
+(or of a key column such as member_id). Partitions are buffered in memory and
+spilled to local disk once the buffers exceed the memory budget, then each
+partition is de-duplicated on its own. Every duplicate of a row lands in the
+same partition, so the counts are exact while memory stays bounded by the
+budget plus one partition.
+
+Usage (from cleaning_EDA_visualisations/):
+    python -m common.deduplication employment_history --key employment_id --output deduped.csv
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from common.data_loader import ChunkWriter, LoadStats, iter_chunks
+
+# Primary keys of the source tables (see ddl_bronze.sql)
+PRIMARY_KEYS = {
+    'superannuation_members': 'member_id',
+    'member_employers': 'relationship_id',
+    'employment_history': 'employment_id',
+}
+
+# Column used to remember each row's position in the input
+_SEQ = '__row_seq'
+
+
+class DuplicateDetector:
+    """
+    Count and remove duplicate rows from a stream of chunks.
+
+    key is a column name (or list of names) identifying a row; by default the
+    whole row is compared. The first occurrence of each row is kept. If the
+    input never exceeds the memory budget, output rows keep their input order;
+    otherwise they are emitted partition by partition, in input order within
+    each partition.
+    """
+
+    def __init__(self, key=None, memory_budget_mb=256, num_partitions=64, spill_dir=None, output_chunksize=100_000):
+        self.key = [key] if isinstance(key, str) else key
+        self.memory_budget = memory_budget_mb * 1024 * 1024
+        self.num_partitions = num_partitions
+        self.output_chunksize = output_chunksize
+        self.rows = 0
+        self.unique_rows = 0
+        self.spills = 0
+        self._spill_root = spill_dir
+        self._spill_dir = None
+        self._buffers = [[] for _ in range(num_partitions)]
+        self._buffered_bytes = 0
+        self._finished = False
+
+    def add(self, chunk):
+        """Route a chunk of rows to their hash partitions."""
+        if self._finished:
+            raise RuntimeError('Cannot add rows after iter_unique() has been called')
+        if chunk.empty:
+            return
+        chunk = chunk.assign(**{_SEQ: np.arange(self.rows, self.rows + len(chunk), dtype=np.int64)})
+        self.rows += len(chunk)
+        hashed = chunk[self.key] if self.key else chunk.drop(columns=_SEQ)
+        partitions = pd.util.hash_pandas_object(hashed, index=False).to_numpy() % self.num_partitions
+        for partition, rows in chunk.groupby(partitions, sort=False):
+            self._buffers[partition].append(rows)
+        self._buffered_bytes += int(chunk.memory_usage(deep=True).sum())
+        if self._buffered_bytes > self.memory_budget:
+            self._spill()
+
+    def _spill(self):
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='dedupe_', dir=self._spill_root)
+        for partition, frames in enumerate(self._buffers):
+            if frames:
+                path = os.path.join(self._spill_dir, f'part_{partition:04d}_{self.spills:06d}.pkl')
+                pd.concat(frames).to_pickle(path)
+        self._buffers = [[] for _ in range(self.num_partitions)]
+        self._buffered_bytes = 0
+        self.spills += 1
+
+    def _load_partition(self, partition):
+        frames = []
+        if self._spill_dir is not None:
+            prefix = f'part_{partition:04d}_'
+            for name in sorted(os.listdir(self._spill_dir)):
+                if name.startswith(prefix):
+                    frames.append(pd.read_pickle(os.path.join(self._spill_dir, name)))
+        frames.extend(self._buffers[partition])
+        self._buffers[partition] = []
+        return frames
+
+    def _dedupe(self, frames):
+        data = pd.concat(frames).sort_values(_SEQ, kind='stable')
+        subset = self.key or [column for column in data.columns if column != _SEQ]
+        data = data.drop_duplicates(subset=subset, keep='first')
+        self.unique_rows += len(data)
+        return data
+
+    def iter_unique(self):
+        """Yield the de-duplicated rows as a stream of DataFrames."""
+        self._finished = True
+        try:
+            if self.spills == 0:
+                # Everything fitted in memory, so de-duplicate in input order
+                frames = [frame for buffer in self._buffers for frame in buffer]
+                self._buffers = [[] for _ in range(self.num_partitions)]
+                if frames:
+                    data = self._dedupe(frames).drop(columns=_SEQ).reset_index(drop=True)
+                    for start in range(0, len(data), self.output_chunksize):
+                        yield data.iloc[start:start + self.output_chunksize].copy()
+            else:
+                for partition in range(self.num_partitions):
+                    frames = self._load_partition(partition)
+                    if frames:
+                        yield self._dedupe(frames).drop(columns=_SEQ).reset_index(drop=True)
+        finally:
+            self.close()
+
+    @property
+    def duplicates(self):
+        """Number of rows removed (exact once iter_unique() is exhausted)."""
+        return self.rows - self.unique_rows
+
+    def close(self):
+        """Remove any spill files."""
+        if self._spill_dir is not None:
+            shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Remove duplicate rows from a source table in bounded memory.')
+    parser.add_argument('table', choices=list(PRIMARY_KEYS))
+    parser.add_argument('--key', nargs='*', help='Key columns (default: compare whole rows)')
+    parser.add_argument('--memory-budget-mb', type=int, default=256)
+    parser.add_argument('--partitions', type=int, default=64)
+    parser.add_argument('--output', required=True, help='CSV file for the de-duplicated rows')
+    args = parser.parse_args()
+
+    stats = LoadStats(args.table)
+    with DuplicateDetector(key=args.key or None, memory_budget_mb=args.memory_budget_mb,
+                           num_partitions=args.partitions) as detector:
+        for chunk in iter_chunks(args.table, stats=stats):
+            detector.add(chunk)
+        writer = ChunkWriter(args.output)
+        for chunk in detector.iter_unique():
+            writer.write(chunk)
+    stats.report()
+    print(f'Rows read: {detector.rows}')
+    print(f'Duplicates removed: {detector.duplicates}')
+    print(f'De-duplicated data saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
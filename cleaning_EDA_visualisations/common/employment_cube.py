@@ -0,0 +1,318 @@
+"""
+Pre-aggregated cube of employment starts and ends.
+
+EmploymentCube holds one cell per month × position_title × employment_type ×
+employer_id with the number of employments that started and ended in it.
+Heatmaps and trend lines are rolled up from the cells (month to quarter or
+year, dropping dimensions) instead of being grouped from the raw rows on every
+run. Cells are stored compactly: months as int32 offsets from 1970-01, the
+text dimensions as categoricals and the counts as int32. The partial cells of
+each chunk are kept in a list and summed into the cube in one groupby when the
+cells are read (or once the list outgrows the cube), rather than re-grouping
+the whole cube for every chunk.
+
+Open-ended employments (missing or 9999-12-31 end dates) have no end event.
+
+Like the rest of the EDA, the cube counts de-duplicated rows: a row that
+repeats an earlier row of the file is skipped. The cube keeps a sorted 64-bit
+hash of every row it has counted, so rows appended later are checked against
+all the earlier ones without re-reading them. Missing values are not imputed
+(a missing end date means the employment has not ended).
+
+The cube of each source file is saved under CACHE_DIR/cube, in a file named
+after a hash of the file's path, together with the number of source bytes it
+covers and a hash of those bytes. load_cube() reuses it when the CSV's size
+and modification time are unchanged, folds in only the appended rows when
+the file has grown, and rebuilds it when earlier rows were edited.
+
+Usage (from cleaning_EDA_visualisations/):
+    python -m common.employment_cube
+"""
+
+import argparse
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from common.data_loader import CACHE_DIR, LoadStats, iter_chunks, table_path
+from common.dates import OPEN_ENDED, DateNormaliser
+
+CUBE_DIR = os.path.join(CACHE_DIR, 'cube')
+DIMENSIONS = ['month', 'position_title', 'employment_type', 'employer_id']
+MEASURES = ['starts', 'ends']
+
+# Months per period for each roll-up frequency
+_PERIOD_MONTHS = {'M': 1, 'Q': 3, 'Y': 12}
+_HASH_BLOCK = 8 * 1024 * 1024
+
+
+def _empty_cells():
+    return pd.DataFrame({
+        'month': pd.Series(dtype='int32'),
+        'position_title': pd.Series(dtype='category'),
+        'employment_type': pd.Series(dtype='category'),
+        'employer_id': pd.Series(dtype='Int64'),
+        'starts': pd.Series(dtype='int32'),
+        'ends': pd.Series(dtype='int32'),
+    })
+
+
+class _RowHashes:
+    # Sorted runs of row hashes. Runs are merged while a run is no more than
+    # twice the size of the one after it, so there are O(log n) of them
+
+    def __init__(self, hashes=None):
+        self.runs = [] if hashes is None or not len(hashes) else [hashes]
+
+    def __len__(self):
+        return sum(len(run) for run in self.runs)
+
+    def contains(self, hashes):
+        found = np.zeros(len(hashes), dtype=bool)
+        for run in self.runs:
+            positions = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+            found |= run[positions] == hashes
+        return found
+
+    def add(self, hashes):
+        if not len(hashes):
+            return
+        self.runs.append(np.sort(hashes))
+        while len(self.runs) > 1 and len(self.runs[-2]) <= 2 * len(self.runs[-1]):
+            last = self.runs.pop()
+            self.runs[-1] = np.sort(np.concatenate([self.runs[-1], last]), kind='stable')
+
+    def sorted(self):
+        if len(self.runs) > 1:
+            self.runs = [np.sort(np.concatenate(self.runs), kind='stable')]
+        return self.runs[0] if self.runs else np.empty(0, dtype=np.uint64)
+
+
+class EmploymentCube:
+    """Employment start and end counts by month, position, employment type and employer."""
+
+    def __init__(self):
+        self._cells = _empty_cells()
+        # Partial cells added since the cube was last consolidated
+        self._pending = []
+        self._pending_size = 0
+        self.rows = 0
+        self.duplicates = 0
+        # Hashes of the rows counted so far, to skip later duplicates of them
+        self._row_hashes = _RowHashes()
+        # Bytes of the source file folded in, their hash and the file's
+        # modification time when they were read (see load_cube)
+        self.source_bytes = 0
+        self.source_hash = None
+        self.source_mtime_ns = 0
+        self._dates = {}
+
+    def _months(self, chunk, column):
+        normaliser = self._dates.setdefault(column, DateNormaliser())
+        dates = normaliser.normalise(chunk[column]).to_numpy()
+        dates = np.where(dates >= OPEN_ENDED.to_datetime64(), np.datetime64('NaT'), dates)
+        months = dates.astype('datetime64[M]')
+        return pd.Series(months.astype(np.int64), index=chunk.index).where(~np.isnat(months))
+
+    def update(self, chunk):
+        """Add a chunk of employment_history rows, skipping rows already counted."""
+        self.rows += len(chunk)
+        hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+        repeated = pd.Series(hashes).duplicated().to_numpy() | self._row_hashes.contains(hashes)
+        if repeated.any():
+            self.duplicates += int(repeated.sum())
+            chunk, hashes = chunk[~repeated], hashes[~repeated]
+        self._row_hashes.add(hashes)
+        keys = chunk[DIMENSIONS[1:]]
+        counts = []
+        for measure, column in zip(MEASURES, ['start_date', 'end_date']):
+            events = keys.assign(month=self._months(chunk, column)).dropna(subset=['month'])
+            counts.append(events.groupby(DIMENSIONS, dropna=False, observed=True).size().rename(measure))
+        cells = pd.concat(counts, axis=1).fillna(0).reset_index()
+        self._add(cells)
+        return self
+
+    def merge(self, other):
+        """Fold in a cube built on other rows (rows counted by both are not removed)."""
+        self.rows += other.rows
+        self.duplicates += other.duplicates
+        self._row_hashes.add(other._row_hashes.sorted())
+        self._add(other.cells)
+        return self
+
+    @property
+    def cells(self):
+        """One row per cell, with every chunk added so far summed in."""
+        self._consolidate()
+        return self._cells
+
+    @cells.setter
+    def cells(self, cells):
+        self._cells = cells
+        self._pending = []
+        self._pending_size = 0
+
+    def _add(self, cells):
+        if cells.empty:
+            return
+        self._pending.append(cells[DIMENSIONS + MEASURES])
+        self._pending_size += len(cells)
+        if self._pending_size > max(len(self._cells), 1_000_000):
+            self._consolidate()
+
+    def _consolidate(self):
+        if not self._pending:
+            return
+        text = {'position_title': object, 'employment_type': object}
+        cells = pd.concat([self._cells.astype(text)] + [cells.astype(text) for cells in self._pending],
+                          ignore_index=True)
+        cells = cells.groupby(DIMENSIONS, dropna=False, sort=True)[MEASURES].sum().reset_index()
+        self.cells = cells.astype({
+            'month': 'int32', 'position_title': 'category', 'employment_type': 'category',
+            'employer_id': 'Int64', 'starts': 'int32', 'ends': 'int32',
+        })
+
+    def aggregate(self, by=(), measure='starts', freq='M'):
+        """
+        Roll the cube up to freq ('M', 'Q' or 'Y') and the dimensions in by.
+
+        Returns a DataFrame with a period column (the first day of each period),
+        one column per dimension in by, and the summed measure.
+        """
+        step = _PERIOD_MONTHS[freq]
+        months = self.cells['month'].to_numpy(dtype=np.int64)
+        periods = (months - months % step).astype('datetime64[M]').astype('datetime64[s]')
+        grouped = self.cells.assign(period=periods).groupby(['period'] + list(by), dropna=False, observed=True)
+        result = grouped[measure].sum().reset_index()
+        return result[result[measure] > 0].reset_index(drop=True)
+
+    def top(self, dimension, n=10, measure='starts'):
+        """The n values of a dimension with the largest total measure."""
+        totals = self.cells.groupby(dimension, observed=True)[measure].sum()
+        return totals.sort_values(ascending=False, kind='stable').head(n).index
+
+    def memory_usage(self):
+        return int(self.cells.memory_usage(deep=True).sum())
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f'{path}.{os.getpid()}.tmp.npz'
+        arrays = {}
+        for column in ['position_title', 'employment_type']:
+            values = self.cells[column].array
+            arrays[f'{column}_codes'] = values.codes
+            arrays[f'{column}_labels'] = np.asarray(values.categories, dtype=str)
+        employer_id = self.cells['employer_id']
+        np.savez(temp_path, month=self.cells['month'].to_numpy(),
+                 employer_id=employer_id.fillna(0).to_numpy(dtype='int64'),
+                 employer_id_missing=employer_id.isna().to_numpy(),
+                 starts=self.cells['starts'].to_numpy(), ends=self.cells['ends'].to_numpy(),
+                 rows=self.rows, duplicates=self.duplicates, row_hashes=self._row_hashes.sorted(),
+                 source_bytes=self.source_bytes, source_hash=str(self.source_hash or ''),
+                 source_mtime_ns=self.source_mtime_ns,
+                 **arrays)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        cube = cls()
+        with np.load(path) as saved:
+            cells = {'month': saved['month']}
+            for column in ['position_title', 'employment_type']:
+                cells[column] = pd.Categorical.from_codes(saved[f'{column}_codes'], categories=saved[f'{column}_labels'])
+            employer_id = pd.array(saved['employer_id'], dtype='Int64')
+            employer_id[saved['employer_id_missing']] = pd.NA
+            cells['employer_id'] = employer_id
+            cells['starts'] = saved['starts']
+            cells['ends'] = saved['ends']
+            cube.cells = pd.DataFrame(cells)[DIMENSIONS + MEASURES]
+            cube.rows = int(saved['rows'])
+            cube.duplicates = int(saved['duplicates'])
+            cube._row_hashes = _RowHashes(saved['row_hashes'])
+            cube.source_bytes = int(saved['source_bytes'])
+            cube.source_hash = str(saved['source_hash']) or None
+            cube.source_mtime_ns = int(saved['source_mtime_ns'])
+        return cube
+
+
+def cube_path(table='employment_history', source=None):
+    """Where the cube of a source file (default: the table's) is saved."""
+    source = os.path.abspath(source or table_path(table))
+    key = hashlib.blake2b(source.encode(), digest_size=8).hexdigest()
+    return os.path.join(CUBE_DIR, f'{table}_{key}.npz')
+
+
+def _prefix_hash(path, length):
+    # BLAKE2 hash of the first length bytes of a file
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while length > 0:
+            block = f.read(min(_HASH_BLOCK, length))
+            if not block:
+                break
+            digest.update(block)
+            length -= len(block)
+    return digest.hexdigest()
+
+
+def _ends_with_newline(path, length):
+    with open(path, 'rb') as f:
+        f.seek(length - 1)
+        return f.read(1) == b'\n'
+
+
+def load_cube(path=None, cache=True):
+    """
+    The cube for the employment_history source file, built or brought up to date.
+
+    Only rows appended since the saved cube was built are read. Any other
+    change to the file rebuilds the cube from scratch.
+    """
+    table = 'employment_history'
+    source = path or table_path(table)
+    stat = os.stat(source)
+    size = stat.st_size
+    saved_path = cube_path(table, source)
+    cube = None
+    if cache and os.path.exists(saved_path):
+        saved = EmploymentCube.load(saved_path)
+        if saved.source_bytes == size and saved.source_mtime_ns == stat.st_mtime_ns:
+            return saved
+        if (0 < saved.source_bytes < size and _ends_with_newline(source, saved.source_bytes)
+                and saved.source_hash == _prefix_hash(source, saved.source_bytes)):
+            cube = saved
+
+    stats = LoadStats(table)
+    if cube is None:
+        cube = EmploymentCube()
+        chunks = iter_chunks(table, path=path, stats=stats)
+    else:
+        chunks = iter_chunks(table, path=source, byte_range=(cube.source_bytes, size), stats=stats)
+    for chunk in chunks:
+        cube.update(chunk)
+    stats.report()
+    cube.source_bytes = size
+    cube.source_hash = _prefix_hash(source, size)
+    cube.source_mtime_ns = stat.st_mtime_ns
+    if cache:
+        cube.save(saved_path)
+    return cube
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build or update the employment start/end cube.')
+    parser.add_argument('--rebuild', action='store_true', help='Ignore the saved cube')
+    args = parser.parse_args()
+
+    if args.rebuild and os.path.exists(cube_path()):
+        os.remove(cube_path())
+    cube = load_cube()
+    print(f'Rows folded in: {cube.rows} ({cube.duplicates} duplicates skipped)')
+    print(f'Cells: {len(cube.cells)} ({cube.memory_usage() / 1024:.1f} KiB)')
+    print(f'Saved to {cube_path()}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Member features derived exactly as in the gold layer (see create_gold.sql).
+
+The functions reproduce the DIM_MEMBER and fact table expressions on
+DataFrames, so segment-level results can be computed offline and agree with
+the warehouse. Everything is vectorised: bins are assigned with
+np.searchsorted or np.select over whole columns, and the segments are
+returned as categoricals with the gold labels.
+
+Age follows Snowflake's DATEDIFF('year', date_of_birth, CURRENT_DATE()),
+which counts calendar-year boundaries: the as-of year minus the birth year,
+whether or not the birthday has passed. The as-of date is always passed in
+explicitly, standing in for CURRENT_DATE().
+
+SQL CASE semantics are kept, including NULLs falling through to the ELSE
+branch: a missing (or under-18) age is '65+' in age_group, for example.
+"""
+
+import numpy as np
+import pandas as pd
+
+AGE_GROUPS = ['18-24', '25-34', '35-44', '45-54', '55-64', '65+']
+# Lower bounds of the age groups; ages below 18 fall to the ELSE branch ('65+')
+_AGE_GROUP_EDGES = [18, 25, 35, 45, 55, 65]
+_AGE_GROUP_CODES = np.array([5, 0, 1, 2, 3, 4, 5])
+
+LIFE_STAGES = ['Early Career/Student', 'Peak Earning', 'Pre-Retirement/Retirement', 'Unknown']
+BALANCE_TIERS = ['Low', 'Medium', 'High', 'Premium']
+INSURANCE_LEVELS = ['low-insured', 'mid-insured', 'high-insured']
+
+
+def _values(values):
+    return pd.Series(values).to_numpy(dtype='float64', na_value=np.nan)
+
+
+def _categorical(codes, labels, index):
+    return pd.Series(pd.Categorical.from_codes(codes, categories=labels), index=index)
+
+
+def age(date_of_birth, as_of):
+    """Age in years as DATEDIFF('year', date_of_birth, as_of) computes it (float, NaN if unknown)."""
+    dates = pd.Series(date_of_birth)
+    birth_year = dates.to_numpy(dtype='datetime64[s]').astype('datetime64[Y]')
+    years = birth_year.astype('int64').astype('float64') + 1970
+    years[np.isnat(birth_year)] = np.nan
+    return pd.Series(pd.Timestamp(as_of).year - years, index=dates.index, name='age')
+
+
+def age_group(ages):
+    """AGE_GROUP: 18-24, 25-34, 35-44, 45-54, 55-64, else 65+."""
+    values = _values(ages)
+    # NaN sorts after every edge, so it lands in the last bin ('65+') as in SQL
+    bins = np.searchsorted(_AGE_GROUP_EDGES, values, side='right')
+    return _categorical(_AGE_GROUP_CODES[bins], AGE_GROUPS, pd.Series(ages).index)
+
+
+def life_stage(ages):
+    """LIFE_STAGE: under 30, 30-49, 50 and over, else Unknown."""
+    values = _values(ages)
+    codes = np.searchsorted([30, 50], values, side='right')
+    codes[np.isnan(values)] = 3
+    return _categorical(codes, LIFE_STAGES, pd.Series(ages).index)
+
+
+def balance_tier(super_balance):
+    """BALANCE_TIER from the super balance."""
+    values = _values(super_balance)
+    codes = np.select([values < 50_000,
+                       (values >= 50_000) & (values <= 200_000),
+                       (values >= 200_001) & (values <= 500_000)],
+                      [0, 1, 2], default=3)
+    return _categorical(codes, BALANCE_TIERS, pd.Series(super_balance).index)
+
+
+def insurance_level(insurance_coverage):
+    """INSURANCE_LEVEL from the insurance coverage."""
+    values = _values(insurance_coverage)
+    codes = np.select([values < 100_000, (values >= 100_000) & (values <= 500_000)], [0, 1], default=2)
+    return _categorical(codes, INSURANCE_LEVELS, pd.Series(insurance_coverage).index)
+
+
+def combined_contribution_rate(data):
+    """COMBINED_CONTRIBUTION_RATE: employer plus employee rate."""
+    return data['employer_contribution_rate'] + data['employee_contribution_rate']
+
+
+def member_features(data, as_of):
+    """
+    Add age, age_group, life_stage, balance_tier, insurance_level and
+    combined_contribution_rate to a superannuation_members DataFrame.
+
+    date_of_birth must already be parsed (see dates.py). Returns a new
+    DataFrame; the input is not modified.
+    """
+    ages = age(data['date_of_birth'], as_of)
+    return data.assign(
+        age=ages,
+        age_group=age_group(ages),
+        life_stage=life_stage(ages),
+        balance_tier=balance_tier(data['super_balance']),
+        insurance_level=insurance_level(data['insurance_coverage']),
+        combined_contribution_rate=combined_contribution_rate(data),
+    )
@@ -0,0 +1,128 @@
+"""
+Two-phase streaming imputation of missing values.
+
+Phase one streams the chunks through Imputer.partial_fit(), which keeps an
+exact sum and count for numeric columns and a Space-Saving sketch of value
+counts for object columns (exact for low-cardinality columns, approximate for
+high-cardinality ones). Phase two fills every column of a chunk in a single
+vectorised fillna() call. Fill values are saved as JSON next to the source
+signature, so later runs reuse them until the CSV changes (see ImputeStage
+in pipeline.py, which skips phase one when they match).
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from common.data_loader import CACHE_DIR, source_signature
+from common.sketches import SpaceSaving
+
+
+class Imputer:
+    """Collects mean/mode statistics over chunks and fills missing values."""
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self._sums = {}
+        self._counts = {}
+        self._integer = {}
+        self._sketches = {}
+        self._fill_values = None
+
+    def partial_fit(self, chunk):
+        """Phase one: add a chunk's values to the running statistics."""
+        self._fill_values = None
+        for column in chunk.columns:
+            values = chunk[column]
+            if values.dtype == 'object':
+                sketch = self._sketches.setdefault(column, SpaceSaving(self.capacity))
+                sketch.update(values)
+            elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+                self._sums[column] = self._sums.get(column, 0.0) + float(values.sum())
+                self._counts[column] = self._counts.get(column, 0) + int(values.count())
+                self._integer[column] = pd.api.types.is_integer_dtype(values)
+        return self
+
+    def merge(self, other):
+        """Fold statistics collected by another Imputer (e.g. another worker)."""
+        self._fill_values = None
+        for column, total in other._sums.items():
+            self._sums[column] = self._sums.get(column, 0.0) + total
+            self._counts[column] = self._counts.get(column, 0) + other._counts[column]
+            self._integer[column] = other._integer[column]
+        for column, sketch in other._sketches.items():
+            self._sketches.setdefault(column, SpaceSaving(self.capacity)).merge(sketch)
+        return self
+
+    @property
+    def fill_values(self):
+        """Column -> value used to fill missing entries (mean or mode)."""
+        if self._fill_values is None:
+            values = {}
+            for column, count in self._counts.items():
+                if count:
+                    mean_value = self._sums[column] / count
+                    # Integer columns cannot hold a fractional mean
+                    values[column] = int(round(mean_value)) if self._integer[column] else mean_value
+            for column, sketch in self._sketches.items():
+                mode_value = sketch.mode()
+                if mode_value is not None:
+                    values[column] = mode_value
+            self._fill_values = values
+        return self._fill_values
+
+    def transform(self, chunk):
+        """Phase two: fill missing values in one vectorised pass."""
+        fills = {column: value for column, value in self.fill_values.items() if column in chunk.columns}
+        return chunk.fillna(fills)
+
+    def to_dict(self):
+        fills = {column: value.item() if isinstance(value, np.generic) else value
+                 for column, value in self.fill_values.items()}
+        approximate = [column for column, sketch in self._sketches.items() if not sketch.exact]
+        return {'fill_values': fills, 'approximate_modes': approximate}
+
+    def save(self, path, signature=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        params = self.to_dict()
+        params['source'] = signature
+        # Written atomically, so a job reading the saved values never sees a partial file
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(params, f, indent=2)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """Build an Imputer from saved fill values (it can transform but not be refitted)."""
+        with open(path) as f:
+            params = json.load(f)
+        imputer = cls()
+        imputer._fill_values = params['fill_values']
+        return imputer
+
+
+def params_path(table, after=()):
+    """
+    Default location of the saved fill values for a table. after names the
+    cleaning stages the values were fitted after (e.g. ['duplicates']), as
+    they differ from values fitted on the raw rows.
+    """
+    suffix = '_after_' + '_'.join(after) if after else ''
+    return os.path.join(CACHE_DIR, f'imputation_{table}{suffix}.json')
+
+
+def load_params(table, path=None):
+    """Return a saved Imputer for a table if it matches the current source file, else None."""
+    path = path or params_path(table)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        saved_source = json.load(f).get('source')
+    if saved_source != source_signature(table):
+        return None
+    return Imputer.load(path)
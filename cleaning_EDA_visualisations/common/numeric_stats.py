@@ -0,0 +1,67 @@
+"""
+Streaming describe() statistics for the numeric columns of a table.
+
+DataFrame.describe() needs every numeric column in memory and sorts each one
+for its quartiles. NumericStats builds the same eight statistics chunk by
+chunk: the count, mean and standard deviation from running moments, and the
+minimum, quartiles and maximum from a KLL quantile sketch (see sketches.py).
+The minimum and maximum are exact; the quartiles are exact until a column has
+outgrown the sketch and approximate (to about 1.7 / k of the rank) after that.
+Partial statistics from separate chunks or worker processes are merged.
+
+Usage:
+    stats = NumericStats(numeric_columns('member_employers'))
+    for chunk in iter_chunks('member_employers'):
+        stats.update(chunk)
+    print(stats.describe())
+"""
+
+import pandas as pd
+
+from common.sketches import KLLSketch, Moments
+
+# Row labels of DataFrame.describe() for numeric columns
+STATISTICS = ['count', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+
+class NumericStats:
+    """Mergeable describe() statistics for several numeric columns."""
+
+    def __init__(self, columns, k=1000, seed=0):
+        self.columns = list(columns)
+        self.moments = {column: Moments() for column in self.columns}
+        # Seeded, so the same data gives the same quartiles on every run
+        self.sketches = {column: KLLSketch(k, seed) for column in self.columns}
+
+    def update(self, chunk):
+        """Add a chunk's rows."""
+        for column in self.columns:
+            self.moments[column].update(chunk[column])
+            self.sketches[column].update(chunk[column])
+        return self
+
+    def merge(self, other):
+        """Fold another NumericStats over the same columns into this one."""
+        for column in self.columns:
+            self.moments[column].merge(other.moments[column])
+            self.sketches[column].merge(other.sketches[column])
+        return self
+
+    def summary(self, column):
+        """describe() of one column as a Series."""
+        moments, sketch = self.moments[column], self.sketches[column]
+        empty = moments.count == 0
+        q1, median, q3 = sketch.quantile([0.25, 0.5, 0.75])
+        # Sample standard deviation, as describe() reports
+        values = [moments.count, float('nan') if empty else moments.mean, moments.std(ddof=1),
+                  float('nan') if empty else sketch.min, q1, median, q3, float('nan') if empty else sketch.max]
+        return pd.Series(values, index=STATISTICS, dtype='float64', name=column)
+
+    def describe(self):
+        """A DataFrame laid out like DataFrame.describe() for numeric columns."""
+        return pd.DataFrame({column: self.summary(column) for column in self.columns}, index=STATISTICS)
+
+    @property
+    def approximate_columns(self):
+        """Columns whose quartiles are estimates."""
+        return [column for column in self.columns if not self.sketches[column].exact]
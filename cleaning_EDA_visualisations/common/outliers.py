@@ -0,0 +1,180 @@
+"""
+Two-pass streaming outlier detection.
+
+The first pass folds every chunk into per-column moments (Welford) and a KLL
+quantile sketch, so the mean, standard deviation and approximate Q1/Q3 of a
+column are known without holding the file in memory. The second pass flags
+rows outside the Z-score or IQR bounds; flagged rows can be removed, marked,
+or written to a separate quarantine file for review.
+
+Usage (from cleaning_EDA_visualisations/):
+    python -m common.outliers superannuation_members --method iqr \\
+        --output screened.csv --quarantine quarantine.csv
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from common.data_loader import ChunkWriter, LoadStats, iter_chunks
+from common.sketches import KLLSketch, Moments
+
+# Measure columns screened for outliers in each table
+OUTLIER_COLUMNS = {
+    'employment_history': ['final_salary'],
+    'member_employers': ['avg_salary'],
+    'superannuation_members': ['salary', 'super_balance'],
+}
+
+# Default cut-off for each method: |z| above 3, or 1.5 IQRs beyond the quartiles
+DEFAULT_THRESHOLDS = {'zscore': 3.0, 'iqr': 1.5}
+
+
+class OutlierDetector:
+    """
+    Collects per-column statistics over chunks and flags outlying rows.
+
+    method is 'zscore' or 'iqr' and threshold defaults to DEFAULT_THRESHOLDS;
+    both can be overridden per call to bounds() or flag(). A row is flagged
+    when any of its screened columns falls outside the bounds (nulls are never
+    flagged). The quartile sketches are seeded with seed, so the IQR bounds,
+    and the rows they flag, are the same on every run over the same data.
+    """
+
+    def __init__(self, columns, method='zscore', threshold=None, k=200, seed=0):
+        if method not in DEFAULT_THRESHOLDS:
+            raise ValueError(f'Unknown outlier method: {method}')
+        self.columns = list(columns)
+        self.method = method
+        self.threshold = threshold
+        self.seed = seed
+        self.moments = {column: Moments() for column in self.columns}
+        self.sketches = {column: KLLSketch(k, seed) for column in self.columns}
+        self.flagged = dict.fromkeys(self.columns, 0)
+
+    def update(self, chunk):
+        """First pass: add a chunk's values to the running statistics."""
+        for column in self.columns:
+            values = chunk[column]
+            self.moments[column].update(values)
+            self.sketches[column].update(values)
+        return self
+
+    def merge(self, other):
+        """Fold statistics collected by another detector (e.g. another worker)."""
+        for column in self.columns:
+            self.moments[column].merge(other.moments[column])
+            self.sketches[column].merge(other.sketches[column])
+        return self
+
+    def bounds(self, method=None, threshold=None):
+        """Column -> (lower, upper) bounds outside which values are outliers."""
+        method = method or self.method
+        if threshold is None:
+            threshold = self.threshold if method == self.method and self.threshold is not None \
+                else DEFAULT_THRESHOLDS[method]
+        bounds = {}
+        for column in self.columns:
+            if method == 'zscore':
+                # Population standard deviation, as scipy.stats.zscore and np.std
+                mean, std = self.moments[column].mean, self.moments[column].std()
+                bounds[column] = (mean - threshold * std, mean + threshold * std)
+            else:
+                q1, q3 = self.sketches[column].quantile([0.25, 0.75])
+                iqr = q3 - q1
+                bounds[column] = (q1 - threshold * iqr, q3 + threshold * iqr)
+        return bounds
+
+    def column_flags(self, chunk, method=None, threshold=None):
+        """DataFrame of booleans marking the outlying values of each screened column."""
+        flags = {}
+        for column, (lower, upper) in self.bounds(method, threshold).items():
+            values = chunk[column].to_numpy(dtype='float64', na_value=np.nan)
+            if np.isnan(lower) or np.isnan(upper) or lower == upper:
+                flags[column] = np.zeros(len(chunk), dtype=bool)
+            else:
+                flags[column] = (values < lower) | (values > upper)
+        return pd.DataFrame(flags, index=chunk.index)
+
+    def _counted_flags(self, chunk, method, threshold):
+        flags = self.column_flags(chunk, method, threshold)
+        for column in self.columns:
+            self.flagged[column] += int(flags[column].sum())
+        return flags
+
+    def flag(self, chunk, method=None, threshold=None):
+        """Second pass: boolean array, True for rows with any outlying value."""
+        return self._counted_flags(chunk, method, threshold).any(axis=1).to_numpy()
+
+    def split(self, chunk, method=None, threshold=None):
+        """Return (kept rows, flagged rows), with an outlier_columns reason on the flagged rows."""
+        flags = self._counted_flags(chunk, method, threshold)
+        mask = flags.any(axis=1).to_numpy()
+        flagged = chunk[mask].copy()
+        # e.g. 'salary;super_balance' for a row outlying in both columns
+        labels = pd.Series([f'{column};' for column in self.columns], index=self.columns)
+        flagged['outlier_columns'] = flags[mask].dot(labels).astype(str).str.rstrip(';')
+        return chunk[~mask], flagged
+
+    def summary(self, method=None, threshold=None):
+        """Per-column statistics, bounds and counts of flagged values."""
+        bounds = self.bounds(method, threshold)
+        rows = {}
+        for column in self.columns:
+            q1, q3 = self.sketches[column].quantile([0.25, 0.75])
+            rows[column] = {
+                'count': self.moments[column].count,
+                'mean': self.moments[column].mean,
+                'std': self.moments[column].std(),
+                'q1': q1,
+                'q3': q3,
+                'lower': bounds[column][0],
+                'upper': bounds[column][1],
+                'flagged': self.flagged[column],
+            }
+        return pd.DataFrame.from_dict(rows, orient='index')
+
+
+def screen_table(table, columns=None, method='zscore', threshold=None, output_path=None, quarantine_path=None):
+    """
+    Stream a table twice: collect the statistics, then split rows into kept
+    and quarantined outputs (either path may be None to skip that file).
+    """
+    detector = OutlierDetector(columns or OUTLIER_COLUMNS[table], method, threshold)
+    stats = LoadStats(table)
+    for chunk in iter_chunks(table, stats=stats):
+        detector.update(chunk)
+
+    writer = ChunkWriter(output_path) if output_path else None
+    quarantine = ChunkWriter(quarantine_path) if quarantine_path else None
+    for chunk in iter_chunks(table):
+        kept, flagged = detector.split(chunk)
+        if writer is not None:
+            writer.write(kept)
+        if quarantine is not None:
+            quarantine.write(flagged)
+    stats.report()
+    return detector
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Flag outliers in a source table in two streaming passes.')
+    parser.add_argument('table', choices=list(OUTLIER_COLUMNS))
+    parser.add_argument('--columns', nargs='*', help='Columns to screen (default: the table\'s measure columns)')
+    parser.add_argument('--method', choices=list(DEFAULT_THRESHOLDS), default='zscore')
+    parser.add_argument('--threshold', type=float, help='Z-score or IQR multiple (default: 3 or 1.5)')
+    parser.add_argument('--output', help='CSV file for the rows that are kept')
+    parser.add_argument('--quarantine', help='CSV file for the flagged rows')
+    args = parser.parse_args()
+
+    detector = screen_table(args.table, args.columns, args.method, args.threshold, args.output, args.quarantine)
+    print(detector.summary())
+    if args.output:
+        print(f'Screened data saved to {args.output}')
+    if args.quarantine:
+        print(f'Flagged rows saved to {args.quarantine}')
+
+
+if __name__ == '__main__':
+    main()
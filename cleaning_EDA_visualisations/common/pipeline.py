@@ -0,0 +1,344 @@
+"""
+In-process cleaning pipeline for the source tables.
+
+The cleaning steps (duplicates -> missing values -> formats -> outliers) run as
+stages over one read of the source file, handing chunks from stage to stage
+in memory and writing a single cleaned CSV per table.
+
+Each stage observes the data as the stages before it leave it, as when the
+steps were chained one after another: the de-duplication stage partitions
+the source rows while they are streamed (and profiled), the imputation stage
+collects its means and modes over the unique rows, and the outlier stage its
+statistics over the unique, imputed and formatted rows. That takes one pass
+per observing stage. Only the first reads the source file; the later ones
+replay the unique rows, which the de-duplication stage keeps in memory while
+they fit its budget and in spill files otherwise. A last pass hands the
+unique rows through every stage's transform() and into the output file, or
+to the caller with iter_cleaned().
+
+The imputation stage saves its fill values, and later runs (such as the EDA
+scripts after the clean job) reuse them without a pass of their own while
+the source file is unchanged.
+
+Usage (from cleaning_EDA_visualisations/):
+    python -m common.pipeline                      # all tables, all stages
+    python -m common.pipeline employment_history --until missing_values
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from common.categoricals import CATEGORICAL_COLUMNS, normalise_strings
+from common.data_loader import TABLE_SCHEMAS, ChunkWriter, LoadStats, iter_chunks, source_signature
+from common.dates import DATE_COLUMNS, normalise_dates
+from common.deduplication import DuplicateDetector
+from common.imputation import Imputer, load_params, params_path
+from common.outliers import OUTLIER_COLUMNS, OutlierDetector
+from common.profiler import TableProfile
+
+CLEANING_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Order in which the cleaning steps are applied
+STAGE_ORDER = ['duplicates', 'missing_values', 'formats', 'outliers']
+
+
+class Stage:
+    """
+    A cleaning step. If observes is set, observe() is shown every chunk as the
+    earlier stages output it and finish() is called after the last one, unless
+    restore() could load what it learns from an earlier run; transform() then
+    cleans the chunks on their way to the output.
+    """
+
+    name = None
+    observes = False
+
+    def restore(self, upstream):
+        """Load state saved after the stages named in upstream; True if observe() can be skipped."""
+        return False
+
+    def observe(self, chunk):
+        pass
+
+    def finish(self):
+        pass
+
+    def transform(self, chunk):
+        return chunk
+
+    def report(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class DeduplicateStage(Stage):
+    """Removes duplicate rows across the whole file (see deduplication.py)."""
+
+    name = 'duplicates'
+    observes = True
+
+    def __init__(self, key=None, memory_budget_mb=256):
+        self.detector = DuplicateDetector(key=key, memory_budget_mb=memory_budget_mb)
+        self._unique = []
+        self._unique_dir = None
+
+    def observe(self, chunk):
+        self.detector.add(chunk)
+
+    def finish(self):
+        # The later stages read the unique rows once per pass, so they are kept:
+        # in memory if the input fitted the memory budget, else in spill files
+        if self.detector.spills:
+            self._unique_dir = tempfile.mkdtemp(prefix='unique_')
+        for number, chunk in enumerate(self.detector.iter_unique()):
+            if self._unique_dir is None:
+                self._unique.append(chunk)
+            else:
+                path = os.path.join(self._unique_dir, f'unique_{number:06d}.pkl')
+                chunk.to_pickle(path)
+                self._unique.append(path)
+
+    def iter_unique(self):
+        """Yield the unique rows; can be called once per pass."""
+        for chunk in self._unique:
+            # Later stages may change columns in place, so every pass gets its own frames
+            yield pd.read_pickle(chunk) if isinstance(chunk, str) else chunk.copy(deep=False)
+
+    def close(self):
+        self._unique = []
+        if self._unique_dir is not None:
+            shutil.rmtree(self._unique_dir, ignore_errors=True)
+            self._unique_dir = None
+
+    def report(self):
+        if self.detector.duplicates > 0:
+            print(f'Duplicates removed: {self.detector.duplicates}')
+        else:
+            print('No duplicates found.')
+
+
+class ImputeStage(Stage):
+    """
+    Fills missing values with whole-file means and modes (see imputation.py).
+
+    The fill values are saved for the source file and reused, without a pass
+    over the rows, while the file is unchanged (set reuse=False to refit).
+    """
+
+    name = 'missing_values'
+    observes = True
+
+    def __init__(self, table, reuse=True):
+        self.table = table
+        self.reuse = reuse
+        self.imputer = Imputer()
+        self.path = params_path(table)
+        self.reused = False
+
+    def restore(self, upstream):
+        self.path = params_path(self.table, upstream)
+        saved = load_params(self.table, self.path) if self.reuse else None
+        if saved is not None:
+            self.imputer = saved
+            self.reused = True
+        return self.reused
+
+    def observe(self, chunk):
+        self.imputer.partial_fit(chunk)
+
+    def finish(self):
+        self.imputer.save(self.path, source_signature(self.table))
+
+    def transform(self, chunk):
+        return self.imputer.transform(chunk)
+
+    def report(self):
+        if self.reused:
+            print(f'Missing values filled with the values saved in {self.path}')
+
+
+class FormatStage(Stage):
+    """Standardises date and string formats for a table."""
+
+    name = 'formats'
+
+    def __init__(self, table):
+        self.table = table
+        # One normaliser per date column, shared by every chunk of the file
+        self._date_normalisers = {}
+
+    def transform(self, chunk):
+        # Standardizing date formats (kept as datetime64 columns)
+        chunk = normalise_dates(chunk, DATE_COLUMNS[self.table], normalisers=self._date_normalisers)
+        if self.table != 'employment_history':
+            # Standardizing string formats (enumerated columns per category, not per row)
+            chunk = normalise_strings(chunk, CATEGORICAL_COLUMNS[self.table])
+        return chunk
+
+
+class OutlierStage(Stage):
+    """Removes (or marks) outlying rows and writes them to a quarantine file (see outliers.py)."""
+
+    name = 'outliers'
+    observes = True
+
+    def __init__(self, columns, method='zscore', threshold=None, action='remove', quarantine_path=None):
+        self.detector = OutlierDetector(columns, method, threshold)
+        self.action = action
+        self.quarantine = ChunkWriter(quarantine_path) if quarantine_path else None
+        self.removed = 0
+
+    def observe(self, chunk):
+        self.detector.update(chunk)
+
+    def transform(self, chunk):
+        kept, flagged = self.detector.split(chunk)
+        if self.quarantine is not None:
+            self.quarantine.write(flagged)
+        self.removed += len(flagged)
+        if self.action == 'flag':
+            return chunk.assign(is_outlier=~chunk.index.isin(kept.index))
+        return kept
+
+    def report(self):
+        print(f'Outliers {"flagged" if self.action == "flag" else "removed"}: {self.removed}')
+        print(self.detector.summary())
+        if self.quarantine is not None:
+            print(f'Flagged rows saved to {self.quarantine.path}')
+
+
+def build_stages(table, until=None, quarantine_path=None):
+    """The table's cleaning stages in order, stopping after the stage named until."""
+    stages = []
+    for name in STAGE_ORDER:
+        if name == 'duplicates':
+            stages.append(DeduplicateStage())
+        elif name == 'missing_values':
+            stages.append(ImputeStage(table))
+        elif name == 'formats':
+            stages.append(FormatStage(table))
+        elif name == 'outliers':
+            stages.append(OutlierStage(OUTLIER_COLUMNS[table], quarantine_path=quarantine_path or default_quarantine_path(table)))
+        if name == until:
+            break
+    return stages
+
+
+def default_output_path(table):
+    return os.path.join(CLEANING_ROOT, table, 'cleaning_files', f'cleaned_{table}.csv')
+
+
+def default_quarantine_path(table):
+    return os.path.join(CLEANING_ROOT, table, 'cleaning_files', f'quarantine_{table}.csv')
+
+
+class Pipeline:
+    """Runs a list of stages over a table and writes one cleaned CSV."""
+
+    def __init__(self, table, stages, output_path=None):
+        self.table = table
+        self.stages = stages
+        self.output_path = output_path or default_output_path(table)
+        self.profile = TableProfile(table)
+        self.stats = LoadStats(table)
+        self.timings = dict.fromkeys([stage.name for stage in stages], 0.0)
+        self._profiled = False
+
+    def _source(self):
+        # The first read of the source file is profiled
+        profile = not self._profiled
+        for chunk in iter_chunks(self.table, stats=self.stats if profile else None):
+            if profile:
+                self.profile.update(chunk)
+            yield chunk
+        self._profiled = True
+
+    def _chunks(self, until):
+        # Chunks as the first until stages output them
+        stages = self.stages[:until]
+        dedupe = next((stage for stage in stages if isinstance(stage, DeduplicateStage)), None)
+        if dedupe is not None:
+            # Its unique rows already went through the stages before it
+            chunks = dedupe.iter_unique()
+            stages = stages[stages.index(dedupe) + 1:]
+        else:
+            chunks = self._source()
+        for chunk in chunks:
+            for stage in stages:
+                started = time.perf_counter()
+                chunk = stage.transform(chunk)
+                self.timings[stage.name] += time.perf_counter() - started
+            yield chunk
+
+    def fit(self):
+        """Let each observing stage see the output of the stages before it (one pass each)."""
+        try:
+            for index, stage in enumerate(self.stages):
+                upstream = [earlier.name for earlier in self.stages[:index]]
+                if stage.observes and not stage.restore(upstream):
+                    for chunk in self._chunks(index):
+                        started = time.perf_counter()
+                        stage.observe(chunk)
+                        self.timings[stage.name] += time.perf_counter() - started
+                    stage.finish()
+        except Exception:
+            # Nothing can be read from a half-fitted pipeline, so its spill files go now
+            self.close()
+            raise
+        return self
+
+    def iter_cleaned(self):
+        """Yield the cleaned chunks (after fit())."""
+        return self._chunks(len(self.stages))
+
+    def close(self):
+        for stage in self.stages:
+            stage.close()
+
+    def run(self):
+        try:
+            self.fit()
+            writer = ChunkWriter(self.output_path)
+            for chunk in self.iter_cleaned():
+                writer.write(chunk)
+            self.rows_written = writer.rows
+        finally:
+            self.close()
+        return self
+
+    def report(self):
+        self.profile.report()
+        for stage in self.stages:
+            stage.report()
+        for name, seconds in self.timings.items():
+            print(f'Stage {name}: {seconds:.2f}s')
+        self.stats.report()
+        print(f'Cleaned data ({self.rows_written} rows) saved to {self.output_path}')
+
+
+def run_pipeline(table, until=None, output_path=None, quarantine_path=None):
+    """Build, run and report the cleaning pipeline for a table."""
+    pipeline = Pipeline(table, build_stages(table, until, quarantine_path), output_path).run()
+    pipeline.report()
+    return pipeline
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Clean the source tables in a single in-process pipeline.')
+    parser.add_argument('tables', nargs='*', default=list(TABLE_SCHEMAS), help='Tables to clean')
+    parser.add_argument('--until', choices=STAGE_ORDER, help='Stop after this stage')
+    args = parser.parse_args()
+
+    for table in args.tables:
+        run_pipeline(table, until=args.until)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,324 @@
+"""
+Fast, incremental data-profiling reports for the source tables.
+
+A report profiles every column of a table and writes an HTML page and a JSON
+summary. There are three modes:
+
+    minimal   counts, missing values, distinct values, numeric summary
+              statistics and the most frequent values, over every row
+    sampled   minimal, plus quantiles, histograms, string lengths and a
+              correlation matrix, computed on a fixed sample of rows
+    full      the same as sampled, computed on every row, with Pearson and
+              Spearman correlations
+
+Each column profile is cached under CACHE_DIR/profiles/<table>/<settings>,
+keyed by a hash of the column's contents and the report settings, so a
+refresh only recomputes the columns whose values changed. Stale profiles are
+pruned per settings folder, so the caches of other modes and sample sizes are
+kept. Columns that do need recomputing are
+profiled in parallel on a process pool, each worker receiving just its column.
+
+Usage (from cleaning_EDA_visualisations/):
+    python -m common.profile_report --mode sampled --workers 4
+    python -m common.profile_report member_employers --mode full
+"""
+
+import argparse
+import hashlib
+import html
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from common.data_loader import CACHE_DIR, TABLE_SCHEMAS, LoadStats, read_table
+
+PROFILES_DIR = os.path.join(CACHE_DIR, 'profiles')
+MODES = ['minimal', 'sampled', 'full']
+DEFAULT_SAMPLE_SIZE = 100_000
+
+_QUANTILES = [0.05, 0.25, 0.5, 0.75, 0.95]
+_HISTOGRAM_BINS = 20
+_TOP_VALUES = 10
+
+
+def column_hash(values):
+    """BLAKE2 hash of a column's name, dtype and values."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f'{values.name}:{values.dtype}'.encode())
+    digest.update(pd.util.hash_pandas_object(values, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def sample_rows(data, sample_size, seed=0):
+    """A fixed sample of rows (the same positions for every column of the table)."""
+    if len(data) <= sample_size:
+        return data
+    positions = np.sort(np.random.default_rng(seed).choice(len(data), sample_size, replace=False))
+    return data.iloc[positions]
+
+
+def _number(value):
+    # JSON-safe float (None for NaN)
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def profile_column(values, mode='minimal'):
+    """Profile one column; values is already sampled for the sampled mode."""
+    present = values.dropna()
+    profile = {
+        'name': values.name,
+        'dtype': str(values.dtype),
+        'count': int(len(present)),
+        'missing': int(len(values) - len(present)),
+        'missing_pct': _number(100 * (len(values) - len(present)) / len(values)) if len(values) else 0.0,
+        'distinct': int(present.nunique()),
+    }
+    top = present.value_counts().head(_TOP_VALUES)
+    profile['top_values'] = [[str(value), int(count)] for value, count in top.items()]
+    numeric = pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values)
+    if numeric:
+        numbers = present.to_numpy(dtype='float64')
+        profile['numeric'] = {
+            'mean': _number(numbers.mean()) if len(numbers) else None,
+            'std': _number(numbers.std(ddof=1)) if len(numbers) > 1 else None,
+            'min': _number(numbers.min()) if len(numbers) else None,
+            'max': _number(numbers.max()) if len(numbers) else None,
+            'zeros': int(np.count_nonzero(numbers == 0)),
+        }
+    if mode == 'minimal':
+        return profile
+
+    if numeric and len(numbers):
+        profile['numeric']['quantiles'] = {str(q): _number(v) for q, v in zip(_QUANTILES, np.quantile(numbers, _QUANTILES))}
+        counts, edges = np.histogram(numbers, bins=_HISTOGRAM_BINS)
+        profile['histogram'] = {'counts': counts.tolist(), 'edges': [float(edge) for edge in edges]}
+    elif not numeric and len(present):
+        lengths = present.astype(str).str.len()
+        profile['length'] = {'min': int(lengths.min()), 'mean': _number(lengths.mean()), 'max': int(lengths.max())}
+    return profile
+
+
+def _cache_dir(table, mode, sample_size):
+    # One folder per mode (and sample size), e.g. profiles/member_employers/sampled-10000
+    settings = mode if sample_size is None else f'{mode}-{sample_size}'
+    return os.path.join(PROFILES_DIR, table, settings)
+
+
+def _cache_path(directory, column, key):
+    return os.path.join(directory, f'{column}-{key}.json')
+
+
+def _settings_key(values, mode, sample_size):
+    # The sample depends on the table length as well as the column's values
+    return hashlib.blake2b(f'{column_hash(values)}:{mode}:{sample_size}:{len(values)}'.encode(),
+                           digest_size=16).hexdigest()
+
+
+def _write_json(path, payload):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def _prune(directory, keep):
+    # Drop cached profiles (of the same settings) that no longer match any column of the table
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith('.json') and path not in keep:
+                os.remove(path)
+
+
+def correlations(data, mode):
+    """Pearson (and, in full mode, Spearman) correlation of the numeric columns."""
+    numeric = data.select_dtypes(include='number')
+    if mode == 'minimal' or numeric.shape[1] < 2:
+        return {}
+    methods = ['pearson', 'spearman'] if mode == 'full' else ['pearson']
+    result = {}
+    for method in methods:
+        matrix = numeric.corr(method=method).round(4)
+        result[method] = {'columns': list(matrix.columns),
+                          'values': [[_number(value) for value in row] for row in matrix.to_numpy()]}
+    return result
+
+
+class ProfileReport:
+    """Column profiles and correlations for one table, with per-column caching."""
+
+    def __init__(self, table, mode='minimal', sample_size=DEFAULT_SAMPLE_SIZE, workers=1, cache=True):
+        if mode not in MODES:
+            raise ValueError(f'Unknown mode: {mode}')
+        self.table = table
+        self.mode = mode
+        self.sample_size = sample_size
+        self.workers = workers
+        self.cache = cache
+        self.rows = 0
+        self.columns = {}
+        self.correlations = {}
+        self.recomputed = []
+
+    def build(self, data):
+        """Profile the columns of data, reusing cached profiles of unchanged columns."""
+        self.rows = len(data)
+        source = sample_rows(data, self.sample_size) if self.mode == 'sampled' else data
+        sample_size = self.sample_size if self.mode == 'sampled' else None
+        keys = {column: _settings_key(data[column], self.mode, sample_size) for column in data.columns}
+        directory = _cache_dir(self.table, self.mode, sample_size)
+        todo = []
+        for column in data.columns:
+            path = _cache_path(directory, column, keys[column])
+            if self.cache and os.path.exists(path):
+                with open(path) as f:
+                    self.columns[column] = json.load(f)
+            else:
+                todo.append(column)
+
+        if todo:
+            if self.workers > 1 and len(todo) > 1:
+                with ProcessPoolExecutor(max_workers=min(self.workers, len(todo))) as pool:
+                    profiles = pool.map(profile_column, [source[column] for column in todo], [self.mode] * len(todo))
+                    computed = dict(zip(todo, profiles))
+            else:
+                computed = {column: profile_column(source[column], self.mode) for column in todo}
+            for column in todo:
+                self.columns[column] = computed[column]
+                if self.cache:
+                    _write_json(_cache_path(directory, column, keys[column]), computed[column])
+        self.recomputed = todo
+        self.columns = {column: self.columns[column] for column in data.columns}
+
+        # Correlations are cached on the keys of all the columns, so they are
+        # only recomputed when some column changed
+        correlation_key = hashlib.blake2b(':'.join(keys[column] for column in data.columns).encode(),
+                                          digest_size=16).hexdigest()
+        correlation_path = _cache_path(directory, '_correlations', correlation_key)
+        if self.cache and os.path.exists(correlation_path):
+            with open(correlation_path) as f:
+                self.correlations = json.load(f)
+        else:
+            self.correlations = correlations(source, self.mode)
+            if self.cache:
+                _write_json(correlation_path, self.correlations)
+        if self.cache:
+            _prune(directory, {_cache_path(directory, column, keys[column]) for column in data.columns}
+                   | {correlation_path})
+        return self
+
+    def summary(self):
+        return {
+            'table': self.table,
+            'mode': self.mode,
+            'rows': self.rows,
+            'sample_size': min(self.sample_size, self.rows) if self.mode == 'sampled' else self.rows,
+            'columns': self.columns,
+            'correlations': self.correlations,
+        }
+
+    def to_json(self, path):
+        _write_json(path, self.summary())
+
+    def to_html(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(render_html(self.summary()))
+
+
+def _table(rows, header=None):
+    cells = ''.join(f'<tr>{"".join(f"<td>{html.escape(str(cell))}</td>" for cell in row)}</tr>' for row in rows)
+    head = f'<tr>{"".join(f"<th>{html.escape(str(cell))}</th>" for cell in header)}</tr>' if header else ''
+    return f'<table>{head}{cells}</table>'
+
+
+def _histogram(histogram):
+    # Inline bar chart, so the page needs no scripts or images
+    peak = max(histogram['counts']) or 1
+    bars = ''.join(f'<div class="bar" style="height:{100 * count / peak:.1f}%" title="{count}"></div>'
+                   for count in histogram['counts'])
+    edges = histogram['edges']
+    return f'<div class="hist">{bars}</div><div class="axis">{edges[0]:,.4g} &ndash; {edges[-1]:,.4g}</div>'
+
+
+def render_html(summary):
+    """A self-contained HTML page for a report summary."""
+    sections = []
+    for name, profile in summary['columns'].items():
+        rows = [['Type', profile['dtype']], ['Count', profile['count']],
+                ['Missing', f"{profile['missing']} ({profile['missing_pct']:.2f}%)"],
+                ['Distinct', profile['distinct']]]
+        for key, value in profile.get('numeric', {}).items():
+            if key == 'quantiles':
+                rows.extend([[f'Quantile {q}', f'{v:,.4g}' if v is not None else ''] for q, v in value.items()])
+            else:
+                rows.append([key.title(), f'{value:,.4g}' if isinstance(value, float) else value])
+        for key, value in profile.get('length', {}).items():
+            rows.append([f'Length {key}', f'{value:,.4g}' if isinstance(value, float) else value])
+        body = _table(rows)
+        if 'histogram' in profile:
+            body += _histogram(profile['histogram'])
+        if profile['top_values']:
+            body += _table(profile['top_values'], ['Value', 'Count'])
+        sections.append(f'<section><h2>{html.escape(str(name))}</h2>{body}</section>')
+    for method, matrix in summary['correlations'].items():
+        rows = [[column] + ['' if value is None else f'{value:.2f}' for value in values]
+                for column, values in zip(matrix['columns'], matrix['values'])]
+        sections.append(f'<section class="wide"><h2>{method.title()} correlation</h2>'
+                        f'{_table(rows, [""] + matrix["columns"])}</section>')
+    title = f"Profile of {summary['table']}"
+    overview = (f"{summary['rows']:,} rows, {len(summary['columns'])} columns, {summary['mode']} mode"
+                + (f" ({summary['sample_size']:,} sampled rows)" if summary['mode'] == 'sampled' else ''))
+    return f"""<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>
+<style>
+body {{ font-family: sans-serif; margin: 2em; }}
+section {{ display: inline-block; vertical-align: top; margin: 0 1.5em 1.5em 0; min-width: 18em; }}
+section.wide {{ display: block; }}
+table {{ border-collapse: collapse; margin-bottom: 0.5em; }}
+td, th {{ border: 1px solid #ddd; padding: 2px 6px; font-size: 0.9em; text-align: left; }}
+.hist {{ display: flex; align-items: flex-end; height: 60px; width: 18em; border-bottom: 1px solid #999; }}
+.bar {{ flex: 1; background: #4c78a8; margin-right: 1px; }}
+.axis {{ font-size: 0.8em; color: #666; margin-bottom: 0.5em; }}
+</style></head>
+<body><h1>{html.escape(title)}</h1><p>{html.escape(overview)}</p>
+{''.join(sections)}
+</body></html>
+"""
+
+
+def build_report(table, mode='minimal', sample_size=DEFAULT_SAMPLE_SIZE, workers=1, output_dir='data_profiling_EDA'):
+    """Profile a table and write profile_<table>.html and profile_<table>_summary.json."""
+    stats = LoadStats(table)
+    data = read_table(table, stats=stats)
+    stats.report()
+    report = ProfileReport(table, mode, sample_size, workers).build(data)
+    print(f'Profiled {table}: {len(report.recomputed)} of {len(report.columns)} columns recomputed')
+    report.to_html(os.path.join(output_dir, f'profile_{table}.html'))
+    report.to_json(os.path.join(output_dir, f'profile_{table}_summary.json'))
+    print(f'Report saved to {os.path.join(output_dir, f"profile_{table}.html")}')
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Write HTML and JSON profiling reports for the source tables.')
+    parser.add_argument('tables', nargs='*', default=list(TABLE_SCHEMAS), help='Tables to profile')
+    parser.add_argument('--mode', choices=MODES, default='minimal')
+    parser.add_argument('--sample-size', type=int, default=DEFAULT_SAMPLE_SIZE, help='Rows profiled in sampled mode')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes for the column profiles')
+    parser.add_argument('--output-dir', default='data_profiling_EDA', help='Folder for the reports')
+    args = parser.parse_args()
+
+    for table in args.tables:
+        build_report(table, args.mode, args.sample_size, args.workers, args.output_dir)
+
+
+if __name__ == '__main__':
+    main()
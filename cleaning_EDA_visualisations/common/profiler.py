@@ -0,0 +1,170 @@
+"""
+Single-pass, mergeable data-quality profiler for the source tables.
+
+A TableProfile holds the partial state for the metrics the cleaning scripts
+print (rows, columns, null counts, duplicate rows and dtypes). Profiles built
+from separate chunks or worker processes can be merged, so a table is profiled
+in one scan that can be split across cores.
+
+Usage (from cleaning_EDA_visualisations/):
+    python -m common.profiler --workers 4 --output-dir data_profiling_EDA
+"""
+
+import argparse
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from common.data_loader import TABLE_SCHEMAS, LoadStats, iter_chunks, split_byte_ranges
+
+
+class TableProfile:
+    """Mergeable data-quality metrics for one table."""
+
+    def __init__(self, table):
+        self.table = table
+        self.rows = 0
+        self.columns = []
+        self.null_counts = {}
+        self.dtypes = {}
+        # Row hashes are kept as sorted unique arrays plus a list of pending
+        # arrays that are compacted once they outgrow the unique set
+        self._unique_hashes = np.empty(0, dtype=np.uint64)
+        self._pending_hashes = []
+        self._pending_size = 0
+
+    def update(self, chunk):
+        """Add a chunk of rows to the profile."""
+        if not self.columns:
+            self.columns = list(chunk.columns)
+        self.rows += len(chunk)
+        for column, count in chunk.isnull().sum().items():
+            self.null_counts[column] = self.null_counts.get(column, 0) + int(count)
+        self._merge_dtypes({column: str(dtype) for column, dtype in chunk.dtypes.items()})
+        if len(chunk):
+            self._add_hashes(pd.util.hash_pandas_object(chunk, index=False).to_numpy())
+        return self
+
+    def merge(self, other):
+        """Fold another partial profile of the same table into this one."""
+        if not self.columns:
+            self.columns = list(other.columns)
+        self.rows += other.rows
+        for column, count in other.null_counts.items():
+            self.null_counts[column] = self.null_counts.get(column, 0) + count
+        self._merge_dtypes(other.dtypes)
+        self._add_hashes(other._unique_hashes)
+        for hashes in other._pending_hashes:
+            self._add_hashes(hashes)
+        return self
+
+    def _merge_dtypes(self, dtypes):
+        for column, dtype in dtypes.items():
+            seen = self.dtypes.setdefault(column, dtype)
+            if seen != dtype:
+                # Chunks disagreed on the type, so the column is mixed
+                self.dtypes[column] = 'object'
+
+    def _add_hashes(self, hashes):
+        self._pending_hashes.append(hashes)
+        self._pending_size += len(hashes)
+        if self._pending_size > max(len(self._unique_hashes), 1_000_000):
+            self._compact()
+
+    def _compact(self):
+        if self._pending_hashes:
+            self._unique_hashes = np.unique(np.concatenate([self._unique_hashes] + self._pending_hashes))
+            self._pending_hashes = []
+            self._pending_size = 0
+
+    @property
+    def num_columns(self):
+        return len(self.columns)
+
+    @property
+    def missing_values(self):
+        return sum(self.null_counts.values())
+
+    @property
+    def duplicates(self):
+        """Rows that exactly repeat an earlier row."""
+        self._compact()
+        return self.rows - len(self._unique_hashes)
+
+    def __getstate__(self):
+        # Compact before pickling so workers send the smallest state back
+        self._compact()
+        return self.__dict__
+
+    def as_dict(self):
+        return {
+            'table': self.table,
+            'rows': self.rows,
+            'columns': self.num_columns,
+            'missing_values': self.missing_values,
+            'duplicates': self.duplicates,
+            'null_counts': self.null_counts,
+            'dtypes': self.dtypes,
+        }
+
+    def to_json(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(self.as_dict(), f, indent=2)
+
+    def report(self):
+        print(f'Number of rows: {self.rows}')
+        print(f'Number of columns: {self.num_columns}')
+        print(f'Number of missing values: {self.missing_values}')
+        print(f'Number of duplicates: {self.duplicates}')
+        print(f'Data types:\n{pd.Series(self.dtypes, dtype=object)}')
+
+
+def _profile_range(table, byte_range, path=None):
+    profile = TableProfile(table)
+    for chunk in iter_chunks(table, path=path, byte_range=byte_range):
+        profile.update(chunk)
+    return profile
+
+
+def profile_table(table, workers=1, path=None):
+    """Profile a whole table, splitting the file across worker processes."""
+    stats = LoadStats(table)
+    if workers <= 1:
+        profile = TableProfile(table)
+        for chunk in iter_chunks(table, path=path, stats=stats):
+            profile.update(chunk)
+    else:
+        ranges = split_byte_ranges(table, workers, path=path)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            partials = pool.map(_profile_range, [table] * len(ranges), ranges, [path] * len(ranges))
+            profile = TableProfile(table)
+            for partial in partials:
+                profile.merge(partial)
+        stats.record(profile.rows, chunks=len(ranges))
+    stats.report()
+    return profile
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Profile the source tables in a single pass.')
+    parser.add_argument('tables', nargs='*', default=list(TABLE_SCHEMAS), help='Tables to profile')
+    parser.add_argument('--workers', type=int, default=1, help='Worker processes per table')
+    parser.add_argument('--output-dir', default='data_profiling_EDA', help='Folder for the JSON reports')
+    args = parser.parse_args()
+
+    for table in args.tables:
+        profile = profile_table(table, workers=args.workers)
+        profile.report()
+        output_path = os.path.join(args.output_dir, f'profile_{table}.json')
+        profile.to_json(output_path)
+        print(f'Profile saved to {output_path}')
+
+
+if __name__ == '__main__':
+    main()
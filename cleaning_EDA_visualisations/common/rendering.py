@@ -0,0 +1,292 @@
+"""
+Parallel figure rendering for the visualisation scripts.
+
+A script describes its figures as PlotSpecs (the seaborn function to call, its
+arguments and the labels) and hands them to a Renderer, which draws them on a
+pool of worker processes with the non-interactive Agg backend and saves each
+one as a PNG. Figures are independent, so render time scales with the number
+of plots divided by the number of workers.
+
+The dataset is shared with the workers rather than sent with every plot:
+where processes are forked it is inherited from the parent without being
+pickled, and otherwise it is sent once to each worker when the pool starts.
+A spec that plots something other than the shared dataset (a small table of
+group means, say) carries that table itself.
+
+Above AGGREGATE_ROWS rows the Renderer switches to aggregate-first plotting:
+histplot, scatterplot, regplot, scatter_with_trend and pairplot specs are
+drawn with their counterparts in aggregate_plots.py (binned counts, FFT KDE,
+hexbin density), so drawing time no longer grows with the row count.
+
+Rendering is headless: figures are always drawn with the Agg backend and
+never shown. Each figure gets a fingerprint, a hash of its spec and of the
+data it plots (the columns it names, or the table it carries). The
+fingerprints are recorded in manifest.json in the output directory next to
+the PNGs, and a figure whose fingerprint matches the manifest and whose file
+still exists is not drawn again, so a refresh only redraws the charts whose
+data or spec changed. Set SUPERANNUATION_FIGURE_CACHE=0 to redraw everything.
+
+Usage:
+    renderer = Renderer(df, 'data_visualisations')
+    renderer.add('distribution_salary', 'histplot', x='salary', kde=True, title='Distribution of salary')
+    renderer.render()
+"""
+
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import pandas as pd
+
+from common.aggregate_plots import density, density_with_trend, histogram, pair_density
+
+# Row count above which a Renderer plots aggregates rather than points
+# (override with SUPERANNUATION_AGGREGATE_ROWS)
+AGGREGATE_ROWS = int(os.environ.get('SUPERANNUATION_AGGREGATE_ROWS', 100_000))
+
+# Skip figures whose fingerprint is unchanged (set SUPERANNUATION_FIGURE_CACHE=0 to redraw all)
+FIGURE_CACHE = os.environ.get('SUPERANNUATION_FIGURE_CACHE', '1') != '0'
+MANIFEST = 'manifest.json'
+
+# Spec arguments that name columns of the data
+_COLUMN_ARGUMENTS = ['x', 'y', 'hue', 'vars', 'columns']
+
+# The shared dataset of a worker process (see Renderer._pool)
+_shared_data = None
+
+
+class PlotSpec:
+    """
+    One figure: a seaborn plotting function and its arguments.
+
+    kind is the name of an axes-level seaborn function (histplot, boxplot,
+    countplot, ...), 'pairplot', 'pair_density' (see aggregate_plots.py), or a function f(data, ax, **params) for
+    anything else (it must be importable, e.g. defined in a common module).
+    data replaces the shared dataset for this figure; params go to the
+    plotting function.
+    """
+
+    def __init__(self, name, kind, title=None, xlabel=None, ylabel=None, figsize=(10, 6), data=None,
+                 xticks_rotation=None, legend=None, **params):
+        self.name = name
+        self.kind = kind
+        self.title = title
+        self.xlabel = xlabel
+        self.ylabel = ylabel
+        self.figsize = figsize
+        self.data = data
+        self.xticks_rotation = xticks_rotation
+        # None keeps seaborn's legend; otherwise keyword arguments for ax.legend()
+        self.legend = legend
+        self.params = params
+
+
+def _init_worker(data, style):
+    global _shared_data
+    matplotlib.use('Agg')
+    if data is not None:
+        _shared_data = data
+    if style:
+        import seaborn as sns
+        sns.set(style=style)
+
+
+def draw(spec, data):
+    """Draw a spec and return its matplotlib Figure."""
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    frame = spec.data if spec.data is not None else data
+    if spec.kind in ('pairplot', 'pair_density'):
+        fig = sns.pairplot(frame, **spec.params).fig if spec.kind == 'pairplot' else pair_density(frame, **spec.params)
+        if spec.title:
+            fig.suptitle(spec.title, y=1.02)
+        return fig
+
+    fig, ax = plt.subplots(figsize=spec.figsize)
+    plot = getattr(sns, spec.kind) if isinstance(spec.kind, str) else spec.kind
+    if isinstance(spec.kind, str):
+        plot(data=frame, ax=ax, **spec.params)
+    else:
+        plot(frame, ax, **spec.params)
+    if spec.title is not None:
+        ax.set_title(spec.title)
+    if spec.xlabel is not None:
+        ax.set_xlabel(spec.xlabel)
+    if spec.ylabel is not None:
+        ax.set_ylabel(spec.ylabel)
+    if spec.xticks_rotation is not None:
+        ax.tick_params(axis='x', labelrotation=spec.xticks_rotation)
+    if spec.legend is not None:
+        ax.legend(**spec.legend)
+    fig.tight_layout()
+    return fig
+
+
+def scatter_with_trend(data, ax, x, y, hue=None, alpha=0.7, color='red'):
+    """A scatter plot (coloured by hue) with a linear regression line over all the points."""
+    import seaborn as sns
+
+    sns.scatterplot(data=data, x=x, y=y, hue=hue, alpha=alpha, ax=ax)
+    sns.regplot(data=data, x=x, y=y, scatter=False, color=color, ax=ax)
+
+
+# The aggregate-first counterpart of each point-by-point plot
+_AGGREGATE_KINDS = {
+    'histplot': histogram,
+    'scatterplot': density,
+    'regplot': density_with_trend,
+    scatter_with_trend: density_with_trend,
+    'pairplot': 'pair_density',
+}
+
+
+def render_one(spec, output_dir, data=None):
+    """Draw a spec, save it as <output_dir>/<name>.png and return the path."""
+    import matplotlib.pyplot as plt
+
+    fig = draw(spec, _shared_data if data is None else data)
+    path = os.path.join(output_dir, f'{spec.name}.png')
+    temp_path = f'{path}.{os.getpid()}.tmp.png'
+    fig.savefig(temp_path, bbox_inches='tight')
+    plt.close(fig)
+    os.replace(temp_path, path)
+    return path
+
+
+def _kind_name(kind):
+    return kind if isinstance(kind, str) else f'{kind.__module__}.{kind.__qualname__}'
+
+
+def _frame_digest(frame, index):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(repr(list(frame.columns)).encode())
+    digest.update(repr(frame.dtypes.astype(str).tolist()).encode())
+    digest.update(pd.util.hash_pandas_object(frame, index=index).to_numpy().tobytes())
+    if index:
+        digest.update(repr(frame.index.names).encode())
+    return digest.hexdigest()
+
+
+class Renderer:
+    """
+    Collects PlotSpecs for one dataset and renders them on a process pool.
+
+    aggregate selects aggregate-first plotting; by default it is on when the
+    dataset has more than AGGREGATE_ROWS rows.
+    """
+
+    def __init__(self, data, output_dir, workers=None, style='whitegrid', aggregate=None, cache=FIGURE_CACHE):
+        self.data = data
+        self.output_dir = output_dir
+        self.workers = workers
+        self.style = style
+        self.aggregate = len(data) > AGGREGATE_ROWS if aggregate is None else aggregate
+        self.cache = cache
+        self.specs = []
+        self._column_digests = {}
+
+    def add(self, name, kind, **options):
+        """Queue a figure (see PlotSpec for the options)."""
+        if self.aggregate:
+            kind = _AGGREGATE_KINDS.get(kind, kind)
+        spec = PlotSpec(name, kind, **options)
+        self.specs.append(spec)
+        return spec
+
+    def _pool(self, workers):
+        global _shared_data
+        if 'fork' in multiprocessing.get_all_start_methods():
+            # Forked workers inherit the dataset, so it is never pickled
+            _shared_data = self.data
+            return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'),
+                                       initializer=_init_worker, initargs=(None, self.style))
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self.data, self.style))
+
+    def _data_digest(self, spec):
+        if spec.data is not None:
+            frame = spec.data.to_frame() if isinstance(spec.data, pd.Series) else spec.data
+            return _frame_digest(frame, index=True)
+        names = []
+        for argument in _COLUMN_ARGUMENTS:
+            value = spec.params.get(argument)
+            names.extend([value] if isinstance(value, str) else value or [])
+        columns = [name for name in names if name in self.data.columns] or list(self.data.columns)
+        # Each shared column is hashed once however many figures use it
+        for column in columns:
+            if column not in self._column_digests:
+                self._column_digests[column] = _frame_digest(self.data[[column]], index=False)
+        return [self._column_digests[column] for column in columns]
+
+    def fingerprint(self, spec):
+        """A hash of everything that determines a figure: its spec, its data and the plotting libraries."""
+        import seaborn as sns
+
+        described = {
+            'kind': _kind_name(spec.kind), 'title': spec.title, 'xlabel': spec.xlabel, 'ylabel': spec.ylabel,
+            'figsize': spec.figsize, 'xticks_rotation': spec.xticks_rotation, 'legend': spec.legend,
+            'params': spec.params, 'style': self.style, 'data': self._data_digest(spec),
+            'versions': [matplotlib.__version__, sns.__version__],
+        }
+        encoded = json.dumps(described, sort_keys=True, default=repr).encode()
+        return hashlib.blake2b(encoded, digest_size=16).hexdigest()
+
+    def _read_manifest(self):
+        path = os.path.join(self.output_dir, MANIFEST)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as f:
+                return json.load(f).get('figures', {})
+        except (OSError, ValueError):
+            return {}
+
+    def _write_manifest(self, entries):
+        path = os.path.join(self.output_dir, MANIFEST)
+        temp_path = f'{path}.{os.getpid()}.tmp'
+        manifest = {
+            'rendered': sum(entry['status'] == 'rendered' for entry in entries.values()),
+            'unchanged': sum(entry['status'] == 'unchanged' for entry in entries.values()),
+            'figures': entries,
+        }
+        with open(temp_path, 'w') as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(temp_path, path)
+
+    def render(self):
+        """
+        Render every queued figure whose fingerprint changed, update the
+        manifest and return the paths of all the figures, in the order added.
+        """
+        matplotlib.use('Agg')
+        os.makedirs(self.output_dir, exist_ok=True)
+        specs, self.specs = self.specs, []
+        previous = self._read_manifest() if self.cache else {}
+        entries, pending = {}, []
+        for spec in specs:
+            path = os.path.join(self.output_dir, f'{spec.name}.png')
+            fingerprint = self.fingerprint(spec)
+            unchanged = previous.get(spec.name, {}).get('fingerprint') == fingerprint and os.path.exists(path)
+            entries[spec.name] = {'path': os.path.basename(path), 'kind': _kind_name(spec.kind),
+                                  'fingerprint': fingerprint, 'status': 'unchanged' if unchanged else 'rendered'}
+            if not unchanged:
+                pending.append(spec)
+
+        workers = min(self.workers or os.cpu_count() or 1, len(pending))
+        if workers <= 1:
+            _init_worker(None, self.style)
+            for spec in pending:
+                render_one(spec, self.output_dir, self.data)
+        else:
+            with self._pool(workers) as pool:
+                for future in [pool.submit(render_one, spec, self.output_dir) for spec in pending]:
+                    future.result()
+
+        for entry in entries.values():
+            entry['bytes'] = os.path.getsize(os.path.join(self.output_dir, entry['path']))
+        self._write_manifest(entries)
+        print(f'Figures in {self.output_dir}: {len(pending)} rendered, {len(specs) - len(pending)} unchanged')
+        return [os.path.join(self.output_dir, entry['path']) for entry in entries.values()]
@@ -0,0 +1,202 @@
+"""
+Process-pool runner for the cleaning, EDA and visualisation jobs.
+
+The jobs for each table are:
+    clean                   the full cleaning pipeline (see pipeline.py)
+    <folder>/<script>       every script in EDA_files/ and visualisation_files/,
+                            plus cleaning_files/initial_data_assessment.py
+
+The tables are independent. Within a table every script depends on the clean
+job, which builds the shared derived files (columnar cache, saved fill values).
+The scripts still stream the file through their own cleaning stages, but they
+read the cached columns and reuse the saved fill values instead of rebuilding
+them. Independent jobs run in parallel on a pool of worker processes, each job
+in a fresh worker so no module state carries over from one script to the next.
+
+Each job runs in its own directory, <output-dir>/<table>/<job>/, so files the
+scripts write to relative paths never collide, and its printed output goes to
+job.log in that directory. Plots are rendered with the non-interactive Agg
+backend. The runner reports each job's wall-clock time, CPU time (including
+the process pools the job starts itself) and peak memory, and the totals for
+the run.
+
+Usage (from cleaning_EDA_visualisations/):
+    python -m common.run_all --workers 16
+    python -m common.run_all member_employers --jobs clean EDA_files/eda_statistics
+"""
+
+import argparse
+import contextlib
+import glob
+import os
+import resource
+import runpy
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from common.data_loader import TABLE_SCHEMAS, peak_rss_mb
+from common.pipeline import CLEANING_ROOT, run_pipeline
+
+DEFAULT_OUTPUT_DIR = os.path.join(CLEANING_ROOT, 'run_output')
+
+# Folders the scripts write into relative to their working directory
+_OUTPUT_FOLDERS = ['cleaning_files', 'EDA_files', 'eda_files', 'visualisation_files']
+
+
+class Job:
+    """A unit of work: the clean pipeline or one script for one table."""
+
+    def __init__(self, table, name, script=None, depends_on=()):
+        self.table = table
+        self.name = name
+        self.script = script
+        self.depends_on = list(depends_on)
+
+    @property
+    def key(self):
+        return f'{self.table}:{self.name}'
+
+
+def build_jobs(tables=None):
+    """The job graph for the given tables (default: all of them)."""
+    jobs = []
+    for table in tables or list(TABLE_SCHEMAS):
+        clean = Job(table, 'clean')
+        jobs.append(clean)
+        table_dir = os.path.join(CLEANING_ROOT, table)
+        scripts = [os.path.join(table_dir, 'cleaning_files', 'initial_data_assessment.py')]
+        scripts += sorted(glob.glob(os.path.join(table_dir, 'EDA_files', '*.py')))
+        scripts += sorted(glob.glob(os.path.join(table_dir, 'visualisation_files', '*.py')))
+        for script in scripts:
+            name = os.path.splitext(os.path.relpath(script, table_dir))[0]
+            jobs.append(Job(table, name, script, depends_on=[clean.key]))
+    return jobs
+
+
+def _init_worker():
+    # Render figures off-screen; plt.show() is a no-op under Agg
+    os.environ['MPLBACKEND'] = 'Agg'
+
+
+def _cpu_seconds():
+    # CPU time of this process and of its finished child processes, such as
+    # the rendering and correlation pools a script starts
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+def run_job(job, output_dir):
+    """Run one job in its own directory; returns a result dict (never raises)."""
+    job_dir = os.path.join(output_dir, job.table, job.name.replace('/', os.sep))
+    for folder in _OUTPUT_FOLDERS:
+        os.makedirs(os.path.join(job_dir, folder), exist_ok=True)
+    log_path = os.path.join(job_dir, 'job.log')
+    status = 'ok'
+    started_wall = time.perf_counter()
+    started_cpu = _cpu_seconds()
+    previous_dir = os.getcwd()
+    with open(log_path, 'w') as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            os.chdir(job_dir)
+            if job.script is None:
+                run_pipeline(job.table, output_path=os.path.join(job_dir, f'cleaned_{job.table}.csv'),
+                             quarantine_path=os.path.join(job_dir, f'quarantine_{job.table}.csv'))
+            else:
+                runpy.run_path(job.script, run_name='__main__')
+        except SystemExit as e:
+            # The scripts only call exit() after reporting an error
+            if e.code != 0:
+                status = 'failed'
+        except Exception:
+            traceback.print_exc()
+            status = 'failed'
+        finally:
+            os.chdir(previous_dir)
+            try:
+                import matplotlib.pyplot as plt
+                plt.close('all')
+            except ImportError:
+                pass
+    return {
+        'job': job.key,
+        'status': status,
+        'wall_seconds': time.perf_counter() - started_wall,
+        'cpu_seconds': _cpu_seconds() - started_cpu,
+        'peak_rss_mb': peak_rss_mb(),
+        'log': log_path,
+    }
+
+
+def run_jobs(jobs, workers=None, output_dir=DEFAULT_OUTPUT_DIR):
+    """
+    Run the job graph on a process pool. A job starts once all of its
+    dependencies have succeeded; jobs whose dependencies failed are skipped.
+    Dependencies outside the given jobs are treated as already satisfied.
+    Returns the result dicts in completion order.
+    """
+    keys = {job.key for job in jobs}
+    pending = {job.key: job for job in jobs}
+    finished, succeeded = set(), set()
+    results = []
+    running = {}
+    # One job per worker, so each job's peak RSS is its own and module state
+    # (caches, matplotlib settings) never leaks from one script into another
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, max_tasks_per_child=1) as pool:
+        while pending or running:
+            for key, job in list(pending.items()):
+                depends_on = [dep for dep in job.depends_on if dep in keys]
+                if any(dep in finished and dep not in succeeded for dep in depends_on):
+                    del pending[key]
+                    finished.add(key)
+                    results.append({'job': key, 'status': 'skipped', 'wall_seconds': 0.0,
+                                    'cpu_seconds': 0.0, 'peak_rss_mb': 0.0, 'log': None})
+                elif all(dep in succeeded for dep in depends_on):
+                    del pending[key]
+                    running[pool.submit(run_job, job, output_dir)] = key
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                result = future.result()
+                key = running.pop(future)
+                finished.add(key)
+                if result['status'] == 'ok':
+                    succeeded.add(key)
+                results.append(result)
+    return results
+
+
+def report(results, wall_seconds):
+    width = max(len(result['job']) for result in results)
+    for result in sorted(results, key=lambda result: result['job']):
+        print(f"{result['job']:<{width}}  {result['status']:<7}  wall {result['wall_seconds']:7.2f}s  "
+              f"cpu {result['cpu_seconds']:7.2f}s  peak RSS {result['peak_rss_mb']:7.1f} MB")
+    cpu_seconds = sum(result['cpu_seconds'] for result in results)
+    failed = [result['job'] for result in results if result['status'] != 'ok']
+    print(f'{len(results)} jobs in {wall_seconds:.2f}s wall-clock, {cpu_seconds:.2f}s total CPU '
+          f'({cpu_seconds / wall_seconds if wall_seconds else 0:.1f}x parallelism)')
+    if failed:
+        print(f'Failed or skipped: {", ".join(failed)}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the cleaning, EDA and visualisation jobs on a process pool.')
+    parser.add_argument('tables', nargs='*', default=list(TABLE_SCHEMAS), help='Tables to run')
+    parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+    parser.add_argument('--jobs', nargs='*', help='Only run these jobs (e.g. clean EDA_files/eda_statistics)')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help='Root folder for per-job outputs')
+    args = parser.parse_args()
+
+    jobs = build_jobs(args.tables)
+    if args.jobs:
+        jobs = [job for job in jobs if job.name in args.jobs]
+    started = time.perf_counter()
+    results = run_jobs(jobs, args.workers, args.output_dir)
+    report(results, time.perf_counter() - started)
+    if any(result['status'] != 'ok' for result in results):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+"""
+Reproducible stratified samples for pairplots and other point-by-point views.
+
+A pairplot draws every row in every panel, so its cost grows with rows ×
+columns². StratifiedSample reduces a table to a fixed-size sample in one pass
+over its chunks:
+
+- each stratum (e.g. employment_type, industry or investment_option) keeps a
+  reservoir of the rows with the smallest random keys, which is a uniform
+  sample of the stratum however many rows have been seen;
+- the final sample allocates the target size across strata in proportion to
+  their row counts, with a minimum per stratum so that small ones still
+  appear (or equally, with allocation='equal');
+- for each numeric column the rows with the tails most extreme values at
+  each end are kept as well, so outliers are not sampled away.
+
+The random keys are a hash of the random seed and the row's position in the
+stream, so the same data and seed give the same sample whatever the chunk
+size. Samples built over separate parts of a file are merged; give each
+part's sampler the row number it starts at.
+
+Usage:
+    sampler = stratified_sample(df, by='industry', size=5000)
+    sns.pairplot(sampler.sample(), ...)
+    title = f'Pairplot ({sampler.label()})'
+"""
+
+import numpy as np
+import pandas as pd
+
+# Default sample size, minimum rows per stratum and extreme rows kept per column end
+SAMPLE_SIZE = 5_000
+MIN_PER_STRATUM = 50
+TAIL_ROWS = 25
+
+_KEY = '__sample_key'
+_ROW = '__sample_row'
+_STRATUM = '__sample_stratum'
+
+
+def _row_keys(rows, seed):
+    # SplitMix64 hash of (seed, row number) as uniform floats in [0, 1)
+    z = rows.astype(np.uint64) + np.uint64(seed) * np.uint64(0x9E3779B97F4A7C15)
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+class StratifiedSample:
+    """A one-pass stratified reservoir sample of a table, plus its extreme rows."""
+
+    def __init__(self, size=SAMPLE_SIZE, by=None, columns=None, tails=TAIL_ROWS, allocation='proportional',
+                 min_per_stratum=MIN_PER_STRATUM, random_state=0, start=0):
+        self.size = size
+        self.by = by
+        self.columns = None if columns is None else list(columns)
+        self.tails = tails
+        self.allocation = allocation
+        self.min_per_stratum = min_per_stratum
+        self.random_state = random_state
+        self.start = start
+        self.rows = 0
+        self.strata = pd.Series(dtype='int64')
+        self._reservoir = None
+        self._extremes = None
+
+    def _stratum(self, chunk):
+        if self.by is None:
+            return pd.Series('all', index=chunk.index)
+        # Missing values form a stratum of their own
+        return chunk[self.by].astype(object).where(chunk[self.by].notna(), '(missing)')
+
+    def update(self, chunk):
+        """Add a chunk of rows."""
+        if self.columns is None:
+            self.columns = chunk.select_dtypes(include=['number']).columns.tolist()
+        rows = np.arange(self.rows, self.rows + len(chunk)) + self.start
+        self.rows += len(chunk)
+        stratum = self._stratum(chunk)
+        self.strata = self.strata.add(stratum.value_counts(), fill_value=0).astype('int64')
+        marked = chunk.assign(**{_KEY: _row_keys(rows, self.random_state), _ROW: rows, _STRATUM: stratum.to_numpy()})
+        self._keep_sampled(marked)
+        self._keep_extremes(marked)
+        return self
+
+    def merge(self, other):
+        """Fold in a sample of another part of the same table."""
+        self.rows += other.rows
+        self.strata = self.strata.add(other.strata, fill_value=0).astype('int64')
+        if self.columns is None:
+            self.columns = other.columns
+        if other._reservoir is not None:
+            self._keep_sampled(other._reservoir)
+        if other._extremes is not None:
+            self._keep_extremes(other._extremes)
+        return self
+
+    def _keep_sampled(self, marked):
+        # Each stratum keeps the size rows with the smallest keys
+        reservoir = marked if self._reservoir is None else pd.concat([self._reservoir, marked])
+        reservoir = reservoir.sort_values(_KEY, kind='stable')
+        rank = reservoir.groupby(_STRATUM, sort=False).cumcount().to_numpy()
+        self._reservoir = reservoir[rank < self.size]
+
+    def _keep_extremes(self, marked):
+        # Every numeric column keeps its tails smallest and largest rows
+        if self.tails:
+            extremes = marked if self._extremes is None else pd.concat([self._extremes, marked])
+            keep = set()
+            for column in self.columns:
+                values = extremes[column].reset_index(drop=True)
+                keep.update(values.nsmallest(self.tails).index)
+                keep.update(values.nlargest(self.tails).index)
+            self._extremes = extremes.iloc[sorted(keep)]
+
+    def allocate(self):
+        """Rows to draw from each stratum."""
+        counts = self.strata[self.strata > 0]
+        if not len(counts):
+            return counts
+        if self.allocation == 'equal':
+            target = pd.Series(max(self.size // len(counts), 1), index=counts.index)
+        else:
+            target = (counts * self.size / counts.sum()).round().astype('int64')
+            target = target.clip(lower=self.min_per_stratum)
+        return target.clip(upper=counts).astype('int64')
+
+    def sample(self):
+        """The sample, indexed by row number in the stream, in stream order."""
+        if self._reservoir is None:
+            return pd.DataFrame()
+        reservoir = self._reservoir
+        rank = reservoir.groupby(_STRATUM, sort=False).cumcount().to_numpy()
+        quota = reservoir[_STRATUM].map(self.allocate()).fillna(0).to_numpy()
+        chosen = reservoir[rank < quota]
+        if self._extremes is not None:
+            chosen = pd.concat([chosen, self._extremes]).drop_duplicates(_ROW)
+        chosen = chosen.sort_values(_ROW).set_index(_ROW)
+        chosen.index.name = None
+        return chosen.drop(columns=[_KEY, _STRATUM])
+
+    @property
+    def fraction(self):
+        """The share of rows in the sample."""
+        return len(self.sample()) / self.rows if self.rows else 0.0
+
+    def label(self):
+        """A description of the sample for plot titles, e.g. 'sample of 5,012 of 1,200,000 rows, 0.42%'."""
+        sampled = len(self.sample())
+        if sampled >= self.rows:
+            return f'all {self.rows:,} rows'
+        return f'sample of {sampled:,} of {self.rows:,} rows, {sampled / self.rows:.2%}'
+
+
+def stratified_sample(data, size=SAMPLE_SIZE, by=None, columns=None, chunksize=100_000, **options):
+    """A StratifiedSample of an in-memory DataFrame, built chunk by chunk."""
+    sampler = StratifiedSample(size=size, by=by, columns=columns, **options)
+    for start in range(0, len(data), chunksize):
+        sampler.update(data.iloc[start:start + chunksize])
+    return sampler
@@ -0,0 +1,261 @@
+"""
+Mergeable streaming sketches used by the profiling and cleaning helpers.
+
+Each sketch is updated chunk by chunk and can be merged with a sketch of the
+same kind built on another chunk or in another process.
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class SpaceSaving:
+    """
+    Space-Saving heavy-hitters sketch for approximate value counts.
+
+    Keeps at most capacity values. While fewer distinct values than capacity
+    have been seen the counts are exact; after that each estimate overcounts
+    by at most the stored error, and any value that is not tracked occurred at
+    most min_count times. Chunks are folded in with vectorised merges of
+    value_counts() rather than value by value.
+    """
+
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype='int64')
+        self.errors = pd.Series(dtype='int64')
+        self.total = 0
+        # Upper bound on the count of any value that is not tracked
+        self.min_count = 0
+
+    def update(self, values):
+        """Add a Series of values (nulls are ignored)."""
+        return self.update_counts(values.value_counts(dropna=True))
+
+    def update_counts(self, counts):
+        """Add values already tallied as a Series of value -> count."""
+        self.total += int(counts.sum())
+        self._merge(counts.astype('int64'), pd.Series(0, index=counts.index, dtype='int64'), 0)
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one."""
+        self.total += other.total
+        self._merge(other.counts, other.errors, other.min_count)
+        return self
+
+    def _merge(self, counts, errors, min_count):
+        index = self.counts.index.union(counts.index)
+        merged = (self.counts.reindex(index).fillna(self.min_count)
+                  + counts.reindex(index).fillna(min_count)).astype('int64')
+        merged_errors = (self.errors.reindex(index).fillna(self.min_count)
+                         + errors.reindex(index).fillna(min_count)).astype('int64')
+        dropped_max = self.min_count + min_count
+        if len(merged) > self.capacity:
+            merged = merged.sort_values(ascending=False, kind='stable')
+            dropped_max = max(dropped_max, int(merged.iloc[self.capacity]))
+            merged = merged.iloc[:self.capacity]
+        self.counts = merged
+        self.errors = merged_errors.reindex(merged.index)
+        self.min_count = dropped_max
+
+    @property
+    def exact(self):
+        """True while every distinct value seen is tracked with no error."""
+        return self.min_count == 0
+
+    def top_k(self, k=10):
+        """The k most frequent values as a DataFrame of count and error."""
+        top = self.counts.sort_values(ascending=False, kind='stable').head(k)
+        return pd.DataFrame({'count': top, 'error': self.errors.reindex(top.index)})
+
+    def mode(self):
+        """Most frequent value; ties go to the smallest value, as with Series.mode()."""
+        if self.counts.empty:
+            return None
+        tied = self.counts.index[self.counts == self.counts.max()]
+        try:
+            return sorted(tied)[0]
+        except TypeError:
+            return tied[0]
+
+
+class HyperLogLog:
+    """
+    HyperLogLog sketch for approximate distinct counts.
+
+    Each value is hashed to 64 bits; the first precision bits pick one of
+    2 ** precision registers, which keeps the longest run of leading zeros
+    seen in the remaining bits. The standard error of the estimate is about
+    1.04 / sqrt(2 ** precision) (0.8% at the default precision of 14, using
+    16 KiB of registers). Sketches are merged by taking register maxima, so
+    the result does not depend on how the values were split.
+    """
+
+    def __init__(self, precision=14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values):
+        """Add a Series or array of values (nulls are ignored)."""
+        values = pd.Series(values).dropna()
+        if len(values):
+            # Only distinct values change the registers
+            hashes = pd.util.hash_array(pd.unique(values.to_numpy()))
+            buckets = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+            rest = hashes << np.uint64(self.precision)
+            np.maximum.at(self.registers, buckets, self._rank(rest))
+        return self
+
+    def merge(self, other):
+        """Fold another sketch of the same precision into this one."""
+        if other.precision != self.precision:
+            raise ValueError('HyperLogLog sketches must have the same precision to merge')
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def _rank(self, bits):
+        # Position of the first set bit (1-based), capped for all-zero inputs.
+        # Each 32-bit half is exact in float64, so log2 gives its bit length
+        high = (bits >> np.uint64(32)).astype(np.float64)
+        low = (bits & np.uint64(0xFFFFFFFF)).astype(np.float64)
+        with np.errstate(divide='ignore'):
+            rank = np.where(high > 0, 32 - np.floor(np.log2(high)),
+                            np.where(low > 0, 64 - np.floor(np.log2(low)), 65 - self.precision))
+        return np.minimum(rank, 65 - self.precision).astype(np.uint8)
+
+    def estimate(self):
+        """Approximate number of distinct values added."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / float(np.sum(np.ldexp(1.0, -self.registers.astype(np.int64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are empty
+            estimate = m * np.log(m / zeros)
+        return int(round(estimate))
+
+
+class Moments:
+    """
+    Running count, mean and variance (Welford's method).
+
+    Each chunk's moments are computed with numpy and folded in with Chan's
+    pairwise update, which is also used to merge two Moments.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def update(self, values):
+        """Add a Series or array of values (nulls are ignored)."""
+        values = pd.Series(values).dropna().to_numpy(dtype='float64')
+        if len(values):
+            mean = values.mean()
+            self._combine(len(values), mean, float(np.square(values - mean).sum()))
+        return self
+
+    def merge(self, other):
+        """Fold another Moments into this one."""
+        if other.count:
+            self._combine(other.count, other.mean, other.m2)
+        return self
+
+    def _combine(self, count, mean, m2):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+
+    def variance(self, ddof=0):
+        if self.count - ddof <= 0:
+            return float('nan')
+        return self.m2 / (self.count - ddof)
+
+    def std(self, ddof=0):
+        return float(np.sqrt(self.variance(ddof)))
+
+
+class KLLSketch:
+    """
+    KLL sketch for approximate quantiles of a numeric stream.
+
+    Values are kept in compactors of increasing weight; when a compactor is
+    over capacity it is sorted and every other value (from a random offset) is
+    promoted to the next level with double the weight. Rank error is about
+    1.7 / k of the count with high probability, using O(k) memory. Until the
+    first compaction every value is kept and quantiles are exact (with the
+    same linear interpolation as pandas).
+    """
+
+    def __init__(self, k=200, seed=None):
+        self.k = k
+        self.count = 0
+        self.min = float('inf')
+        self.max = float('-inf')
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def update(self, values):
+        """Add a Series or array of values (nulls are ignored)."""
+        values = pd.Series(values).dropna().to_numpy(dtype='float64')
+        if len(values):
+            self.count += len(values)
+            self.min = min(self.min, float(values.min()))
+            self.max = max(self.max, float(values.max()))
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """Fold another sketch into this one."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            if len(self.levels[level]) > self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                items = np.sort(self.levels[level])
+                # An odd item out stays behind so the total weight is unchanged
+                keep = items[-1:] if len(items) % 2 else items[:0]
+                items = items[:len(items) - len(keep)]
+                promoted = items[self._rng.integers(2)::2]
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+                self.levels[level] = keep
+            level += 1
+
+    @property
+    def exact(self):
+        """True while no values have been compacted away."""
+        return len(self.levels) == 1
+
+    def quantile(self, q):
+        """Approximate q-quantile (q may be a scalar or a list)."""
+        if self.count == 0:
+            return np.full(np.shape(q), np.nan) if np.ndim(q) else float('nan')
+        if self.exact:
+            return np.quantile(self.levels[0], q)
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind='stable')
+        cumulative = np.cumsum(weights[order])
+        index = np.searchsorted(cumulative, np.asarray(q) * cumulative[-1], side='left')
+        result = items[order][np.clip(index, 0, len(items) - 1)]
+        return np.clip(result, self.min, self.max)
@@ -0,0 +1,159 @@
+"""
+Sweep-line timeline of active employments.
+
+Each employment contributes a +1 event on its start date and a -1 event on
+the day after its end date. ActiveTimeline sorts the events once (by group,
+then date) and takes running sums, so the number of employments active on any
+day is a binary search into the sorted events rather than a scan of the rows.
+Counts per day, month or quarter for every group come from one vectorised
+search over the whole (group, period) grid.
+
+Dates are held as int64 day numbers from 1970-01-01, so the 9999-12-31
+open-ended sentinel needs no special range handling. Open-ended and missing
+end dates never end; the reporting range is clipped to the as-of date
+(today by default) so they do not stretch it out to the year 9999.
+
+Usage:
+    timeline = ActiveTimeline.from_frame(data, by='employment_type')
+    timeline.headcount('2024-06-30')
+    timeline.active_counts(freq='Q')
+"""
+
+import numpy as np
+import pandas as pd
+
+from common.dates import OPEN_ENDED, DateNormaliser
+
+# Period granularities: numpy unit of the period and its length in that unit
+FREQUENCIES = {'D': ('D', 1), 'M': ('M', 1), 'Q': ('M', 3)}
+
+# Day numbers bounding the timeline; ends on _NEVER never end
+_ORIGIN = np.datetime64('0001-01-01', 'D').astype(np.int64)
+_NEVER = np.datetime64('10000-01-01', 'D').astype(np.int64)
+# Width of one group's key range (see ActiveTimeline._key)
+_SPAN = _NEVER - _ORIGIN + 2
+
+
+def _to_days(values):
+    """
+    Dates (strings, Timestamps or datetime64 of any unit) as datetime64[D]
+    numpy values. Missing and unparseable values become NaT.
+    """
+    values = pd.Series(values) if not isinstance(values, pd.Series) else values
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        # Raw loader columns hold date strings with NaN for missing values
+        values = DateNormaliser().normalise(values)
+    return values.to_numpy().astype('datetime64[D]')
+
+
+def _day(value):
+    return np.datetime64(pd.Timestamp(value).date(), 'D').astype(np.int64)
+
+
+class ActiveTimeline:
+    """
+    Active-employment counts from start and end dates.
+
+    starts and ends are aligned sequences of dates; end dates are inclusive.
+    groups optionally labels each employment (e.g. employment_type or
+    employer_id) and counts are then reported per group. Rows without a start
+    date are ignored. as_of (default: today) is the last day reported by
+    active_counts().
+    """
+
+    def __init__(self, starts, ends, groups=None, as_of=None):
+        starts = _to_days(starts)
+        ends = _to_days(ends)
+        keep = ~np.isnat(starts)
+        starts, ends = starts[keep].astype(np.int64), ends[keep]
+        open_ended = np.isnat(ends) | (ends >= OPEN_ENDED.to_datetime64().astype('datetime64[D]'))
+        ends = np.where(open_ended, _NEVER, ends.astype(np.int64))
+
+        if groups is None:
+            codes, self.groups = np.zeros(len(starts), dtype=np.int64), None
+        else:
+            codes, self.groups = pd.factorize(np.asarray(groups)[keep], use_na_sentinel=False)
+            codes = codes.astype(np.int64)
+        self.as_of = _day(pd.Timestamp.today() if as_of is None else as_of)
+        self.first_day = int(starts.min()) if len(starts) else self.as_of
+        self.last_day = int(min(ends.max(), self.as_of)) if len(ends) else self.as_of
+
+        keys = np.concatenate([self._key(codes, starts), self._key(codes, ends + 1)])
+        kinds = np.concatenate([np.ones(len(starts), dtype=np.int64), np.zeros(len(ends), dtype=np.int64)])
+        order = np.argsort(keys, kind='stable')
+        self._keys = keys[order]
+        kinds = kinds[order]
+        # Running totals of start and end events up to each sorted position
+        self._started = np.concatenate([[0], np.cumsum(kinds)])
+        self._ended = np.concatenate([[0], np.cumsum(1 - kinds)])
+        # Offset of each group's first event, to turn running totals into per-group totals
+        self._group_base = np.searchsorted(self._keys, self._key(np.arange(self._n_groups), _ORIGIN))
+
+    @classmethod
+    def from_frame(cls, data, by=None, start='start_date', end='end_date', as_of=None):
+        """A timeline of the rows of an employment_history DataFrame, optionally grouped by a column."""
+        return cls(data[start], data[end], None if by is None else data[by], as_of)
+
+    @staticmethod
+    def _key(codes, days):
+        # (group, day) packed into one integer so a single sort orders events
+        # by group and then date
+        return codes * _SPAN + (np.clip(days, _ORIGIN, _NEVER + 1) - _ORIGIN)
+
+    @property
+    def _n_groups(self):
+        return 1 if self.groups is None else len(self.groups)
+
+    def _count_before(self, totals, days):
+        # totals up to (and excluding) day, for every group and day: shape (groups, days)
+        groups = np.arange(self._n_groups)[:, None]
+        positions = np.searchsorted(self._keys, self._key(groups, days[None, :]), side='left')
+        return totals[positions] - totals[self._group_base][:, None]
+
+    def _frame(self, counts, index):
+        if self.groups is None:
+            return pd.DataFrame({'active_employments': counts[0]}, index=index)
+        return pd.DataFrame(counts.T, index=index, columns=pd.Index(self.groups))
+
+    def headcount(self, when):
+        """
+        Employments active on the given date(s).
+
+        Returns an int for a single ungrouped date, otherwise a DataFrame indexed
+        by date with one column per group (or active_employments).
+        """
+        scalar = np.ndim(when) == 0
+        dates = _to_days([when] if scalar else when)
+        days = dates.astype(np.int64)
+        # Active on day d: started on or before d and ended on or after d
+        counts = self._count_before(self._started, days + 1) - self._count_before(self._ended, days + 1)
+        if scalar and self.groups is None:
+            return int(counts[0, 0])
+        return self._frame(counts, pd.Index(dates, name='date'))
+
+    def periods(self, freq='M', start=None, end=None):
+        """First and last day (datetime64[D]) of each period from start to end (default: the data's range)."""
+        unit, step = FREQUENCIES[freq]
+        first = np.datetime64(self.first_day if start is None else _day(start), 'D')
+        last = np.datetime64(self.last_day if end is None else _day(end), 'D')
+        first_unit = first.astype(f'datetime64[{unit}]')
+        if step > 1:
+            # Align to the start of the quarter
+            months = first_unit.astype(np.int64)
+            first_unit = np.datetime64(int(months - months % step), unit)
+        period_starts = np.arange(first_unit, last.astype(f'datetime64[{unit}]') + 1, step)
+        period_ends = (period_starts + step).astype('datetime64[D]') - 1
+        return period_starts.astype('datetime64[D]'), period_ends
+
+    def active_counts(self, freq='M', start=None, end=None):
+        """
+        Employments active at any time in each period.
+
+        freq is 'D', 'M' or 'Q'. The result is indexed by period start, with one
+        column per group, or a single active_employments column when ungrouped.
+        """
+        period_starts, period_ends = self.periods(freq, start, end)
+        # Overlaps [a, b]: started on or before b and not ended before a
+        started = self._count_before(self._started, period_ends.astype(np.int64) + 1)
+        ended = self._count_before(self._ended, period_starts.astype(np.int64) + 1)
+        return self._frame(started - ended, pd.Index(period_starts.astype('datetime64[s]'), name='period'))
@@ -0,0 +1,392 @@
+"""
+Local build of the bronze → silver → gold warehouse from the repo SQL.
+
+The scripts in data_warehouse/ are written for Snowflake. Warehouse runs the
+same files, statement by statement, on an embedded DuckDB database, so the
+medallion build can be profiled and regression-tested offline on generated
+data. Each statement is translated on the way in:
+
+- USE DATABASE / USE SCHEMA switch to the attached 'superannuation' catalog
+  and its schemas; roles, warehouses, grants, stages, integrations and
+  SHOW / DESCRIBE are skipped;
+- PRIMARY KEY is dropped, as Snowflake does not enforce it either;
+- DATEDIFF(part, a, b) becomes date_diff('part', a, b) (both count boundaries
+  crossed), DATEADD(part, n, d) a date plus an interval, and GREATEST / LEAST
+  return NULL when any argument is NULL, as in Snowflake;
+- CURRENT_DATE() is fixed to the as_of date when one is given, so that ages
+  and durations are reproducible;
+- CREATE OR REPLACE TABLE ... AS SELECT runs as it is;
+- CREATE PROCEDURE registers the procedure and CALL runs its statements: the
+  body of a LANGUAGE SQL procedure, or the SQL a LANGUAGE PYTHON procedure
+  passes to session.sql(). COPY INTO from a stage reads the named file from a
+  local folder standing in for the stage (a Parquet file of the same name is
+  read instead when there is one). A procedure that only truncates tables and
+  copies files into them, such as BRONZE.load_data(), is run by BronzeLoader
+  (see bronze_load.py): only files that changed since their last load are
+  reloaded, each on its own session, in parallel.
+
+Every statement's time and row count (rows changed, or rows returned by a
+query) is recorded and reported per statement and per layer, followed by the
+row count of every table built.
+
+duckdb is optional for the rest of the package, but required here.
+
+Usage (from cleaning_EDA_visualisations/):
+    python -m common.warehouse
+    python -m common.warehouse --as-of 2025-06-30 --tests --json warehouse_build.json
+    python -m common.warehouse --database warehouse.duckdb --scripts bronze/proc_bronze_load.sql
+"""
+
+import argparse
+import json
+import os
+import re
+import time
+
+from common.bronze_load import BronzeLoader, copy_statement, stage_file
+from common.data_loader import DATA_DIR, REPO_ROOT
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+WAREHOUSE_DIR = os.path.join(REPO_ROOT, 'data_warehouse')
+
+# Name the database is attached under (the SQL refers to SUPERANNUATION.<schema>.<table>)
+DATABASE = 'superannuation'
+
+# Scripts that build each layer, in order, and the quality checks run after it with --tests
+LAYERS = {
+    'bronze': ['bronze/init_database.sql', 'bronze/ddl_bronze.sql', 'bronze/proc_bronze_load.sql'],
+    'silver': ['silver/ddl_silver.sql', 'silver/proc_silver_load.sql'],
+    'gold': ['gold/create_gold.sql'],
+}
+TESTS = {
+    'bronze': ['silver/test_bronze.sql'],
+    'silver': ['silver/test_silver.sql'],
+    'gold': ['gold/test_gold.sql'],
+}
+
+# Snowflake account objects with no local equivalent
+_SKIPPED = re.compile(
+    r'^(USE\s+(ROLE|WAREHOUSE|SECONDARY)\b|SHOW\b|DESC(RIBE)?\b|GRANT\b|REVOKE\b|LIST\b|'
+    r'CREATE\s+(OR\s+REPLACE\s+)?(DATABASE|ROLE|WAREHOUSE|STAGE|STORAGE\s+INTEGRATION)\b|'
+    r'DROP\s+(DATABASE|ROLE|WAREHOUSE|STAGE|INTEGRATION|STORAGE\s+INTEGRATION)\b)',
+    re.IGNORECASE)
+_USE = re.compile(r'^USE\s+(DATABASE\s+|SCHEMA\s+)?([\w."]+)$', re.IGNORECASE)
+_PROCEDURE = re.compile(
+    r'^CREATE\s+(OR\s+REPLACE\s+)?PROCEDURE\s+([\w."]+)\s*\(.*?\).*?\bLANGUAGE\s+(\w+).*?\$\$(.*)\$\$$',
+    re.IGNORECASE | re.DOTALL)
+_CALL = re.compile(r'^CALL\s+([\w."]+)\s*\(\s*\)$', re.IGNORECASE)
+_SESSION_SQL = re.compile(r'session\.sql\(\s*(?:"""(.*?)"""|"(.*?)"|\'(.*?)\')\s*\)', re.DOTALL)
+_COPY_INTO = re.compile(r'^COPY\s+INTO\s+([\w."]+)\s+FROM\s+@[\w."]+/(\S+)', re.IGNORECASE | re.DOTALL)
+_TRUNCATE = re.compile(r'^TRUNCATE\s+(?:TABLE\s+)?([\w."]+)$', re.IGNORECASE)
+_PRIMARY_KEY = re.compile(r'\s+PRIMARY\s+KEY\b', re.IGNORECASE)
+_CURRENT_DATE = re.compile(r'\bCURRENT_DATE\b(\s*\(\s*\))?', re.IGNORECASE)
+_QUERIES = ('SELECT', 'WITH')
+
+
+def split_statements(sql):
+    """Split a script into statements, dropping comments and keeping quoted text and $$ blocks whole."""
+    statements, current = [], []
+    i, n = 0, len(sql)
+    while i < n:
+        if sql.startswith('--', i):
+            end = sql.find('\n', i)
+            i = n if end < 0 else end
+        elif sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            i = n if end < 0 else end + 2
+            current.append(' ')
+        elif sql.startswith('$$', i):
+            end = sql.find('$$', i + 2)
+            end = n if end < 0 else end + 2
+            current.append(sql[i:end])
+            i = end
+        elif sql[i] in '\'"':
+            end = i + 1
+            while end < n and sql[end] != sql[i]:
+                end += 2 if sql[end] == '\\' else 1
+            current.append(sql[i:end + 1])
+            i = end + 1
+        elif sql[i] == ';':
+            statements.append(''.join(current).strip())
+            current = []
+            i += 1
+        else:
+            current.append(sql[i])
+            i += 1
+    statements.append(''.join(current).strip())
+    return [statement for statement in statements if statement]
+
+
+def _call_arguments(sql, start):
+    # Arguments of the call whose opening parenthesis ends at start, and the position after its closing one
+    arguments, depth, begin, i = [], 0, start, start
+    while i < len(sql):
+        char = sql[i]
+        if char in '\'"':
+            i = sql.index(char, i + 1)
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            if depth == 0:
+                arguments.append(sql[begin:i].strip())
+                return arguments, i + 1
+            depth -= 1
+        elif char == ',' and depth == 0:
+            arguments.append(sql[begin:i].strip())
+            begin = i + 1
+        i += 1
+    raise ValueError(f'Unbalanced parentheses in: {sql[start:start + 80]}')
+
+
+def _rewrite_calls(sql, name, rewrite):
+    # Replace every call name(...) with rewrite(arguments), innermost calls first
+    pattern = re.compile(rf'\b{name}\s*\(', re.IGNORECASE)
+    parts, position = [], 0
+    while True:
+        match = pattern.search(sql, position)
+        if match is None:
+            break
+        arguments, end = _call_arguments(sql, match.end())
+        parts.append(sql[position:match.start()])
+        parts.append(rewrite([_rewrite_calls(argument, name, rewrite) for argument in arguments]))
+        position = end
+    parts.append(sql[position:])
+    return ''.join(parts)
+
+
+def _date_part(part):
+    return part.strip().strip('\'"').lower()
+
+
+def _datediff(arguments):
+    part, start, end = arguments
+    return f"date_diff('{_date_part(part)}', {start}, {end})"
+
+
+def _dateadd(arguments):
+    part, amount, value = arguments
+    return f'CAST(({value}) + INTERVAL ({amount}) {_date_part(part).upper()} AS DATE)'
+
+
+def _null_if_any_null(function):
+    # Snowflake's GREATEST / LEAST are NULL if any argument is; DuckDB's skip NULLs
+    def rewrite(arguments):
+        any_null = ' OR '.join(f'({argument}) IS NULL' for argument in arguments)
+        return f"CASE WHEN {any_null} THEN NULL ELSE {function}({', '.join(arguments)}) END"
+    return rewrite
+
+
+def _unquote(name):
+    return name.replace('"', '').lower()
+
+
+def _stage_loads(statements):
+    # (table, stage file) pairs if the statements only truncate tables and copy into them from a stage
+    truncated, loads = set(), []
+    for statement in statements:
+        truncate = _TRUNCATE.match(statement)
+        copy = _COPY_INTO.match(statement)
+        if truncate:
+            truncated.add(_unquote(truncate.group(1)))
+        elif copy:
+            loads.append((_unquote(copy.group(1)), copy.group(2)))
+        else:
+            return None
+    if loads and {table for table, _ in loads} == truncated:
+        return loads
+    return None
+
+
+def _summary(sql, width=70):
+    text = ' '.join(sql.split())
+    return text if len(text) <= width else text[:width - 3] + '...'
+
+
+class Warehouse:
+    """An embedded DuckDB copy of the warehouse, built from the Snowflake scripts."""
+
+    def __init__(self, database=':memory:', stage_dir=DATA_DIR, as_of=None, warehouse_dir=WAREHOUSE_DIR,
+                 manifest_path=None, workers=None, reload=False):
+        if duckdb is None:
+            raise ImportError('common.warehouse needs duckdb: pip install duckdb')
+        self.database = database
+        self.stage_dir = stage_dir
+        self.as_of = as_of
+        self.warehouse_dir = warehouse_dir
+        if database != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
+        self.connection = duckdb.connect()
+        self.connection.execute(f"ATTACH '{database}' AS {DATABASE}")
+        self.connection.execute(f'USE {DATABASE}')
+        # A file database keeps its bronze load manifest next to it
+        if manifest_path is None and database != ':memory:':
+            manifest_path = os.path.splitext(database)[0] + '_bronze_manifest.json'
+        self.loader = BronzeLoader(self.connection, stage_dir, manifest_path=manifest_path, workers=workers,
+                                   force=reload)
+        self.procedures = {}
+        self.steps = []
+
+    def translate(self, sql):
+        """The DuckDB form of a Snowflake statement, or None if it has no local equivalent."""
+        if _SKIPPED.match(sql):
+            return None
+        use = _USE.match(sql)
+        if use:
+            kind, name = (use.group(1) or '').strip().upper(), _unquote(use.group(2))
+            if kind == 'DATABASE':
+                return f'USE {DATABASE}'
+            return f'USE {DATABASE}.{name.split(".")[-1]}'
+        copy = _COPY_INTO.match(sql)
+        if copy:
+            return copy_statement(_unquote(copy.group(1)), stage_file(self.stage_dir, copy.group(2)))
+
+        sql = _PRIMARY_KEY.sub('', sql)
+        today = f"DATE '{self.as_of}'" if self.as_of else 'CURRENT_DATE'
+        sql = _CURRENT_DATE.sub(today, sql)
+        sql = _rewrite_calls(sql, 'DATEDIFF', _datediff)
+        sql = _rewrite_calls(sql, 'DATEADD', _dateadd)
+        sql = _rewrite_calls(sql, 'GREATEST', _null_if_any_null('greatest'))
+        sql = _rewrite_calls(sql, 'LEAST', _null_if_any_null('least'))
+        return sql
+
+    def _register(self, name, language, body):
+        if language.upper() == 'PYTHON':
+            statements = [next(text for text in match if text).strip() for match in _SESSION_SQL.findall(body)]
+        else:
+            body = re.sub(r'^\s*BEGIN\b|\bEND\s*;?\s*$', '', body.strip(), flags=re.IGNORECASE)
+            statements = [statement for statement in split_statements(body)
+                          if not statement.upper().startswith('RETURN')]
+        self.procedures[name] = statements
+
+    def execute(self, sql, layer, source, number):
+        """Run one statement (CREATE PROCEDURE and CALL included) and record its step(s)."""
+        procedure = _PROCEDURE.match(sql)
+        if procedure:
+            name = _unquote(procedure.group(2))
+            self._register(name, procedure.group(3), procedure.group(4))
+            return self._record(layer, source, number, sql, 'ok', 0.0, None)
+        call = _CALL.match(sql)
+        if call:
+            name = _unquote(call.group(1))
+            if name not in self.procedures:
+                raise KeyError(f'{source}: procedure {name} has not been created')
+            loads = _stage_loads(self.procedures[name])
+            if loads:
+                return self._load_stage(loads, layer, source, number)
+            for inner, statement in enumerate(self.procedures[name], 1):
+                self.execute(statement, layer, source, f'{number}.{inner}')
+            return None
+
+        translated = self.translate(sql)
+        if translated is None:
+            return self._record(layer, source, number, sql, 'skipped', 0.0, None)
+        started = time.perf_counter()
+        try:
+            result = self.connection.execute(translated).fetchall()
+        except duckdb.Error as error:
+            raise RuntimeError(f'{source} statement {number} failed: {error}\n{translated}') from error
+        seconds = time.perf_counter() - started
+        if sql.lstrip().upper().startswith(_QUERIES):
+            rows = len(result)
+        else:
+            # DML and CREATE TABLE ... AS return the number of rows written; DDL returns nothing
+            rows = result[0][0] if len(result) == 1 and len(result[0]) == 1 and isinstance(result[0][0], int) else None
+        return self._record(layer, source, number, sql, 'ok', seconds, rows)
+
+    def _load_stage(self, loads, layer, source, number):
+        # A procedure that only truncates tables and copies files into them from the
+        # stage is run by the loader: changed files only, each on its own session
+        results = self.loader.load(loads)
+        for inner, result in enumerate(results, 1):
+            summary = f"{result['status']} {result['table']} from {os.path.basename(result['path'])}"
+            self._record(layer, source, f'{number}.{inner}', summary, result['status'], result['seconds'],
+                         result['rows'])
+        self.loader.report(results)
+        return results
+
+    def _record(self, layer, source, number, sql, status, seconds, rows):
+        step = {'layer': layer, 'file': source, 'statement': str(number), 'summary': _summary(sql),
+                'status': status, 'seconds': round(seconds, 6), 'rows': rows}
+        self.steps.append(step)
+        return step
+
+    def run_file(self, path, layer=None):
+        """Run every statement of a script under data_warehouse/ (reported under layer, by default its folder)."""
+        layer = layer or path.split('/')[0]
+        with open(os.path.join(self.warehouse_dir, path)) as f:
+            statements = split_statements(f.read())
+        for number, sql in enumerate(statements, 1):
+            self.execute(sql, layer, path, number)
+
+    def build(self, layers=tuple(LAYERS), tests=False):
+        """Run the scripts of each layer in order (and its quality checks, with tests=True)."""
+        for layer in layers:
+            for path in LAYERS[layer]:
+                self.run_file(path, layer)
+            if tests:
+                for path in TESTS[layer]:
+                    self.run_file(path, f'{layer} tests')
+        return self.steps
+
+    def table_counts(self):
+        """Row count of every table in the warehouse, by 'schema.table'."""
+        tables = self.connection.execute(
+            'SELECT table_schema, table_name FROM information_schema.tables '
+            'WHERE table_catalog = ? ORDER BY table_schema, table_name', [DATABASE]).fetchall()
+        return {f'{schema}.{table}'.lower(): self.connection.execute(
+                    f'SELECT COUNT(*) FROM {DATABASE}."{schema}"."{table}"').fetchone()[0]
+                for schema, table in tables}
+
+    def report(self):
+        steps = [step for step in self.steps if step['status'] != 'skipped']
+        width = max((len(step['file']) for step in steps), default=0)
+        for step in steps:
+            rows = '' if step['rows'] is None else f"{step['rows']:,}"
+            print(f"{step['file']:<{width}}  {step['statement']:>5}  {step['seconds']:8.3f}s  {rows:>12}  "
+                  f"{step['summary']}")
+        for layer in dict.fromkeys(step['layer'] for step in steps):
+            seconds = sum(step['seconds'] for step in steps if step['layer'] == layer)
+            count = sum(step['layer'] == layer for step in steps)
+            print(f'{layer}: {count} statements in {seconds:.3f}s')
+        skipped = len(self.steps) - len(steps)
+        if skipped:
+            print(f'Skipped {skipped} Snowflake-only statements (roles, grants, stages, SHOW/DESCRIBE)')
+        for table, rows in self.table_counts().items():
+            print(f'{table:<50} {rows:>12,} rows')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the bronze, silver and gold layers locally on DuckDB.')
+    parser.add_argument('--layers', nargs='*', choices=list(LAYERS), default=list(LAYERS), help='Layers to build')
+    parser.add_argument('--database', default=':memory:', help='DuckDB file to build into (default: in memory)')
+    parser.add_argument('--stage-dir', default=DATA_DIR, help='Folder standing in for the S3 stage')
+    parser.add_argument('--scripts', nargs='*', help='Run only these scripts (paths under data_warehouse/), '
+                        'e.g. bronze/proc_bronze_load.sql for a nightly load into an existing --database')
+    parser.add_argument('--workers', type=int, help='Bronze tables loaded at once (default: all)')
+    parser.add_argument('--reload', action='store_true', help='Reload every bronze table, changed or not')
+    parser.add_argument('--as-of', help='Date to use for CURRENT_DATE (YYYY-MM-DD)')
+    parser.add_argument('--tests', action='store_true', help='Run the test_*.sql checks after each layer')
+    parser.add_argument('--json', help='Write the per-statement timings to this file')
+    args = parser.parse_args()
+
+    warehouse = Warehouse(args.database, stage_dir=args.stage_dir, as_of=args.as_of, workers=args.workers,
+                          reload=args.reload)
+    started = time.perf_counter()
+    if args.scripts:
+        for path in args.scripts:
+            warehouse.run_file(path)
+    else:
+        warehouse.build(args.layers, tests=args.tests)
+    print(f'Built {", ".join(args.scripts or args.layers)} in {time.perf_counter() - started:.2f}s')
+    warehouse.report()
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'steps': warehouse.steps, 'tables': warehouse.table_counts()}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,47 +1,35 @@
-import pandas as pd
-from scipy.stats import pearsonr
+import os
+import sys
 
-# Load the data
-# Ingest the first 500 rows
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.correlation import CorrelationAccumulator, numeric_columns
+from common.pipeline import Pipeline, build_stages
+
+# Load the data, handling duplicates and missing values
+# The file is streamed through the cleaning stages, which profile it and
+# collect the duplicates and fill values as it goes, so it is never held in memory
+pipeline = Pipeline('employment_history', build_stages('employment_history', until='missing_values'))
 try:
-    data = pd.read_csv('../data/employment_history.csv', nrows=500)
+    pipeline.fit()
 except Exception as e:
     print(f'Error reading the CSV file: {e}')
     exit()
+pipeline.stats.report()
 
 # Data quality metrics
-num_rows = data.shape[0]
-num_columns = data.shape[1]
-num_missing_values = data.isnull().sum().sum()
-num_duplicates = data.duplicated().sum()
-
-# Output the results
-print(f'Number of rows: {num_rows}')
-print(f'Number of columns: {num_columns}')
-print(f'Number of missing values: {num_missing_values}')
-print(f'Number of duplicates: {num_duplicates}')
-
-# Handling duplicates
-if num_duplicates > 0:
-    data = data.drop_duplicates()
-    print(f'Duplicates removed: {num_duplicates}')
-else:
-    print('No duplicates found.')
-
-# Handling missing values
-for column in data.columns:
-    if data[column].isnull().any():
-        if data[column].dtype == 'object':
-            # Fill missing categorical values with the mode
-            mode_value = data[column].mode()[0]
-            data[column].fillna(mode_value, inplace=True)
-        else:
-            # Fill missing numerical values with the mean
-            mean_value = data[column].mean()
-            data[column].fillna(mean_value, inplace=True)
+pipeline.profile.report()
+pipeline.stages[0].report()
 
 # Calculate correlations
-correlation_matrix = data.corr()
+# One pass over the cleaned chunks gives the full matrix and its p-values
+correlations = CorrelationAccumulator(numeric_columns('employment_history'))
+try:
+    for data in pipeline.iter_cleaned():
+        correlations.update(data)
+finally:
+    pipeline.close()
+correlation_matrix = correlations.correlation()
+p_values = correlations.p_values()
 print('Correlation matrix:')
 print(correlation_matrix)
 
@@ -49,11 +37,11 @@ print(correlation_matrix)
 # For example, if final_salary has a strong correlation with another variable, it might indicate a relationship
 for column in correlation_matrix.columns:
     if column != 'final_salary':
-        correlation, _ = pearsonr(data['final_salary'], data[column])
-        print(f'Correlation between final_salary and {column}: {correlation}')
+        correlation = correlation_matrix.loc['final_salary', column]
+        print(f'Correlation between final_salary and {column}: {correlation} (p-value {p_values.loc["final_salary", column]:.3g})')
         if correlation > 0.5:
             print(f'  Strong positive correlation with {column}.')
         elif correlation < -0.5:
             print(f'  Strong negative correlation with {column}.')
         else:
-            print(f'  Weak correlation with {column}.')
\ No newline at end of file
+            print(f'  Weak correlation with {column}.')
@@ -1,83 +1,83 @@
+import os
+import sys
 import pandas as pd
-from sklearn.cluster import KMeans
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-# Load the data 
-# Ingest the first 500 rows
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.clustering import Standardiser, fit_cached
+from common.correlation import numeric_columns
+from common.data_loader import ChunkWriter
+from common.employment_cube import load_cube
+from common.group_stats import group_stats
+from common.pipeline import Pipeline, build_stages
+from common.sampling import StratifiedSample
+
+# Load the data, handling duplicates and missing values and standardizing date formats
+# The file is streamed through the cleaning stages, which profile it and
+# collect the duplicates and fill values as it goes, so it is never held in memory
+pipeline = Pipeline('employment_history', build_stages('employment_history', until='formats'))
 try:
-    data = pd.read_csv('../data/employment_history.csv', nrows=500)
+    pipeline.fit()
 except Exception as e:
     print(f'Error reading the CSV file: {e}')
     exit()
+pipeline.stats.report()
 
 # Data quality metrics
-num_rows = data.shape[0]
-num_columns = data.shape[1]
-num_missing_values = data.isnull().sum().sum()
-num_duplicates = data.duplicated().sum()
-
-# Output the results
-print(f'Number of rows: {num_rows}')
-print(f'Number of columns: {num_columns}')
-print(f'Number of missing values: {num_missing_values}')
-print(f'Number of duplicates: {num_duplicates}')
-
-# Handling duplicates
-if num_duplicates > 0:
-    data = data.drop_duplicates()
-    print(f'Duplicates removed: {num_duplicates}')
-else:
-    print('No duplicates found.')
-
-# Handling missing values
-for column in data.columns:
-    if data[column].isnull().any():
-        if data[column].dtype == 'object':
-            # Fill missing categorical values with the mode
-            mode_value = data[column].mode()[0]
-            data[column].fillna(mode_value, inplace=True)
-        else:
-            # Fill missing numerical values with the mean
-            mean_value = data[column].mean()
-            data[column].fillna(mean_value, inplace=True)
-
-# Standardizing date formats
-for column in data.columns:
-    if 'date' in column.lower():
-        data[column] = pd.to_datetime(data[column], errors='coerce').dt.strftime('%Y-%m-%d')
+pipeline.profile.report()
+pipeline.stages[0].report()
 
 # Temporal patterns analysis
-# Assuming there is a 'date' column to analyze trends over time
-if 'date' in data.columns:
-    data['date'] = pd.to_datetime(data['date'])
-    data.set_index('date', inplace=True)
-    data.resample('M').size().plot()
-    plt.title('Monthly Employment Trends')
-    plt.xlabel('Date')
-    plt.ylabel('Number of Records')
-    plt.show()
+# Monthly start and end counts come from the pre-aggregated employment cube,
+# which only reads rows added since it was last built
+cube = load_cube()
+monthly_starts = cube.aggregate(measure='starts', freq='M').set_index('period')['starts']
+monthly_ends = cube.aggregate(measure='ends', freq='M').set_index('period')['ends']
+monthly_starts.plot(label='Starts')
+monthly_ends.plot(label='Ends')
+plt.title('Monthly Employment Trends')
+plt.xlabel('Date')
+plt.ylabel('Number of Records')
+plt.legend()
+plt.show()
 
 # Clustering analysis
-# Assuming we have numerical features to cluster
-numerical_data = data.select_dtypes(include=['float64', 'int64'])
-if not numerical_data.empty:
-    kmeans = KMeans(n_clusters=3)
-    clusters = kmeans.fit_predict(numerical_data)
-    data['Cluster'] = clusters
-    sns.scatterplot(x=numerical_data.iloc[:, 0], y=numerical_data.iloc[:, 1], hue=data['Cluster'], palette='viridis')
-    plt.title('Clustering of Employment Data')
-    plt.xlabel('Feature 1')
-    plt.ylabel('Feature 2')
-    plt.show()
+# The scaling is collected over every cleaned row and the clusters are fitted
+# on a sample of them (with each column's extreme rows), then every row is
+# assigned to its nearest cluster as the cleaned chunks stream by
+numerical_columns = numeric_columns('employment_history')
+standardiser = Standardiser(numerical_columns)
+sampler = StratifiedSample(size=50_000, columns=numerical_columns)
+cleaned_file_path = 'EDA_files/eda_patterns_employment_history.csv'
+writer = ChunkWriter(cleaned_file_path)
+partials = []
+try:
+    for data in pipeline.iter_cleaned():
+        standardiser.update(data)
+        sampler.update(data)
+    sample = sampler.sample()
+    kmeans = fit_cached(standardiser.transform(sample), 3)
+    for data in pipeline.iter_cleaned():
+        data['Cluster'] = kmeans.predict(standardiser.transform(data))
+        partials.append(group_stats(data, 'Cluster', numerical_columns))
+        writer.write(data)
+finally:
+    pipeline.close()
+
+sample['Cluster'] = kmeans.labels_
+sns.scatterplot(x=sample[numerical_columns[0]], y=sample[numerical_columns[1]], hue=sample['Cluster'], palette='viridis')
+plt.title(f'Clustering of Employment Data ({sampler.label()})')
+plt.xlabel('Feature 1')
+plt.ylabel('Feature 2')
+plt.show()
 
 # Infer insights from the patterns
-# For example, we can look at the mean of each cluster
-cluster_means = data.groupby('Cluster').mean()
+# For example, we can look at the mean of each cluster, from the sums and counts of every chunk
+totals = pd.concat(partials).groupby(level=0).sum()
+cluster_means = totals.xs('sum', axis=1, level=1) / totals.xs('count', axis=1, level=1)
 print('Cluster Means:')
 print(cluster_means)
 
-# Save the cleaned data to a new CSV file
-cleaned_file_path = 'cleaning_files/cleaned_member_employers.csv'
-data.to_csv(cleaned_file_path, index=False)
-print(f'Cleaned data saved to {cleaned_file_path}')
\ No newline at end of file
+# Save the EDA's cleaned data next to this script, apart from the pipeline's cleaning_files/ output
+print(f'Cleaned data ({writer.rows} rows) saved to {cleaned_file_path}')
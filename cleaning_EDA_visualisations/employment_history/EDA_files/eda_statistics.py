@@ -1,56 +1,49 @@
-import pandas as pd
-from scipy import stats
-
-# Load the data
-# Ingest the first 500 rows
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.categorical_stats import CategoricalStats, text_columns
+from common.correlation import numeric_columns
+from common.data_loader import ChunkWriter
+from common.numeric_stats import NumericStats
+from common.pipeline import Pipeline, build_stages
+
+# Load the data, handling duplicates and missing values
+# The file is streamed through the cleaning stages, which profile it and
+# collect the duplicates and fill values as it goes, so it is never held in memory
+pipeline = Pipeline('employment_history', build_stages('employment_history', until='missing_values'))
 try:
-    data = pd.read_csv('../data/employment_history.csv', nrows=500)
+    pipeline.fit()
 except Exception as e:
     print(f'Error reading the CSV file: {e}')
     exit()
+pipeline.stats.report()
 
 # Data quality metrics
-num_rows = data.shape[0]
-num_columns = data.shape[1]
-num_missing_values = data.isnull().sum().sum()
-num_duplicates = data.duplicated().sum()
-
-# Output the results
-print(f'Number of rows: {num_rows}')
-print(f'Number of columns: {num_columns}')
-print(f'Number of missing values: {num_missing_values}')
-print(f'Number of duplicates: {num_duplicates}')
-
-# Handling duplicates
-if num_duplicates > 0:
-    data = data.drop_duplicates()
-    print(f'Duplicates removed: {num_duplicates}')
-else:
-    print('No duplicates found.')
-
-# Handling missing values
-for column in data.columns:
-    if data[column].isnull().any():
-        if data[column].dtype == 'object':
-            # Fill missing categorical values with the mode
-            mode_value = data[column].mode()[0]
-            data[column].fillna(mode_value, inplace=True)
-        else:
-            # Fill missing numerical values with the mean
-            mean_value = data[column].mean()
-            data[column].fillna(mean_value, inplace=True)
-
-# Calculate descriptive statistics for numerical columns
-numerical_stats = data.describe(include='number')
+pipeline.profile.report()
+pipeline.stages[0].report()
+
+# Calculate descriptive statistics, saving the cleaned chunks as they pass
+# Quartiles, distinct counts and top values come from mergeable sketches for large columns
+numerical_stats = NumericStats(numeric_columns('employment_history'))
+categorical_stats = CategoricalStats(text_columns('employment_history'))
+cleaned_file_path = 'EDA_files/eda_statistics_employment_history.csv'
+writer = ChunkWriter(cleaned_file_path)
+try:
+    for data in pipeline.iter_cleaned():
+        numerical_stats.update(data)
+        categorical_stats.update(data)
+        writer.write(data)
+finally:
+    pipeline.close()
+
+# Descriptive statistics for numerical columns
 print('Descriptive statistics for numerical columns:')
-print(numerical_stats)
+print(numerical_stats.describe())
 
-# Calculate descriptive statistics for categorical columns
-categorical_stats = data.describe(include='object')
+# Descriptive statistics for categorical columns
 print('Descriptive statistics for categorical columns:')
-print(categorical_stats)
+print(categorical_stats.describe())
 
-# Save the cleaned data to a new CSV file
-cleaned_file_path = 'cleaning_files/cleaned_member_employers.csv'
-data.to_csv(cleaned_file_path, index=False)
-print(f'Cleaned data saved to {cleaned_file_path}')
\ No newline at end of file
+# Save the EDA's cleaned data next to this script, apart from the pipeline's cleaning_files/ output
+print(f'Cleaned data ({writer.rows} rows) saved to {cleaned_file_path}')
@@ -1,47 +1,14 @@
-import pandas as pd
+import os
+import sys
 
-# Load the data
-# Ingest the first 500 rows
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.pipeline import run_pipeline
+
+# Handling duplicates
+# The steps run in memory over a single read of the source file and the
+# result is written once to cleaning_files/cleaned_employment_history.csv
 try:
-    data = pd.read_csv('../data/employment_history.csv', nrows=500)
+    run_pipeline('employment_history', until='duplicates')
 except Exception as e:
-    print(f'Error reading the CSV file: {e}')
+    print(f'Error cleaning the data: {e}')
     exit()
-
-# Data quality metrics
-num_rows = data.shape[0]
-num_columns = data.shape[1]
-num_missing_values = data.isnull().sum().sum()
-num_duplicates = data.duplicated().sum()
-data_types = data.dtypes
-
-# Output the results
-print(f'Number of rows: {num_rows}')
-print(f'Number of columns: {num_columns}')
-print(f'Number of missing values: {num_missing_values}')
-print(f'Number of duplicates: {num_duplicates}')
-print(f'Data types:\n{data_types}')
-
-# Handling duplicates
-if num_duplicates > 0:
-    data = data.drop_duplicates()
-    print(f'Duplicates removed: {num_duplicates}')
-else:
-    print('No duplicates found.')
-
-# Handling missing values
-for column in data.columns:
-    if data[column].isnull().any():
-        if data[column].dtype == 'object':
-            # Fill missing categorical values with the mode
-            mode_value = data[column].mode()[0]
-            data[column].fillna(mode_value, inplace=True)
-        else:
-            # Fill missing numerical values with the mean
-            mean_value = data[column].mean()
-            data[column].fillna(mean_value, inplace=True)
-
-# Save the cleaned data to a new CSV file
-cleaned_file_path = 'cleaning_files/cleaned_member_employers.csv'
-data.to_csv(cleaned_file_path, index=False)
-print(f'Cleaned data saved to {cleaned_file_path}')
\ No newline at end of file
@@ -1,42 +1,20 @@
-import pandas as pd
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.data_loader import LoadStats, iter_chunks
+from common.profiler import TableProfile
 
 # Load the data
-data = pd.read_csv('../data/employment_history.csv', nrows=500)
+# Stream the full file in chunks to keep memory bounded
+stats = LoadStats('employment_history')
 
-# Data quality metrics
-num_rows = data.shape[0]
-num_columns = data.shape[1]
-num_missing_values = data.isnull().sum().sum()
-num_duplicates = data.duplicated().sum()
-data_types = data.dtypes
+# Data quality metrics are collected in a single pass as the chunks stream by
+profile = TableProfile('employment_history')
+for data in iter_chunks('employment_history', stats=stats):
+    profile.update(data)
 
 # Output the results
-print(f"Number of rows: {num_rows}")
-print(f"Number of columns: {num_columns}")
-print(f"Number of missing values: {num_missing_values}")
-print(f"Number of duplicates: {num_duplicates}")
-print(f"Data types:\n{data_types}")
-
-# Handling duplicates
-if num_duplicates > 0:
-    data = data.drop_duplicates()
-    print(f"Duplicates removed: {num_duplicates}")
-else:
-    print("No duplicates found.")
-
-# Handling missing values
-for column in data.columns:
-    if data[column].isnull().any():
-        if data[column].dtype == 'object':
-            # Fill missing categorical values with the mode
-            mode_value = data[column].mode()[0]
-            data[column].fillna(mode_value, inplace=True)
-        else:
-            # Fill missing numerical values with the mean
-            mean_value = data[column].mean()
-            data[column].fillna(mean_value, inplace=True)
-
-# Save the cleaned data to a new CSV file
-cleaned_file_path = 'cleaning_files/cleaned_member_employers.csv'
-data.to_csv(cleaned_file_path, index=False)
-print(f'Cleaned data saved to {cleaned_file_path}')
\ No newline at end of file
+profile.report()
+profile.to_json('cleaning_files/profile_employment_history.json')
+stats.report()
@@ -1,56 +1,14 @@
-import pandas as pd
-from scipy import stats
-
-# Load the data
-# Ingest the first 500 rows
-data = pd.read_csv('../data/employment_history.csv', nrows=500)
-
-# Data quality metrics
-num_rows = data.shape[0]
-num_columns = data.shape[1]
-num_missing_values = data.isnull().sum().sum()
-num_duplicates = data.duplicated().sum()
-
-# Output the results
-print(f"Number of rows: {num_rows}")
-print(f"Number of columns: {num_columns}")
-print(f"Number of missing values: {num_missing_values}")
-print(f"Number of duplicates: {num_duplicates}")
-
-# Handling duplicates
-if num_duplicates > 0:
-    data = data.drop_duplicates()
-    print(f"Duplicates removed: {num_duplicates}")
-else:
-    print("No duplicates found.")
-
-# Handling missing values
-for column in data.columns:
-    if data[column].isnull().any():
-        if data[column].dtype == 'object':
-            # Fill missing categorical values with the mode
-            mode_value = data[column].mode()[0]
-            data[column].fillna(mode_value, inplace=True)
-        else:
-            # Fill missing numerical values with the mean
-            mean_value = data[column].mean()
-            data[column].fillna(mean_value, inplace=True)
-
-# Identify outliers using Z-score
-z_scores = stats.zscore(data.select_dtypes(include=['float64', 'int64']))
-abs_z_scores = abs(z_scores)
-filtered_entries = (abs_z_scores < 3).all(axis=1)
-
-# Filter the data to remove outliers
-data_no_outliers = data[filtered_entries]
-
-# Alternatively, identify outliers using IQR
-Q1 = data.quantile(0.25)
-Q3 = data.quantile(0.75)
-IQR = Q3 - Q1
-outlier_condition = ~((data < (Q1 - 1.5 * IQR)) | (data > (Q3 + 1.5 * IQR))).any(axis=1)
-
-# Save the cleaned data to a new CSV file
-cleaned_file_path = 'cleaning_files/cleaned_member_employers.csv'
-data_no_outliers.to_csv(cleaned_file_path, index=False)
-print(f'Cleaned data saved to {cleaned_file_path}')
\ No newline at end of file
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.pipeline import run_pipeline
+
+# Handling duplicates, missing values and formats, then removing outliers
+# The steps run in memory over a single read of the source file and the
+# result is written once to cleaning_files/cleaned_employment_history.csv
+try:
+    run_pipeline('employment_history', until='outliers')
+except Exception as e:
+    print(f'Error cleaning the data: {e}')
+    exit()
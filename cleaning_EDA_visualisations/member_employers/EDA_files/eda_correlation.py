@@ -1,10 +1,14 @@
-import pandas as pd
+import os
+import sys
 
-# Load the data
-data = pd.read_csv('../data/member_employers.csv', nrows=500)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.correlation import correlate_table
 
 # Calculate correlations
-correlation_matrix = data.corr()
+# The file is streamed once, accumulating the sums behind every pairwise
+# correlation, so the whole file is used without loading it into memory
+correlations = correlate_table('member_employers')
+correlation_matrix = correlations.correlation()
 
 # Output the correlation matrix
 print("Correlation Matrix:")
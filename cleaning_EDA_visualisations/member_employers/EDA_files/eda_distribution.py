@@ -1,66 +1,55 @@
-import pandas as pd
-from scipy import stats
-
-# Load the data
-# Ingest the first 500 rows
-data = pd.read_csv('../data/member_employers.csv', nrows=500)
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.categorical_stats import CategoricalStats, text_columns
+from common.correlation import numeric_columns
+from common.data_loader import ChunkWriter
+from common.numeric_stats import NumericStats
+from common.outliers import OUTLIER_COLUMNS, OutlierDetector
+from common.pipeline import Pipeline, build_stages
+
+# Load the data, handling duplicates and missing values
+# The file is streamed through the cleaning stages, which profile it and
+# collect the duplicates and fill values as it goes, so it is never held in memory
+pipeline = Pipeline('member_employers', build_stages('member_employers', until='missing_values'))
+pipeline.fit()
+pipeline.stats.report()
 
 # Data quality metrics
-num_rows = data.shape[0]
-num_columns = data.shape[1]
-num_missing_values = data.isnull().sum().sum()
-num_duplicates = data.duplicated().sum()
-
-# Output the results
-print(f"Number of rows: {num_rows}")
-print(f"Number of columns: {num_columns}")
-print(f"Number of missing values: {num_missing_values}")
-print(f"Number of duplicates: {num_duplicates}")
-
-# Handling duplicates
-if num_duplicates > 0:
-    data = data.drop_duplicates()
-    print(f"Duplicates removed: {num_duplicates}")
-else:
-    print("No duplicates found.")
-
-# Handling missing values
-for column in data.columns:
-    if data[column].isnull().any():
-        if data[column].dtype == 'object':
-            # Fill missing categorical values with the mode
-            mode_value = data[column].mode()[0]
-            data[column].fillna(mode_value, inplace=True)
-        else:
-            # Fill missing numerical values with the mean
-            mean_value = data[column].mean()
-            data[column].fillna(mean_value, inplace=True)
-
-# Calculate descriptive statistics for numerical columns
-numerical_stats = data.describe()
+pipeline.profile.report()
+pipeline.stages[0].report()
+
+# Calculate descriptive statistics and identify outliers using Z-score (method='iqr' for the IQR rule instead)
+# The first pass over the cleaned chunks collects the statistics, including the
+# mean, variance and quartiles of the measure columns; the second writes the rows that are kept
+numerical_stats = NumericStats(numeric_columns('member_employers'))
+categorical_stats = CategoricalStats(text_columns('member_employers'))
+outliers = OutlierDetector(OUTLIER_COLUMNS['member_employers'])
+cleaned_file_path = 'cleaned_member_employers.csv'
+writer = ChunkWriter(cleaned_file_path)
+try:
+    for data in pipeline.iter_cleaned():
+        numerical_stats.update(data)
+        categorical_stats.update(data)
+        outliers.update(data)
+    for data in pipeline.iter_cleaned():
+        # Filter the data to remove outliers
+        data_no_outliers, _ = outliers.split(data)
+        writer.write(data_no_outliers)
+finally:
+    pipeline.close()
+
+# Descriptive statistics for numerical columns
 print('Descriptive statistics for numerical columns:')
-print(numerical_stats)
+print(numerical_stats.describe())
 
-# Calculate descriptive statistics for categorical columns
-categorical_stats = data.describe(include=['object'])
+# Descriptive statistics for categorical columns
 print('Descriptive statistics for categorical columns:')
-print(categorical_stats)
-
-# Identify outliers using Z-score
-z_scores = stats.zscore(data.select_dtypes(include=['float64', 'int64']))
-abs_z_scores = abs(z_scores)
-filtered_entries = (abs_z_scores < 3).all(axis=1)
+print(categorical_stats.describe())
 
-# Filter the data to remove outliers
-data_no_outliers = data[filtered_entries]
-
-# Alternatively, identify outliers using IQR
-Q1 = data.quantile(0.25)
-Q3 = data.quantile(0.75)
-IQR = Q3 - Q1
-outlier_condition = ~((data < (Q1 - 1.5 * IQR)) | (data > (Q3 + 1.5 * IQR))).any(axis=1)
+# Outliers removed
+print(outliers.summary())
 
 # Save the cleaned data to a new CSV file
-cleaned_file_path = 'cleaned_member_employers.csv'
-data_no_outliers.to_csv(cleaned_file_path, index=False)
-print(f'Cleaned data saved to {cleaned_file_path}')
\ No newline at end of file
+print(f'Cleaned data ({writer.rows} rows) saved to {cleaned_file_path}')
@@ -1,36 +1,44 @@
-import pandas as pd
+import os
+import sys
 import numpy as np
 
-# Load the data
-# Reading the first 500 rows of the dataset
-data = pd.read_csv('../data/superannuation_members.csv', nrows=500)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.correlation import numeric_columns
+from common.data_loader import LoadStats, iter_chunks
+from common.numeric_stats import NumericStats
+from common.outliers import OutlierDetector
 
-# Function to identify outliers using Z-score
-def identify_outliers_z(data):
-    threshold = 3
-    mean = np.mean(data)
-    std_dev = np.std(data)
-    z_scores = [(y - mean) / std_dev for y in data]
-    return np.where(np.abs(z_scores) > threshold)
+# Load the data
+# The file is streamed twice: the first pass collects the distribution and the
+# mean, variance and quartiles of every numerical column, the second flags the outliers
+stats = LoadStats('superannuation_members')
+numerical_columns = numeric_columns('superannuation_members')
+distributions = NumericStats(numerical_columns)
+outliers = OutlierDetector(numerical_columns)
+for data in iter_chunks('superannuation_members', stats=stats):
+    distributions.update(data)
+    outliers.update(data)
+stats.report()
 
-# Function to identify outliers using IQR
-def identify_outliers_iqr(data):
-    Q1 = np.percentile(data, 25)
-    Q3 = np.percentile(data, 75)
-    IQR = Q3 - Q1
-    lower_bound = Q1 - 1.5 * IQR
-    upper_bound = Q3 + 1.5 * IQR
-    return np.where((data < lower_bound) | (data > upper_bound))
+# Row numbers of the outlying values of each column
+outliers_z = {column: [] for column in numerical_columns}
+outliers_iqr = {column: [] for column in numerical_columns}
+start = 0
+for data in iter_chunks('superannuation_members'):
+    flags_z = outliers.column_flags(data)
+    flags_iqr = outliers.column_flags(data, method='iqr')
+    for column in numerical_columns:
+        outliers_z[column].append(start + np.flatnonzero(flags_z[column]))
+        outliers_iqr[column].append(start + np.flatnonzero(flags_iqr[column]))
+    start += len(data)
 
 # Analyze numerical columns
-for column in data.select_dtypes(include=[np.number]).columns:
+for column in numerical_columns:
     print(f'\nAnalyzing column: {column}')
-    # Calculate and print distribution
-    distribution = data[column].describe()
+    # Print distribution
+    distribution = distributions.summary(column)
     print(f'Distribution for {column}:\n{distribution}')
-    
-    # Identify outliers
-    outliers_z = identify_outliers_z(data[column])
-    outliers_iqr = identify_outliers_iqr(data[column])
-    print(f'Z-score outliers in {column}: {outliers_z}')
-    print(f'IQR outliers in {column}: {outliers_iqr}')
+
+    # Print outliers
+    print(f'Z-score outliers in {column}: {np.concatenate(outliers_z[column])}')
+    print(f'IQR outliers in {column}: {np.concatenate(outliers_iqr[column])}')
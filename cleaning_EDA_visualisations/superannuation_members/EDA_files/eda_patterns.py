@@ -1,53 +1,61 @@
+import os
+import sys
 import pandas as pd
-import numpy as np
-from sklearn.cluster import KMeans
 import matplotlib.pyplot as plt
 import seaborn as sns
 
-# Load the data
-# Reading the first 500 rows of the dataset
-data = pd.read_csv('../data/superannuation_members.csv', nrows=500)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.clustering import Standardiser, fit_cached
+from common.dates import normalise_dates
+from common.features import age
+from common.pipeline import ImputeStage, Pipeline
+from common.sampling import StratifiedSample
 
-# Data quality metrics
-num_rows = data.shape[0]
-num_columns = data.shape[1]
-num_missing_values = data.isnull().sum().sum()
-num_duplicates = data.duplicated().sum()
+# Load the data, handling missing values
+# The file is streamed through the imputation stage, which collects the fill
+# values as it goes (or reuses those saved by an earlier run), so it is never held in memory
+pipeline = Pipeline('superannuation_members', [ImputeStage('superannuation_members')])
+pipeline.fit()
 
-# Output the results
-print(f"Number of rows: {num_rows}")
-print(f"Number of columns: {num_columns}")
-print(f"Number of missing values: {num_missing_values}")
-print(f"Number of duplicates: {num_duplicates}")
+# Temporal patterns analysis (example: analyzing date_of_birth) and
+# clustering analysis (example: clustering based on salary and super balance)
+# One pass over the filled chunks counts the members of each age and collects
+# the scaling and a sample (with the extreme rows) for the clusters
+as_of = pd.Timestamp.today().normalize()
+date_normalisers = {}
+age_counts = pd.Series(dtype='int64')
+features = ['salary', 'super_balance']
+standardiser = Standardiser(features)
+sampler = StratifiedSample(size=50_000, columns=features)
+try:
+    for data in pipeline.iter_cleaned():
+        data = normalise_dates(data, ['date_of_birth'], normalisers=date_normalisers)
+        # Age is derived as in the gold layer's DIM_MEMBER
+        age_counts = age_counts.add(age(data['date_of_birth'], as_of).value_counts(), fill_value=0)
+        standardiser.update(data)
+        sampler.update(data[features])
+finally:
+    pipeline.close()
+pipeline.stats.report()
 
-# Handling missing values
-for column in data.columns:
-    if data[column].isnull().any():
-        if data[column].dtype == 'object':
-            mode_value = data[column].mode()[0]
-            data[column].fillna(mode_value, inplace=True)
-        else:
-            mean_value = data[column].mean()
-            data[column].fillna(mean_value, inplace=True)
+# Data quality metrics, profiled on the first read of the file
+pipeline.profile.report()
+pipeline.stages[0].report()
 
-# Temporal patterns analysis (example: analyzing date_of_birth)
-if 'date_of_birth' in data.columns:
-    data['date_of_birth'] = pd.to_datetime(data['date_of_birth'], errors='coerce')
-    data['age'] = (pd.to_datetime('today') - data['date_of_birth']).dt.days // 365
-    plt.figure(figsize=(10, 6))
-    sns.histplot(data['age'], bins=30, kde=True)
-    plt.title('Age Distribution')
-    plt.xlabel('Age')
-    plt.ylabel('Frequency')
-    plt.show()
+plt.figure(figsize=(10, 6))
+sns.histplot(x=age_counts.index, weights=age_counts.to_numpy(), bins=30, kde=True)
+plt.title('Age Distribution')
+plt.xlabel('Age')
+plt.ylabel('Frequency')
+plt.show()
 
-# Clustering analysis (example: clustering based on salary and super balance)
-if 'salary' in data.columns and 'super_balance' in data.columns:
-    kmeans = KMeans(n_clusters=3)
-    data['cluster'] = kmeans.fit_predict(data[['salary', 'super_balance']])
-    plt.figure(figsize=(10, 6))
-    sns.scatterplot(data=data, x='salary', y='super_balance', hue='cluster', palette='viridis')
-    plt.title('Clustering of Salary and Super Balance')
-    plt.xlabel('Salary')
-    plt.ylabel('Super Balance')
-    plt.show()
+# Features are scaled so super_balance does not dominate the distances
+sample = sampler.sample()
+kmeans = fit_cached(standardiser.transform(sample), 3)
+sample['cluster'] = kmeans.labels_
+plt.figure(figsize=(10, 6))
+sns.scatterplot(data=sample, x='salary', y='super_balance', hue='cluster', palette='viridis')
+plt.title(f'Clustering of Salary and Super Balance ({sampler.label()})')
+plt.xlabel('Salary')
+plt.ylabel('Super Balance')
+plt.show()
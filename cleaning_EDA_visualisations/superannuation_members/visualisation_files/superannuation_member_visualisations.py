@@ -1,132 +1,83 @@
 import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+from common.data_loader import LoadStats, read_table
+from common.dates import normalise_dates
+from common.features import age
+from common.rendering import Renderer
+
+# Load the full file through the shared streaming loader
+stats = LoadStats('superannuation_members')
+df = read_table('superannuation_members', stats=stats)
+stats.report()
 
-# Load the first 500 rows of the dataset
-file_path = '../../../data/superannuation_members.csv'
-df = pd.read_csv(file_path)
 output_path = 'data_visualisations'
-if not os.path.exists(output_path):
-    os.makedirs(output_path)
 
 # Convert date_of_birth to datetime format
 if 'date_of_birth' in df.columns:
-    df['date_of_birth'] = pd.to_datetime(df['date_of_birth'], errors='coerce')
+    df = normalise_dates(df, ['date_of_birth'])
 
-# Set seaborn style
-sns.set(style='whitegrid')
+# Every figure is queued on a renderer, which draws them in parallel on worker
+# processes (whitegrid style, Agg backend) and saves them to output_path
+renderer = Renderer(df, output_path)
 
 # 1. Distribution of Salary
-plt.figure(figsize=(10, 6))
-sns.histplot(df['salary'].dropna(), bins=30, kde=True, color='skyblue')
-plt.title('Distribution of Salary')
-plt.xlabel('Salary')
-plt.ylabel('Frequency')
-plt.tight_layout()
-plt.savefig(output_path+'/'+'salary_distribution.png')
-plt.show()
-plt.close()
+renderer.add('salary_distribution', 'histplot', x='salary', bins=30, kde=True, color='skyblue',
+             title='Distribution of Salary', xlabel='Salary', ylabel='Frequency')
 
 # 2. Boxplot of Super Balance by Gender
 if 'gender' in df.columns:
-    plt.figure(figsize=(10, 6))
-    sns.boxplot(x='gender', y='super_balance', data=df, palette='pastel')
-    plt.title('Super Balance Distribution by Gender')
-    plt.xlabel('Gender')
-    plt.ylabel('Super Balance')
-    plt.tight_layout()
-    plt.savefig(output_path+'/'+'super_balance_by_gender.png')
-    plt.show()
-    plt.close()
+    renderer.add('super_balance_by_gender', 'boxplot', x='gender', y='super_balance', palette='pastel',
+                 title='Super Balance Distribution by Gender', xlabel='Gender', ylabel='Super Balance')
 
 # 3. Scatter plot of Salary vs Super Balance colored by Employment Status
 if all(col in df.columns for col in ['salary', 'super_balance', 'employment_status']):
-    plt.figure(figsize=(12, 7))
-    sns.scatterplot(x='salary', y='super_balance', hue='employment_status', data=df, palette='Set2')
-    plt.title('Salary vs Super Balance by Employment Status')
-    plt.xlabel('Salary')
-    plt.ylabel('Super Balance')
-    plt.legend(title='Employment Status', bbox_to_anchor=(1.05, 1), loc='upper left')
-    plt.tight_layout()
-    plt.savefig(output_path+'/'+'salary_vs_super_balance.png')
-    plt.show()
-    plt.close()
+    renderer.add('salary_vs_super_balance', 'scatterplot', x='salary', y='super_balance', hue='employment_status',
+                 palette='Set2', figsize=(12, 7), title='Salary vs Super Balance by Employment Status',
+                 xlabel='Salary', ylabel='Super Balance',
+                 legend={'title': 'Employment Status', 'bbox_to_anchor': (1.05, 1), 'loc': 'upper left'})
 
 # 4. Bar plot of Count of Members by Investment Option
 if 'investment_option' in df.columns:
-    plt.figure(figsize=(12, 6))
-    order = df['investment_option'].value_counts().index
-    sns.countplot(y='investment_option', data=df, order=order, palette='viridis')
-    plt.title('Count of Members by Investment Option')
-    plt.xlabel('Count')
-    plt.ylabel('Investment Option')
-    plt.tight_layout()
-    plt.savefig(output_path+'/'+'members_by_investment_option.png')
-    plt.show()
-    plt.close()
+    order = df['investment_option'].value_counts().index.tolist()
+    renderer.add('members_by_investment_option', 'countplot', y='investment_option', order=order, palette='viridis',
+                 figsize=(12, 6), title='Count of Members by Investment Option', xlabel='Count',
+                 ylabel='Investment Option')
 
 # 5. Boxplot of Employer Contribution Rate by Insurance Coverage
 if all(col in df.columns for col in ['employer_contribution_rate', 'insurance_coverage']):
-    plt.figure(figsize=(12, 7))
-    sns.boxplot(x='insurance_coverage', y='employer_contribution_rate', data=df, palette='coolwarm')
-    plt.title('Employer Contribution Rate by Insurance Coverage')
-    plt.xlabel('Insurance Coverage')
-    plt.ylabel('Employer Contribution Rate')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(output_path+'/'+'employer_contribution_by_insurance.png')
-    plt.show()
-    plt.close()
+    renderer.add('employer_contribution_by_insurance', 'boxplot', x='insurance_coverage',
+                 y='employer_contribution_rate', palette='coolwarm', figsize=(12, 7), xticks_rotation=45,
+                 title='Employer Contribution Rate by Insurance Coverage', xlabel='Insurance Coverage',
+                 ylabel='Employer Contribution Rate')
 
 # 6. Scatter plot with regression: Employee Contribution Rate vs Employer Contribution Rate
 if all(col in df.columns for col in ['employee_contribution_rate', 'employer_contribution_rate']):
-    plt.figure(figsize=(10, 6))
-    sns.regplot(x='employee_contribution_rate', y='employer_contribution_rate', data=df, scatter_kws={'alpha':0.5}, line_kws={'color':'red'})
-    plt.title('Employee Contribution Rate vs Employer Contribution Rate')
-    plt.xlabel('Employee Contribution Rate')
-    plt.ylabel('Employer Contribution Rate')
-    plt.tight_layout()
-    plt.savefig(output_path+'/'+'employee_vs_employer_contribution.png')
-    plt.show()
-    plt.close()
+    renderer.add('employee_vs_employer_contribution', 'regplot', x='employee_contribution_rate',
+                 y='employer_contribution_rate', scatter_kws={'alpha':0.5}, line_kws={'color':'red'},
+                 title='Employee Contribution Rate vs Employer Contribution Rate',
+                 xlabel='Employee Contribution Rate', ylabel='Employer Contribution Rate')
 
 # 7. Age Distribution Histogram
-import numpy as np
+# Age is derived as in the gold layer's DIM_MEMBER, as at today's date
 if 'date_of_birth' in df.columns:
-    today = pd.Timestamp('today')
-    df['age'] = df['date_of_birth'].apply(lambda x: (today - x).days // 365 if pd.notnull(x) else np.nan)
-    plt.figure(figsize=(10, 6))
-    sns.histplot(df['age'].dropna(), bins=30, kde=True, color='green')
-    plt.title('Age Distribution of Members')
-    plt.xlabel('Age')
-    plt.ylabel('Count')
-    plt.tight_layout()
-    plt.savefig(output_path+'/'+'age_distribution.png')
-    plt.show()
-    plt.close()
+    as_of = pd.Timestamp.today().normalize()
+    df['age'] = age(df['date_of_birth'], as_of=as_of)
+    renderer.add('age_distribution', 'histplot', x='age', bins=30, kde=True, color='green',
+                 title='Age Distribution of Members', xlabel='Age', ylabel='Count')
 
 # 8. Violin plot of Super Balance by Employment Status
 if all(col in df.columns for col in ['super_balance', 'employment_status']):
-    plt.figure(figsize=(12, 7))
-    sns.violinplot(x='employment_status', y='super_balance', data=df, palette='muted', inner='quartile')
-    plt.title('Super Balance Distribution by Employment Status')
-    plt.xlabel('Employment Status')
-    plt.ylabel('Super Balance')
-    plt.xticks(rotation=45)
-    plt.tight_layout()
-    plt.savefig(output_path+'/'+'super_balance_by_employment_status.png')
-    plt.show() 
-    plt.close()
+    renderer.add('super_balance_by_employment_status', 'violinplot', x='employment_status', y='super_balance',
+                 palette='muted', inner='quartile', figsize=(12, 7), xticks_rotation=45,
+                 title='Super Balance Distribution by Employment Status', xlabel='Employment Status',
+                 ylabel='Super Balance')
 
 # 9. Bar plot of Gender counts
 if 'gender' in df.columns:
-    plt.figure(figsize=(6, 5))
-    sns.countplot(x='gender', data=df, palette='husl')
-    plt.title('Count of Members by Gender')
-    plt.xlabel('Gender')
-    plt.ylabel('Count')
-    plt.tight_layout()
-    plt.savefig(output_path+'/'+'members_by_gender.png')
-    plt.show()
-    plt.close()
+    renderer.add('members_by_gender', 'countplot', x='gender', palette='husl', figsize=(6, 5),
+                 title='Count of Members by Gender', xlabel='Gender', ylabel='Count')
+
+renderer.render()
@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Source files and derived caches go to a scratch folder, set before common is imported
+_SCRATCH = tempfile.mkdtemp(prefix='superannuation_tests_')
+os.environ['SUPERANNUATION_DATA_DIR'] = _SCRATCH
+os.environ['SUPERANNUATION_CACHE_DIR'] = os.path.join(_SCRATCH, '.cache')
+os.environ['SUPERANNUATION_COLUMNAR_CACHE'] = '0'
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from common.categorical_stats import CategoricalStats, describe_categorical
+
+
+def _data(rows=6_000, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'gender': rng.choice(['male', 'female', 'other', None], rows, p=[0.55, 0.35, 0.05, 0.05]),
+        'member_id': [f'MEM{i:06d}' for i in rng.integers(0, 3_000, rows)],
+    }, dtype=object)
+
+
+def test_exact_matches_describe():
+    data = _data()
+    stats = describe_categorical(data, chunksize=1_000)
+    assert not stats.approximate_columns
+    expected = data.describe(include='object')
+    described = stats.describe()
+    for column in ['gender', 'member_id']:
+        assert described.loc['count', column] == expected.loc['count', column]
+        assert described.loc['unique', column] == expected.loc['unique', column]
+        assert described.loc['freq', column] == expected.loc['freq', column]
+    assert described.loc['top', 'gender'] == expected.loc['top', 'gender']
+
+
+def test_sketched_columns_close_to_describe():
+    data = _data()
+    chunks = [data.iloc[start:start + 1_000] for start in range(0, len(data), 1_000)]
+    # Worker partials that switch to sketches part way through, then merged
+    stats = CategoricalStats(data.columns, exact_limit=500)
+    for chunk in chunks:
+        stats.merge(CategoricalStats(data.columns, exact_limit=500).update(chunk))
+    assert stats.approximate_columns == ['member_id']
+    described = stats.describe()
+    unique = data['member_id'].nunique()
+    assert described.loc['count', 'member_id'] == len(data)
+    assert abs(described.loc['unique', 'member_id'] - unique) < 0.05 * unique
+    # Low-cardinality columns stay exact
+    assert described.loc['unique', 'gender'] == data['gender'].nunique()
+    assert described.loc['freq', 'gender'] == data['gender'].value_counts().iloc[0]
@@ -0,0 +1,33 @@
+import pandas as pd
+
+from common.categoricals import normalise_category_labels, normalise_strings
+
+
+def _values(series):
+    return [None if pd.isna(value) else value for value in series]
+
+
+def test_labels_match_row_wise_normalisation():
+    values = pd.Series([' Male', 'male', 'FEMALE ', None, 'Female', 'other'], name='gender')
+    result = normalise_category_labels(values)
+    expected = values.str.strip().str.lower()
+    assert _values(result) == _values(expected)
+    assert sorted(result.cat.categories) == ['female', 'male', 'other']
+
+
+def test_all_null_column():
+    result = normalise_category_labels(pd.Series([None, None], dtype=object))
+    assert len(result) == 2
+    assert result.isna().all()
+
+
+def test_labels_that_clean_to_nothing():
+    result = normalise_category_labels(pd.Series(['  ', ' ', None], dtype=object))
+    assert _values(result) == ['', '', None]
+
+
+def test_normalise_strings_with_empty_chunk_column():
+    data = pd.DataFrame({'gender': pd.Series([None, None], dtype=object), 'member_id': [' A1', 'b2 ']})
+    result = normalise_strings(data, ['gender'])
+    assert result['gender'].isna().all()
+    assert result['member_id'].tolist() == ['a1', 'b2']
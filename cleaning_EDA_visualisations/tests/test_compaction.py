@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from common.compaction import decode_ids, read_compact
+from common.data_loader import TABLE_SCHEMAS, read_table
+
+
+def _write_employers(tmp_path, rows=300, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({column: [None] * rows for column in TABLE_SCHEMAS['member_employers']})
+    data['relationship_id'] = np.arange(rows)
+    data['employer_id'] = rng.integers(1, 50, rows)
+    data['member_id'] = [f'MEM{i:06d}' for i in range(rows)]
+    data['industry'] = rng.choice(['Mining', 'Retail', None], rows)
+    data['total_employees'] = np.where(rng.random(rows) < 0.1, np.nan, rng.integers(1, 5000, rows))
+    data['avg_salary'] = rng.integers(20_000, 200_000, rows).astype(float)
+    path = tmp_path / 'member_employers.csv'
+    data.to_csv(path, index=False)
+    return data, str(path)
+
+
+def _as_read(path):
+    return read_table('member_employers', path=path, chunksize=64)
+
+
+def _assert_same_values(compacted, data):
+    assert decode_ids(compacted['member_id'], 'member_id').tolist() == data['member_id'].tolist()
+    assert compacted['industry'].astype(object).where(compacted['industry'].notna(), None).tolist() == \
+        data['industry'].astype(object).where(data['industry'].notna(), None).tolist()
+    for column in ['relationship_id', 'employer_id', 'total_employees', 'avg_salary']:
+        pd.testing.assert_series_equal(compacted[column].astype('float64'), data[column].astype('float64'),
+                                       check_names=False)
+
+
+def test_round_trip_matches_loader(tmp_path):
+    _, path = _write_employers(tmp_path)
+    compacted = read_compact('member_employers', path=path, chunksize=64)
+    _assert_same_values(compacted, _as_read(path))
+    assert compacted['avg_salary'].dtype == 'Int32'
+    assert compacted['industry'].dtype == 'category'
+
+
+def test_value_outside_type_in_a_late_chunk_demotes_the_whole_column(tmp_path):
+    data, path = _write_employers(tmp_path)
+    # Fits Int32 in the first chunks, then a non-integral amount
+    data.loc[len(data) - 1, 'avg_salary'] = 65_432.5
+    data.to_csv(path, index=False)
+    compacted = read_compact('member_employers', path=path, chunksize=64)
+    expected = _as_read(path)
+    # Exact values, at the loader's dtype, rather than an upcast mix of chunk types
+    assert compacted['avg_salary'].dtype == 'float64'
+    pd.testing.assert_series_equal(compacted['avg_salary'], expected['avg_salary'])
+    _assert_same_values(compacted, expected)
+
+
+def test_malformed_id_in_a_late_chunk(tmp_path):
+    data, path = _write_employers(tmp_path)
+    data.loc[len(data) - 1, 'member_id'] = 'X-1'
+    data.to_csv(path, index=False)
+    compacted = read_compact('member_employers', path=path, chunksize=64)
+    assert compacted['member_id'].dtype == 'category'
+    assert compacted['member_id'].astype(object).tolist() == _as_read(path)['member_id'].tolist()
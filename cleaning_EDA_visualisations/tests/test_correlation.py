@@ -0,0 +1,73 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from common.correlation import CorrelationAccumulator, _betainc, correlate_table, numeric_columns
+
+
+def _data(rows=5_000, seed=0):
+    rng = np.random.default_rng(seed)
+    salary = rng.normal(90_000, 15_000, rows)
+    data = pd.DataFrame({
+        'salary': salary,
+        # Large values with a small spread, where naive sums lose precision
+        'super_balance': 1e9 + salary * 3 + rng.normal(0, 5_000, rows),
+        'rate': rng.random(rows),
+    })
+    for column in data.columns:
+        data.loc[rng.random(rows) < 0.1, column] = np.nan
+    return data
+
+
+def _chunks(data, size):
+    return [data.iloc[start:start + size] for start in range(0, len(data), size)]
+
+
+def test_updates_match_pandas_corr():
+    data = _data()
+    accumulator = CorrelationAccumulator(data.columns)
+    for chunk in _chunks(data, 700):
+        accumulator.update(chunk)
+    pd.testing.assert_frame_equal(accumulator.correlation(), data.corr(), atol=1e-9)
+    expected_counts = data.notna().astype('int64').T @ data.notna().astype('int64')
+    pd.testing.assert_frame_equal(accumulator.counts(), expected_counts, check_names=False)
+
+
+def test_merged_partials_match_pandas_corr():
+    data = _data()
+    # Each partial has its own shift, from the first chunk it saw
+    partials = [CorrelationAccumulator(data.columns).update(chunk) for chunk in _chunks(data, 1_300)]
+    merged = CorrelationAccumulator(data.columns)
+    for partial in reversed(partials):
+        merged.merge(partial)
+    merged.merge(CorrelationAccumulator(data.columns))
+    pd.testing.assert_frame_equal(merged.correlation(), data.corr(), atol=1e-9)
+
+
+def test_p_values_match_scipy():
+    stats = pytest.importorskip('scipy.stats')
+    data = _data(rows=200).dropna()
+    accumulator = CorrelationAccumulator(data.columns).update(data)
+    expected = stats.pearsonr(data['salary'], data['rate']).pvalue
+    assert np.isclose(accumulator.p_values().loc['salary', 'rate'], expected)
+
+
+def test_betainc_fallback_matches_scipy():
+    special = pytest.importorskip('scipy.special')
+    for a, b, x in [(0.5, 0.5, 0.3), (99.0, 0.5, 0.97), (2.0, 0.5, 0.999), (10.0, 0.5, 0.1)]:
+        assert np.isclose(_betainc(a, b, x), special.betainc(a, b, x), rtol=1e-9)
+
+
+def test_spearman_with_workers_matches_pandas(tmp_path):
+    rng = np.random.default_rng(1)
+    rows = 1_000
+    # Fewer rows than the rank sketches hold, so ranks stay exact
+    data = pd.DataFrame({column: [None] * rows for column in numeric_columns('employment_history')})
+    data['employment_id'] = rng.integers(0, 50, rows)
+    data['employer_id'] = rng.integers(0, 30, rows)
+    data['final_salary'] = data['employer_id'] * 1_000 + rng.integers(0, 20, rows) * 500.0
+    path = tmp_path / 'employment_history.csv'
+    data.to_csv(path, index=False)
+    accumulator = correlate_table('employment_history', method='spearman', workers=2, path=str(path))
+    expected = data.astype('float64').corr(method='spearman')
+    pd.testing.assert_frame_equal(accumulator.correlation(), expected, atol=1e-9)
@@ -0,0 +1,77 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+import common.employment_cube as employment_cube
+from common.data_loader import read_table
+from common.employment_cube import cube_path, load_cube
+
+HEADER = 'employment_id,member_id,employer_id,position_title,start_date,end_date,employment_type,final_salary\n'
+
+
+def _rows(start, count, seed):
+    rng = np.random.default_rng(seed)
+    lines = []
+    for i in range(start, start + count):
+        starts = pd.Timestamp('2018-01-01') + pd.Timedelta(days=int(rng.integers(0, 1500)))
+        end = rng.choice(['', '9999-12-31', (starts + pd.Timedelta(days=int(rng.integers(1, 900)))).date()])
+        lines.append(f'{i % 150},MEM{i % 97:06d},{rng.integers(1, 4)},{rng.choice(["Analyst", "Clerk"])},'
+                     f'{starts.date()},{end},{rng.choice(["casual", "full-time"])},{rng.integers(20, 90) * 1000}\n')
+    return lines
+
+
+def _brute_force(path):
+    data = read_table('employment_history', path=path).drop_duplicates()
+    counts = {}
+    for measure, column in [('starts', 'start_date'), ('ends', 'end_date')]:
+        dates = pd.to_datetime(data[column].where(data[column] != '9999-12-31'), errors='coerce')
+        events = data.assign(month=dates.dt.to_period('M').dt.to_timestamp()).dropna(subset=['month'])
+        counts[measure] = events.groupby('month').size()
+    return pd.DataFrame(counts).fillna(0).astype('int64')
+
+
+def _monthly(cube):
+    starts = cube.aggregate(measure='starts').set_index('period')['starts']
+    ends = cube.aggregate(measure='ends').set_index('period')['ends']
+    result = pd.DataFrame({'starts': starts, 'ends': ends}).fillna(0).astype('int64')
+    result.index = result.index.rename('month').as_unit('ns')
+    return result
+
+
+def test_counts_unique_rows_and_appended_rows(tmp_path, monkeypatch):
+    path = str(tmp_path / 'employment_history.csv')
+    lines = _rows(0, 400, seed=0)
+    # Repeated rows, as in the raw extracts
+    with open(path, 'w') as f:
+        f.writelines([HEADER] + lines + lines[:60])
+    cube = load_cube(path)
+    assert cube.duplicates == 60
+    expected = _brute_force(path)
+    pd.testing.assert_frame_equal(_monthly(cube), expected.set_axis(expected.index.as_unit('ns')), check_freq=False)
+
+    # Appended rows, some repeating rows from before the append, are folded in on their own
+    calls = []
+    iter_chunks = employment_cube.iter_chunks
+    monkeypatch.setattr(employment_cube, 'iter_chunks', lambda *a, **k: calls.append(k) or iter_chunks(*a, **k))
+    with open(path, 'a') as f:
+        f.writelines(_rows(400, 100, seed=1) + lines[100:130])
+    cube = load_cube(path)
+    assert [call.get('byte_range') is not None for call in calls] == [True]
+    assert cube.duplicates == 90
+    expected = _brute_force(path)
+    pd.testing.assert_frame_equal(_monthly(cube), expected.set_axis(expected.index.as_unit('ns')), check_freq=False)
+
+
+def test_each_source_has_its_own_cube(tmp_path):
+    first, second = str(tmp_path / 'first.csv'), str(tmp_path / 'second.csv')
+    with open(first, 'w') as f:
+        f.writelines([HEADER] + _rows(0, 50, seed=2))
+    with open(second, 'w') as f:
+        f.writelines([HEADER] + _rows(0, 80, seed=3))
+    assert cube_path(source=first) != cube_path(source=second)
+    assert load_cube(first).rows == 50
+    assert load_cube(second).rows == 80
+    # Still the first file's cube, read back from its own saved file
+    assert os.path.exists(cube_path(source=first))
+    assert load_cube(first).rows == 50
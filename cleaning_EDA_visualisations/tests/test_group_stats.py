@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from common.group_stats import STATISTICS, group_stats
+
+
+def _data(rows=3_000, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({
+        'industry': rng.choice(['Mining', 'Retail', 'Health', None], rows).astype(object),
+        'employer_id': pd.array(rng.integers(0, 40, rows), dtype='Int64'),
+        'avg_salary': rng.normal(90_000, 15_000, rows),
+        # Large values with a small spread
+        'super_balance': 1e10 + rng.normal(0, 100, rows),
+        'total_employees': pd.array(rng.integers(1, 5_000, rows), dtype='Int64'),
+    })
+    data.loc[rng.random(rows) < 0.1, 'avg_salary'] = np.nan
+    data.loc[rng.random(rows) < 0.1, 'total_employees'] = pd.NA
+    # A group whose values are all missing, and a group of one row
+    data.loc[data['industry'] == 'Health', 'avg_salary'] = np.nan
+    data.loc[len(data)] = ['Farming', 1, 50_000.0, 1e10, 12]
+    return data
+
+
+def _expected(data, by, columns):
+    expected = data.groupby(by)[columns].agg(STATISTICS)
+    # Compare values rather than nullable dtypes
+    return expected.astype({column: 'int64' if column[1] == 'count' else 'float64' for column in expected.columns})
+
+
+def test_matches_groupby_agg():
+    data = _data()
+    columns = ['avg_salary', 'super_balance', 'total_employees']
+    result = group_stats(data, 'industry', columns)
+    # groupby's std uses running updates, which lose a few digits on large values
+    pd.testing.assert_frame_equal(result, _expected(data, 'industry', columns), check_index_type=False,
+                                  rtol=1e-6)
+    for industry, rows in data.dropna(subset=['industry']).groupby('industry'):
+        balances = rows['super_balance'].to_numpy()
+        expected = balances.std(ddof=1) if len(balances) > 1 else np.nan
+        assert np.isclose(result.loc[industry, ('super_balance', 'std')], expected, rtol=1e-12, equal_nan=True)
+
+
+def test_integer_key_and_default_columns():
+    data = _data()
+    result = group_stats(data, 'employer_id')
+    columns = ['avg_salary', 'super_balance', 'total_employees']
+    # The key itself is not summarised, as with groupby().agg()
+    assert [column for column, _ in result.columns[::4]] == columns
+    pd.testing.assert_frame_equal(result, _expected(data, 'employer_id', columns), check_index_type=False,
+                                  rtol=1e-6)
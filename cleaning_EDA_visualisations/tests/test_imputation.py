@@ -0,0 +1,65 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from common.data_loader import TABLE_SCHEMAS, read_table, table_path
+from common.imputation import Imputer
+from common.pipeline import ImputeStage, Pipeline, build_stages
+
+
+def _write_members(rows=500, seed=0):
+    rng = np.random.default_rng(seed)
+    data = pd.DataFrame({column: [None] * rows for column in TABLE_SCHEMAS['superannuation_members']})
+    data['member_id'] = [f'MEM{i:06d}' for i in range(rows)]
+    data['gender'] = rng.choice(['male', 'female', None], rows, p=[0.5, 0.3, 0.2])
+    data['salary'] = np.where(rng.random(rows) < 0.1, np.nan, rng.normal(90000, 15000, rows).round())
+    data = pd.concat([data, data.iloc[:50]], ignore_index=True)
+    data.to_csv(table_path('superannuation_members'), index=False)
+    # As the loader types it
+    return read_table('superannuation_members')
+
+
+def test_imputer_matches_pandas():
+    data = _write_members()
+    imputer = Imputer()
+    for start in range(0, len(data), 64):
+        imputer.partial_fit(data.iloc[start:start + 64])
+    assert np.isclose(imputer.fill_values['salary'], data['salary'].mean())
+    assert imputer.fill_values['gender'] == data['gender'].mode()[0]
+
+
+def _cleaned(pipeline):
+    try:
+        return pd.concat(list(pipeline.fit().iter_cleaned()), ignore_index=True)
+    finally:
+        pipeline.close()
+
+
+def test_fill_values_are_reused_until_the_source_changes(monkeypatch):
+    data = _write_members()
+    first = Pipeline('superannuation_members', build_stages('superannuation_members', until='missing_values'))
+    expected = _cleaned(first)
+    assert not first.stages[1].reused
+    unique = data.drop_duplicates()
+    assert np.isclose(first.stages[1].imputer.fill_values['salary'], unique['salary'].mean())
+
+    # A second run reuses the saved values without a pass of its own
+    observed = []
+    monkeypatch.setattr(ImputeStage, 'observe', lambda self, chunk: observed.append(len(chunk)))
+    second = Pipeline('superannuation_members', build_stages('superannuation_members', until='missing_values'))
+    pd.testing.assert_frame_equal(_cleaned(second), expected)
+    assert second.stages[1].reused and not observed
+
+    # Values fitted on the raw rows are kept apart from those fitted after de-duplication
+    raw = Pipeline('superannuation_members', [ImputeStage('superannuation_members')])
+    _cleaned(raw)
+    assert not raw.stages[0].reused and raw.stages[0].path != second.stages[1].path
+
+    # Changing the file refits
+    monkeypatch.undo()
+    _write_members(seed=1)
+    os.utime(table_path('superannuation_members'), ns=(1, 1))
+    third = Pipeline('superannuation_members', build_stages('superannuation_members', until='missing_values'))
+    _cleaned(third)
+    assert not third.stages[1].reused
@@ -0,0 +1,41 @@
+import numpy as np
+import pandas as pd
+
+from common.outliers import OutlierDetector
+
+
+def _data(rows=20_000, seed=0):
+    rng = np.random.default_rng(seed)
+    salary = rng.normal(90_000, 15_000, rows)
+    salary[rng.choice(rows, 20, replace=False)] = 1_000_000
+    salary[rng.random(rows) < 0.05] = np.nan
+    return pd.DataFrame({'salary': salary})
+
+
+def _detector(data, method, **kwargs):
+    detector = OutlierDetector(['salary'], method, **kwargs)
+    for start in range(0, len(data), 3_000):
+        detector.update(data.iloc[start:start + 3_000])
+    return detector
+
+
+def test_zscore_flags_match_pandas():
+    data = _data()
+    detector = _detector(data, 'zscore')
+    salary = data['salary']
+    # Population standard deviation, as scipy.stats.zscore
+    z = (salary - salary.mean()) / salary.std(ddof=0)
+    assert detector.flag(data).tolist() == (z.abs() > 3).tolist()
+
+
+def test_iqr_bounds_are_the_same_on_every_run():
+    data = _data()
+    runs = [_detector(data, 'iqr') for _ in range(2)]
+    assert runs[0].seed == 0
+    assert runs[0].bounds() == runs[1].bounds()
+    assert runs[0].flag(data).tolist() == runs[1].flag(data).tolist()
+    # Close to the exact quartiles
+    q1, q3 = data['salary'].quantile([0.25, 0.75])
+    lower, upper = runs[0].bounds()['salary']
+    assert abs(lower - (q1 - 1.5 * (q3 - q1))) < 0.05 * (q3 - q1)
+    assert abs(upper - (q3 + 1.5 * (q3 - q1))) < 0.05 * (q3 - q1)
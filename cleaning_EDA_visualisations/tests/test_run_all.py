@@ -0,0 +1,34 @@
+from common.run_all import Job, run_jobs
+
+# Burns CPU in a child process and counts how often it has run in this worker
+CHILD_SCRIPT = """
+import subprocess
+import sys
+
+import common.data_loader as loader
+
+subprocess.run([sys.executable, '-c', 'sum(i * i for i in range(20_000_000))'], check=True)
+loader.RUNS = getattr(loader, 'RUNS', 0) + 1
+print('runs', loader.RUNS)
+"""
+
+
+def test_child_cpu_counted_and_fresh_worker_per_job(tmp_path):
+    script = tmp_path / 'child.py'
+    script.write_text(CHILD_SCRIPT)
+    broken = tmp_path / 'broken.py'
+    broken.write_text('raise RuntimeError("broken")\n')
+    jobs = [Job('t', 'first', str(script)), Job('t', 'second', str(script)),
+            Job('t', 'broken', str(broken)), Job('t', 'after', str(script), depends_on=['t:broken'])]
+
+    results = {result['job']: result for result in run_jobs(jobs, workers=1, output_dir=str(tmp_path / 'out'))}
+
+    assert results['t:first']['status'] == 'ok'
+    # The child's CPU time is only visible through RUSAGE_CHILDREN
+    assert results['t:first']['cpu_seconds'] > 1.0
+    assert results['t:first']['peak_rss_mb'] > 0
+    # A single worker still gives the second job a fresh process
+    with open(results['t:second']['log']) as log:
+        assert 'runs 1' in log.read()
+    assert results['t:broken']['status'] == 'failed'
+    assert results['t:after']['status'] == 'skipped'
@@ -0,0 +1,109 @@
+import numpy as np
+import pandas as pd
+
+from common.sketches import HyperLogLog, KLLSketch, Moments, SpaceSaving
+
+
+def _chunks(values, size):
+    return [values[start:start + size] for start in range(0, len(values), size)]
+
+
+def test_moments_merge_matches_numpy():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(11, 0.5, 10_000)
+    values[rng.random(len(values)) < 0.05] = np.nan
+    # Chunks of uneven sizes, some folded in with update() and some merged
+    merged = Moments()
+    for i, chunk in enumerate(_chunks(values, 777)):
+        if i % 2:
+            merged.merge(Moments().update(chunk))
+        else:
+            merged.update(chunk)
+    present = values[~np.isnan(values)]
+    assert merged.count == len(present)
+    assert np.isclose(merged.mean, present.mean())
+    assert np.isclose(merged.variance(), present.var())
+    assert np.isclose(merged.std(ddof=1), pd.Series(present).std())
+
+
+def test_moments_empty():
+    moments = Moments().merge(Moments()).update([np.nan])
+    assert moments.count == 0
+    assert np.isnan(moments.variance(ddof=1))
+
+
+def test_kll_exact_until_first_compaction():
+    values = np.random.default_rng(1).normal(size=150)
+    sketch = KLLSketch(200).update(values)
+    assert sketch.exact
+    q = [0, 0.1, 0.25, 0.5, 0.75, 1]
+    assert np.allclose(sketch.quantile(q), pd.Series(values).quantile(q).to_numpy())
+
+
+def test_kll_rank_error_within_bound():
+    values = np.random.default_rng(2).exponential(size=100_000)
+    k = 200
+    sketches = [KLLSketch(k, seed=0).update(chunk) for chunk in _chunks(values, 10_000)]
+    sketch = sketches[0]
+    for other in sketches[1:]:
+        sketch.merge(other)
+    assert sketch.count == len(values) and not sketch.exact
+    ordered = np.sort(values)
+    for q in [0.01, 0.25, 0.5, 0.75, 0.99]:
+        rank = np.searchsorted(ordered, sketch.quantile(q)) / len(values)
+        # About 1.7 / k with high probability; allow some slack
+        assert abs(rank - q) < 3 * 1.7 / k
+
+
+def test_kll_seeded_is_deterministic():
+    values = np.random.default_rng(3).normal(size=50_000)
+    runs = [KLLSketch(100, seed=7).update(values).quantile([0.25, 0.5, 0.75]) for _ in range(2)]
+    assert np.array_equal(runs[0], runs[1])
+
+
+def test_hyperloglog_estimate_within_error():
+    rng = np.random.default_rng(4)
+    values = pd.Series(rng.integers(0, 200_000, 300_000)).map('MEM{:06d}'.format)
+    # Split across two sketches and merged, with repeats and nulls
+    halves = [HyperLogLog().update(part) for part in _chunks(values, 150_000)]
+    sketch = halves[0].merge(halves[1]).update(pd.Series([None, np.nan]))
+    exact = values.nunique()
+    # Standard error about 0.8% at precision 14
+    assert abs(sketch.estimate() - exact) < 4 * 0.0081 * exact
+
+
+def test_hyperloglog_small_counts_exact():
+    assert HyperLogLog().update(pd.Series(['a', 'b', 'a', None])).estimate() == 2
+    assert HyperLogLog().estimate() == 0
+
+
+def test_space_saving_exact_matches_value_counts():
+    rng = np.random.default_rng(5)
+    values = pd.Series(rng.choice(['casual', 'full-time', 'part-time', None], 5_000, p=[0.5, 0.3, 0.15, 0.05]))
+    sketch = SpaceSaving(16)
+    for chunk in _chunks(values, 700):
+        sketch.merge(SpaceSaving(16).update(chunk))
+    assert sketch.exact
+    counts = values.value_counts()
+    assert sketch.top_k(3)['count'].to_dict() == counts.to_dict()
+    assert sketch.mode() == values.mode()[0]
+
+
+def test_space_saving_heavy_hitters_bounds():
+    rng = np.random.default_rng(6)
+    # A few frequent values in a long tail of rare ones
+    values = pd.Series(np.concatenate([rng.integers(0, 5, 20_000), rng.integers(100, 50_000, 30_000)]))
+    values = values.sample(frac=1, random_state=0)
+    sketch = SpaceSaving(64)
+    for chunk in _chunks(values, 5_000):
+        sketch.update(chunk)
+    assert not sketch.exact
+    counts = values.value_counts()
+    top = sketch.top_k(5)
+    assert sorted(top.index) == sorted(counts.index[:5])
+    for value, row in top.iterrows():
+        # Never undercounts, and overcounts by at most the stored error
+        assert counts[value] <= row['count'] <= counts[value] + row['error']
+    # Any value that is not tracked occurred at most min_count times
+    untracked = counts.drop(sketch.counts.index, errors='ignore')
+    assert untracked.max() <= sketch.min_count
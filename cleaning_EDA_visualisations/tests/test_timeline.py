@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from common.data_loader import iter_chunks
+from common.timeline import ActiveTimeline
+
+CSV = """employment_id,member_id,employer_id,position_title,start_date,end_date,employment_type,final_salary
+0,MEM000001,1,pos1,2020-01-15,2020-03-10,casual,50000
+1,MEM000001,2,pos2,2020-03-11,9999-12-31,full-time,60000
+2,MEM000002,1,pos1,2020-02-01,,casual,55000
+3,MEM000003,3,pos3,2019-11-20,2020-02-29,full-time,70000
+4,MEM000004,3,pos3,,2020-05-01,casual,40000
+"""
+
+
+def _raw_chunk(tmp_path):
+    path = tmp_path / 'employment_history.csv'
+    path.write_text(CSV)
+    return next(iter_chunks('employment_history', path=str(path)))
+
+
+def _brute_force(data, day):
+    # Active on day: started on or before it and not ended before it (missing or 9999 ends never end)
+    starts = pd.to_datetime(data['start_date'], errors='coerce')
+    ends = pd.to_datetime(data['end_date'].replace('9999-12-31', None), errors='coerce')
+    active = (starts <= day) & (ends.isna() | (ends >= day)) & starts.notna()
+    return active, int(active.sum())
+
+
+def test_raw_chunk_with_missing_end_date(tmp_path):
+    data = _raw_chunk(tmp_path)
+    assert data['end_date'].isna().any()
+    timeline = ActiveTimeline.from_frame(data, as_of='2020-06-30')
+    for day in pd.date_range('2019-11-01', '2020-06-30'):
+        assert timeline.headcount(day) == _brute_force(data, day)[1]
+
+
+def test_active_counts_match_brute_force(tmp_path):
+    data = _raw_chunk(tmp_path)
+    timeline = ActiveTimeline.from_frame(data, by='employment_type', as_of='2020-06-30')
+    counts = timeline.active_counts(freq='M')
+    for period in counts.index:
+        days = pd.date_range(period, period + pd.offsets.MonthEnd(0))
+        active = np.zeros(len(data), dtype=bool)
+        for day in days:
+            active |= _brute_force(data, day)[0].to_numpy()
+        expected = data[active].groupby('employment_type').size()
+        for group in counts.columns:
+            assert counts.loc[period, group] == expected.get(group, 0)